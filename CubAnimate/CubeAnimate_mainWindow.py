@@ -7,9 +7,6 @@ from .__init__ import CUBE_SIZE
 from .common.CDrawer import CDrawer
 from .common.CTypes import Axis, CubeSize, CubeLEDFrame_DATA
 
-from .equation_editor.equation_editor import EIWindow
-from .animation_editor.animation_editor import Animator
-from .hue_editor.hue_editor import HueEditor
 
 
 '''
@@ -136,6 +133,7 @@ class OpenMenuButton(Qtw.QPushButton):
 
 class EditorIndex():
     ANIMATOR, EQUATION_INTERPRETER, HUE_EDITOR = range(3)
+    COUNT = 3
 
 class StatusBar_Widget(Qtw.QWidget):
     stylesheet = """
@@ -199,22 +197,22 @@ class Editors_MainWidget(Qtw.QWidget):
         self.setObjectName('Custom_Main_Widget')
         self.openMenu_signal = openMenu_signal
 
-        ## Windows instantiation
-        self.animator = Animator(self, self.waitingCursor_signal, self.cubeSize)
+        ## Windows are built the first time they are opened, see buildEditor()
+        self.animator = None
         #self.startBackground = StartingMenuBackground(self)
-        self.equationInterpreter = EIWindow(self)
-        self.hueEditor = HueEditor(self.cubeSize, self)
+        self.equationInterpreter = None
+        self.hueEditor = None
+        self.backgroundColor = None
 
         ## Main menu
         #self.drawerMenu = CDrawer(self)
         self.mainMenu = MainMenu(self.newWindow_signal, self)
         #self.drawerMenu.setWidget(self.mainMenu)
 
-        ## Windows manager, add widget according to the order given in EditorIndex
+        ## Windows manager, placeholders are added according to the order given in EditorIndex and replaced by the editors once built
         self.windowStack = Qtw.QStackedWidget(self)
-        self.windowStack.addWidget(self.animator)
-        self.windowStack.addWidget(self.equationInterpreter)
-        self.windowStack.addWidget(self.hueEditor)
+        for _ in range(EditorIndex.COUNT):
+            self.windowStack.addWidget(Qtw.QWidget(self))
         self.currentIndexEditor = self.windowStack.currentIndex()
 
         self.newWindow_signal.connect(self.changeWindow)
@@ -249,13 +247,51 @@ class Editors_MainWidget(Qtw.QWidget):
     #def openMainMenu(self):
     #    self.drawerMenu.show()
     
+    def buildEditor(self, indexWindow : int) -> Qtw.QWidget:
+        """ Return the editor at the given index, instantiate it in place of its placeholder the first time.
+
+        Editor modules are only imported here, the 3D graphs and matplotlib are thus loaded on demand.
+        """
+        editor = self.getEditor(indexWindow)
+        if editor is not None:
+            return editor
+
+        if indexWindow == EditorIndex.ANIMATOR:
+            from .animation_editor.animation_editor import Animator
+            editor = self.animator = Animator(self, self.waitingCursor_signal, self.cubeSize)
+        elif indexWindow == EditorIndex.EQUATION_INTERPRETER:
+            from .equation_editor.equation_editor import EIWindow
+            editor = self.equationInterpreter = EIWindow(self, self.waitingCursor_signal)
+        elif indexWindow == EditorIndex.HUE_EDITOR:
+            from .hue_editor.hue_editor import HueEditor
+            editor = self.hueEditor = HueEditor(self.cubeSize, self, self.waitingCursor_signal)
+        else:
+            raise ValueError("Unknown editor index {}".format(indexWindow))
+
+        if self.backgroundColor is not None and hasattr(editor, 'setBackgroundColor'):
+            editor.setBackgroundColor(self.backgroundColor)
+
+        placeholder = self.windowStack.widget(indexWindow)
+        self.windowStack.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.windowStack.insertWidget(indexWindow, editor)
+        return editor
+
+    def getEditor(self, indexWindow : int) -> Qtw.QWidget:
+        """ Return the editor at the given index, None if not built yet."""
+        return {EditorIndex.ANIMATOR: self.animator,
+                EditorIndex.EQUATION_INTERPRETER: self.equationInterpreter,
+                EditorIndex.HUE_EDITOR: self.hueEditor}.get(indexWindow)
+
     def changeWindow(self, newIndexWindow):
         self.waitingCursor_signal.emit(True)
         oldIndexWindow = self.windowStack.currentIndex()
 
-        if oldIndexWindow == EditorIndex.HUE_EDITOR:                      ## HUE WINDOW OUT
+        if oldIndexWindow == EditorIndex.HUE_EDITOR and self.hueEditor is not None:       ## HUE WINDOW OUT
             self.hueEditor.activeAnimation(False)
 
+        self.buildEditor(newIndexWindow)
+
         if newIndexWindow == EditorIndex.ANIMATOR:                        ## ANIMATION WINDOW IN
             ''' With launching pop-up
             if not self.animator.isEmpty():
@@ -296,33 +332,42 @@ class Editors_MainWidget(Qtw.QWidget):
     def changeBackgroundColor(self, color:QColor):
         self.setStyleSheet("#Custom_Main_Widget {background: %s;}"%(color.name()))
         #self.startBackground.setBackgroundColor(color)
-        self.animator.setBackgroundColor(color)
-        self.hueEditor.setBackgroundColor(color)
+        if self.animator is not None:
+            self.animator.setBackgroundColor(color)
+        if self.hueEditor is not None:
+            self.hueEditor.setBackgroundColor(color)
         self.backgroundColor = color
     
     def saveFile(self):
         boulOut = True
-        if self.windowStack.currentIndex() == EditorIndex.ANIMATOR:
+        if self.windowStack.currentIndex() == EditorIndex.ANIMATOR and self.animator is not None:
             boulOut = self.animator.saveAnimation()
-        if self.windowStack.currentIndex() == EditorIndex.HUE_EDITOR:
+        if self.windowStack.currentIndex() == EditorIndex.HUE_EDITOR and self.hueEditor is not None:
             boulOut = self.hueEditor.saveAnimation()
         return boulOut
         
     def openFile(self):
-        if self.windowStack.currentIndex() == EditorIndex.ANIMATOR:
+        if self.windowStack.currentIndex() == EditorIndex.ANIMATOR and self.animator is not None:
             self.animator.openAnimation()
-        if self.windowStack.currentIndex() == EditorIndex.HUE_EDITOR:
+        if self.windowStack.currentIndex() == EditorIndex.HUE_EDITOR and self.hueEditor is not None:
             self.hueEditor.openAnimation()
         
     def getCurrentIndexEditor(self):
         return self.currentIndexEditor
+
+    def stopRendering(self):
+        """ Cancel the exports running in the background, before the editors are destroyed."""
+        if self.equationInterpreter is not None:
+            self.equationInterpreter.stopExport()
+        if self.hueEditor is not None:
+            self.hueEditor.stopBaking()
     
     def currentFileSaved(self) -> bool:
         boolOut = True
-        if self.windowStack.currentIndex() == EditorIndex.ANIMATOR:
+        if self.windowStack.currentIndex() == EditorIndex.ANIMATOR and self.animator is not None:
             boolOut = self.animator.isSaved()
             print(boolOut)
-        if self.windowStack.currentIndex() == EditorIndex.HUE_EDITOR:
+        if self.windowStack.currentIndex() == EditorIndex.HUE_EDITOR and self.hueEditor is not None:
             boolOut = self.hueEditor.isSaved()
         return boolOut
 
@@ -384,7 +429,7 @@ class MainWindow(Qtw.QMainWindow):
     def canLeaveEditor(self):
         boolOut = True
         if self.windowStack.currentIndex() == self.editorsIndex and not self.mainWidget.currentFileSaved(): #Leaving not saved editor
-            if self.mainWidget.getCurrentIndexEditor() == EditorIndex.ANIMATOR: #Animator
+            if self.mainWidget.getCurrentIndexEditor() in (EditorIndex.ANIMATOR, EditorIndex.HUE_EDITOR): #Animator or HUE editor
                 out = self.savingPopUp.exec()
                 if out == Qtw.QMessageBox.Save:
                     print('Save')
@@ -409,6 +454,7 @@ class MainWindow(Qtw.QMainWindow):
     
     def closeEvent(self, event):
         if self.canLeaveEditor():
+            self.mainWidget.stopRendering()
             event.accept() # let the window close
         else:
             event.ignore()
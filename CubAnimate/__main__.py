@@ -1,6 +1,9 @@
 ## DO NOT USE RELATIVE IMPORTS HERE TO USE PYINSTALLER
 ## To compile use 'pyinstaller --onefile --windowed --noconsole --icon="resources/icon.ico" --name="CubAnimate" __main__.py'
+import multiprocessing
+
 from CubAnimate import app
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # Rendering workers of the frozen build must not start the application
     app.run()
\ No newline at end of file
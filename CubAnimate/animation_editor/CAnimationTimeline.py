@@ -1,9 +1,10 @@
 
 from PyQt5 import QtWidgets as Qtw
 from PyQt5 import QtCore
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtGui import QPixmap, QColor, QPainter, QPen
 
 from ..common.CTypes import Axis, CubeSize, CubeLEDFrame_DATA
+from ..common.CThumbnailRenderer import ThumbnailRenderer
 
 stylesheet = """
 QGroupBox, QLabel, QTabWidget {
@@ -62,43 +63,24 @@ QGroupBox::title {
 }
 """
 
-class CubeLEDFrame(Qtw.QListWidgetItem):
-    """ Item to use in an AnimationList object. Represent a frame in the timeline.
+class CubeLEDFrame:
+    """ Frame of the timeline, stored in a TimelineModel.
     
     Attributes:
-        name (str): Name of the frame.
-        frameDate (CubeLEDFrame_DATA): Currently modified frame.
-        cubeSize (CubeSize): Number of LEDs along each axis.
-        illustration (QLabel): Consist of a representation (QPixmap) of the frame associated.
+        frameData (CubeLEDFrame_DATA): Colors of the LEDs.
+        illustration (QPixmap): Representation of the frame, None to use the blank illustration of the timeline.
+        thumbnailOutdated (bool): The illustration does not match the frame data anymore.
+        thumbnailKey: Cache key of the thumbnail being drawn for this frame.
     """
 
-    def __init__(self, name : str, cubeSize:CubeSize, width:int, parentList, parent):
-        super(Qtw.QListWidgetItem, self).__init__(None,parentList)
-        self.parentList = parentList
-        self.parent = parent
-        self.name = name
-        
+    def __init__(self, cubeSize:CubeSize):
         self.frameData = CubeLEDFrame_DATA(cubeSize)
-        self.setSizeHint(QtCore.QSize(width*0.95,width*0.85))
- 
-        self.frame =  Qtw.QGroupBox(self.name)
-        self.layout = Qtw.QHBoxLayout()
-        self.frame.setLayout(self.layout)
-
-        self.illustration = QPixmap()
-        self.illustrationViewer = Qtw.QLabel()
-
-        self.leftSpacer = Qtw.QSpacerItem(1, 1, Qtw.QSizePolicy.Expanding, Qtw.QSizePolicy.Expanding) # Spacers for centering
-        self.rightSpacer = Qtw.QSpacerItem(1, 1, Qtw.QSizePolicy.Expanding, Qtw.QSizePolicy.Expanding)
-        self.layout.addItem(self.leftSpacer)
-        self.layout.addWidget(self.illustrationViewer)
-        self.layout.addItem(self.rightSpacer)
-
-        self.parentList.setItemWidget(self,self.frame)
+        self.illustration = None
+        self.thumbnailOutdated = False
+        self.thumbnailKey = None
     
     def setIllustration(self, image : QPixmap):
         self.illustration = image
-        self.illustrationViewer.setPixmap(self.illustration)
     
     def getIllustration(self):
         return self.illustration
@@ -113,7 +95,178 @@ class CubeLEDFrame(Qtw.QListWidgetItem):
     def decodeData(self, dataLine : str):
         """ Generate data line representing the frame for creating .anim file """
         self.frameData.decode(dataLine)
-        
+
+
+FRAME_MIME_TYPE = 'application/x-cubanimate-frame-rows'
+
+class TimelineModel(QtCore.QAbstractListModel):
+    """ List of the frames of an animation, frames are named after their position.
+
+    Attributes:
+        frames (List[CubeLEDFrame]): Frames of the animation, in order.
+        rows (dict): Row of each frame, kept up to date so that finding a frame does not search the list.
+        blankIllustration (QPixmap): Illustration of the frames without one.
+    """
+    FrameRole = QtCore.Qt.UserRole
+
+    def __init__(self, parent=None):
+        super(TimelineModel, self).__init__(parent)
+        self.frames = []
+        self.rows = {}
+        self.blankIllustration = QPixmap()
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.frames)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.frames):
+            return None
+        frame = self.frames[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return '#{}'.format(index.row()+1)
+        if role == QtCore.Qt.DecorationRole:
+            return frame.getIllustration() if frame.getIllustration() is not None else self.blankIllustration
+        if role == self.FrameRole:
+            return frame
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.ItemIsDropEnabled
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsDragEnabled
+
+    def getFrame(self, row : int) -> CubeLEDFrame:
+        return self.frames[row]
+
+    def rowOf(self, frame : CubeLEDFrame) -> int:
+        return self.rows[frame]
+
+    def hasFrame(self, frame : CubeLEDFrame) -> bool:
+        return frame in self.rows
+
+    def updateRows(self, first : int, last : int):
+        """ Record the rows of the frames from first to last included, after they moved."""
+        for row in range(first, last + 1):
+            self.rows[self.frames[row]] = row
+
+    def appendFrames(self, frames : list):
+        """ Add frames at the end of the timeline in a single insertion."""
+        if len(frames) == 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), len(self.frames), len(self.frames) + len(frames) - 1)
+        self.frames.extend(frames)
+        self.updateRows(len(self.frames) - len(frames), len(self.frames) - 1)
+        self.endInsertRows()
+
+    def removeRows(self, row : int, count : int, parent=QtCore.QModelIndex()) -> bool:
+        if parent.isValid() or row < 0 or count <= 0 or row + count > len(self.frames):
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        for frame in self.frames[row:row + count]:
+            del self.rows[frame]
+        del self.frames[row:row + count]
+        self.updateRows(row, len(self.frames) - 1)
+        self.endRemoveRows()
+        self.renameFrom(row)
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self.frames = []
+        self.rows = {}
+        self.endResetModel()
+
+    def moveRows(self, sourceParent, sourceRow : int, count : int, destinationParent, destinationChild : int) -> bool:
+        if sourceParent.isValid() or destinationParent.isValid() or count <= 0:
+            return False
+        if sourceRow <= destinationChild <= sourceRow + count: # Moving onto itself
+            return False
+        if not self.beginMoveRows(sourceParent, sourceRow, sourceRow + count - 1, destinationParent, destinationChild):
+            return False
+        moved = self.frames[sourceRow:sourceRow + count]
+        del self.frames[sourceRow:sourceRow + count]
+        insertRow = destinationChild - count if destinationChild > sourceRow else destinationChild
+        self.frames[insertRow:insertRow] = moved
+        self.updateRows(min(sourceRow, insertRow), max(sourceRow, insertRow) + count - 1)
+        self.endMoveRows()
+        self.renameFrom(min(sourceRow, insertRow))
+        return True
+
+    def renameFrom(self, row : int):
+        """ Refresh the names of the frames following a change of order."""
+        if row < len(self.frames):
+            self.dataChanged.emit(self.index(row), self.index(len(self.frames)-1), [QtCore.Qt.DisplayRole])
+
+    def frameIllustrationChanged(self, frame : CubeLEDFrame):
+        index = self.index(self.rowOf(frame))
+        self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+
+    ## Drag and drop inside the timeline
+
+    def supportedDropActions(self):
+        return QtCore.Qt.MoveAction
+
+    def mimeTypes(self):
+        return [FRAME_MIME_TYPE]
+
+    def mimeData(self, indexes):
+        mimeData = QtCore.QMimeData()
+        rows = sorted(set(index.row() for index in indexes))
+        mimeData.setData(FRAME_MIME_TYPE, QtCore.QByteArray(','.join(str(row) for row in rows).encode('ascii')))
+        return mimeData
+
+    def dropMimeData(self, mimeData, action, row : int, column : int, parent) -> bool:
+        """ Fallback for the views which do not call moveRows, the frames are moved here and False is returned
+        so that the view does not remove the source rows."""
+        if action != QtCore.Qt.MoveAction or not mimeData.hasFormat(FRAME_MIME_TYPE):
+            return False
+        destination = row if row >= 0 else (parent.row() if parent.isValid() else len(self.frames))
+        rows = [int(r) for r in bytes(mimeData.data(FRAME_MIME_TYPE)).decode('ascii').split(',') if r]
+        for sourceRow in reversed(rows):
+            if self.moveRows(QtCore.QModelIndex(), sourceRow, 1, QtCore.QModelIndex(), destination):
+                if sourceRow < destination:
+                    destination -= 1
+        return False
+
+
+class TimelineDelegate(Qtw.QStyledItemDelegate):
+    """ Paint a frame of the timeline as a titled box around its illustration."""
+
+    borderColor = QColor(128, 128, 128)
+    selectedColor = QColor(139, 173, 228)
+
+    def __init__(self, itemSize : QtCore.QSize, parent=None):
+        super(TimelineDelegate, self).__init__(parent)
+        self.itemSize = itemSize
+
+    def sizeHint(self, option, index) -> QtCore.QSize:
+        return self.itemSize
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = option.rect.adjusted(4, 12, -4, -4)
+        selected = bool(option.state & Qtw.QStyle.State_Selected)
+        painter.setPen(QPen(self.selectedColor if selected else self.borderColor, 2 if selected else 1))
+        painter.setBrush(QtCore.Qt.NoBrush)
+        painter.drawRoundedRect(rect, 5, 5)
+
+        pixmap = index.data(QtCore.Qt.DecorationRole)
+        if pixmap is not None and not pixmap.isNull():
+            target = pixmap.size().scaled(rect.size() - QtCore.QSize(10, 20), QtCore.Qt.KeepAspectRatio)
+            topLeft = rect.center() - QtCore.QPoint(target.width()//2, target.height()//2 - 6)
+            painter.drawPixmap(QtCore.QRect(topLeft, target), pixmap)
+
+        font = painter.font()
+        font.setPixelSize(16)
+        painter.setFont(font)
+        title = index.data(QtCore.Qt.DisplayRole)
+        titleWidth = painter.fontMetrics().horizontalAdvance(title) + 20
+        titleRect = QtCore.QRect(rect.center().x() - titleWidth//2, option.rect.top(), titleWidth, 24)
+        painter.fillRect(titleRect, option.palette.base())
+        painter.setPen(option.palette.text().color())
+        painter.drawText(titleRect, QtCore.Qt.AlignCenter, title)
+        painter.restore()
 
 
 class ratioPushButton(Qtw.QPushButton):
@@ -132,10 +285,19 @@ class ratioPushButton(Qtw.QPushButton):
 
 class AnimationList(Qtw.QWidget):
     """ Widget allowing the user to create a new frame, select the currently modified frame and reorganize them.
+
+    Frames are displayed by a QListView over a TimelineModel: only the visible rows are painted and only
+    their thumbnails are drawn, the cost of the timeline does not grow with the length of the animation.
     
     Attributes:
-        frameList (List[CubeLEDFrame]): Store all frames of the animation.
+        model (TimelineModel): Store all frames of the animation.
+        thumbnailRenderer (ThumbnailRenderer): Draw the illustrations of the frames in background threads.
+
+    Signals:
+        frameSelectionChanged: The selected frame changed.
     """
+    frameSelectionChanged = QtCore.pyqtSignal()
+
     def __init__(self, cubeSize:CubeSize, size : int, horizontalDisplay : bool = False, parent=None):
         super(Qtw.QWidget, self).__init__(parent)
         self.parent = parent
@@ -155,7 +317,12 @@ class AnimationList(Qtw.QWidget):
         self.colorView.setObjectName('Custom_AnimatioList_View')
         layout.addWidget(self.colorView)
 
-        self.timeLine = Qtw.QListWidget()
+        self.model = TimelineModel(self)
+        self.timeLine = Qtw.QListView()
+        self.timeLine.setModel(self.model)
+        self.timeLine.setItemDelegate(TimelineDelegate(QtCore.QSize(int(self.listWidth*0.95), int(self.listWidth*0.85)), self.timeLine))
+        self.timeLine.setUniformItemSizes(True) # Rows are laid out without querying each of them
+        self.timeLine.setSelectionMode(Qtw.QAbstractItemView.SingleSelection)
 
         if horizontalDisplay:
             self.layout = Qtw.QHBoxLayout(self.colorView)
@@ -172,20 +339,101 @@ class AnimationList(Qtw.QWidget):
         self.layout.setContentsMargins(1, 1, 1, 1)
         
         self.timeLine.setDragDropMode(Qtw.QAbstractItemView.InternalMove)
+        self.timeLine.setDefaultDropAction(QtCore.Qt.MoveAction)
         self.layout.addWidget(self.timeLine)
         self.layout.setStretchFactor(self.timeLine,1)
 
         self.layout.addWidget(self.addFrameButton)
 
-        self.frameList = [] #Store all frames
+        self.timeLine.selectionModel().currentChanged.connect(self.frameSelectionChanged)
+
+        ## Thumbnails, only drawn for the visible frames
+        illustrationWidth = int(self.listWidth*0.85)
+        self.thumbnailRenderer = ThumbnailRenderer(QtCore.QSize(illustrationWidth, int(illustrationWidth*0.9)), parent=self)
+        self.thumbnailRenderer.thumbnailReady.connect(self.thumbnailReady)
+        self.waitingThumbnails = {} # Key of the thumbnails being drawn -> frames
+        self.thumbnailTimer = QtCore.QTimer(self, singleShot=True, interval=0, timeout=self.updateVisibleThumbnails)
+        self.timeLine.verticalScrollBar().valueChanged.connect(self.scheduleThumbnailUpdate)
+        self.timeLine.horizontalScrollBar().valueChanged.connect(self.scheduleThumbnailUpdate)
+        self.model.rowsInserted.connect(self.scheduleThumbnailUpdate)
+        self.model.rowsRemoved.connect(self.scheduleThumbnailUpdate)
+        self.model.rowsMoved.connect(self.scheduleThumbnailUpdate)
+        self.model.modelReset.connect(self.scheduleThumbnailUpdate)
 
         ## Menu
         self._contextMenu = Qtw.QMenu(self)
         self._contextMenu.addAction('Delete', self.menuDeleteFrame)
         #self._animation = QtCore.QPropertyAnimation(self._contextMenu, b'geometry', self, easingCurve=QtCore.QEasingCurve.Linear, duration=100)
+
+    @property
+    def frameList(self) -> list:
+        """ All frames of the animation, in order."""
+        return self.model.frames
+
+    def setBlankIllustration(self, image : QPixmap):
+        """ Set the illustration of the frames not drawn yet."""
+        self.model.blankIllustration = image
+        self.timeLine.viewport().update()
+
+    def appendFrame(self, frame : CubeLEDFrame):
+        self.model.appendFrames([frame])
+
+    def appendFrames(self, frames : list):
+        self.model.appendFrames(frames)
+
+    def getSelectedFrame(self) -> CubeLEDFrame:
+        """ Return the selected frame, None if the timeline is empty."""
+        index = self.timeLine.currentIndex()
+        return self.model.getFrame(index.row()) if index.isValid() else None
         
     def changeFrameSelected(self, frame : CubeLEDFrame):
-        self.timeLine.setCurrentItem(frame)
+        self.timeLine.setCurrentIndex(self.model.index(self.model.rowOf(frame)))
+
+    def invalidateThumbnail(self, frame : CubeLEDFrame):
+        """ Redraw the illustration of a frame whose data changed, once it is visible."""
+        frame.thumbnailOutdated = True
+        self.scheduleThumbnailUpdate()
+
+    def scheduleThumbnailUpdate(self):
+        self.thumbnailTimer.start() # Several requests in a row lead to a single update
+
+    def visibleRows(self) -> range:
+        """ Return the rows intersecting the viewport of the timeline."""
+        if self.model.rowCount() == 0:
+            return range(0)
+        viewport = self.timeLine.viewport().rect()
+        first = self.timeLine.indexAt(viewport.topLeft())
+        last = self.timeLine.indexAt(viewport.bottomRight())
+        firstRow = first.row() if first.isValid() else 0
+        lastRow = last.row() if last.isValid() else self.model.rowCount() - 1
+        return range(firstRow, lastRow + 1)
+
+    def updateVisibleThumbnails(self):
+        """ Request the outdated illustrations of the frames shown in the timeline."""
+        for row in self.visibleRows():
+            frame = self.model.getFrame(row)
+            if frame.thumbnailOutdated:
+                frame.thumbnailKey, pixmap = self.thumbnailRenderer.request(frame.getFrameData().getArray())
+                frame.thumbnailOutdated = False
+                if pixmap is not None:
+                    frame.setIllustration(pixmap)
+                    self.model.frameIllustrationChanged(frame)
+                else:
+                    self.waitingThumbnails.setdefault(frame.thumbnailKey, []).append(frame)
+
+    def thumbnailReady(self, key, pixmap : QPixmap):
+        for frame in self.waitingThumbnails.pop(key, []):
+            if frame.thumbnailKey == key and self.model.hasFrame(frame):
+                frame.setIllustration(pixmap)
+                self.model.frameIllustrationChanged(frame)
+
+    def resizeEvent(self, event):
+        super(AnimationList, self).resizeEvent(event)
+        self.scheduleThumbnailUpdate()
+
+    def showEvent(self, event):
+        super(AnimationList, self).showEvent(event)
+        self.scheduleThumbnailUpdate()
     
     def contextMenuEvent(self, event):
         '''
@@ -200,17 +448,12 @@ class AnimationList(Qtw.QWidget):
         self._contextMenu.popup(event.globalPos())
     
     def menuDeleteFrame(self):
-        if len(self.frameList) > 1:
-            index = self.frameList.index(self.timeLine.selectedItems()[0])
-            self.frameList.pop(index)
-            self.timeLine.takeItem(index)
-            self.timeLine.setCurrentItem(self.frameList[min(index,len(self.frameList)-1)])
-            for i in range(index,len(self.frameList)):
-                self.frameList[i].frame.setTitle("#{}".format(i+1))
+        index = self.timeLine.currentIndex()
+        if self.model.rowCount() > 1 and index.isValid():
+            row = index.row()
+            self.model.removeRows(row, 1)
+            self.timeLine.setCurrentIndex(self.model.index(min(row, self.model.rowCount()-1)))
     
     def clearAllFrames(self):
-        size = len(self.frameList)
-        while size > 0:
-            self.frameList.pop()
-            self.timeLine.takeItem(size-1)
-            size -= 1
+        self.waitingThumbnails = {}
+        self.model.clear()
@@ -1,5 +1,7 @@
+import numpy as np
 from PyQt5 import QtWidgets as Qtw
 from PyQt5 import QtCore
+from PyQt5 import QtGui
 from PyQt5.QtGui import QColor
 
 from ..common.CTypes import CubeSize, Axis
@@ -58,100 +60,21 @@ QScrollArea {
 }
 """
 
-class LEDbutton(Qtw.QPushButton):
-    """Representation of an LED, get the color given by the parent when clicked.
-    
-    Attributes:
-        x, y, z (int): Position of the LED in the cube
-        LEDcolor (QColor): current color of the LED associated.
-        nullColor (QColor): Color displayed when an LED is erased.
-    """
-
-    def __init__(self, coordinates, newColor_signal:QtCore.pyqtSignal, eraseColor_signal:QtCore.pyqtSignal, parent):
-        """
-        Args:
-            coordinates (dict[Axis,int]): Position of the LED associated in the cube.
-            newColor_signal, eraseColor_signal (pyqtSignal): Signal emited when an LED color is changed or erased.
-            parent (QWidget): Need a method getCurrentColor()->QColor.
-        """
-        super(Qtw.QPushButton, self).__init__(parent, cursor=QtCore.Qt.PointingHandCursor, toolTip='({},{},{})'.format(coordinates[Axis.X], coordinates[Axis.Y], coordinates[Axis.Z]))
-        self.parent = parent
-
-        self.effect = Qtw.QGraphicsDropShadowEffect(self)
-        self.effect.setBlurRadius(1)
-        self.effect.setOffset(0, 0)
-        self.effect.setColor(QtCore.Qt.gray)
-        self.setGraphicsEffect(self.effect)
-
-
-        self.eraseColor_signal = eraseColor_signal
-        self.newColor_signal = newColor_signal
-        self.eraseColor_signal.connect(self.eraseColor)
-        self.newColor_signal.connect(self.changeColor)
-
-        self.nullColor = QColor(255,255,255)
-
-        self.x = coordinates[Axis.X]
-        self.y = coordinates[Axis.Y]
-        self.z = coordinates[Axis.Z]
-        self.LEDcolor = QColor(255,255,255) #White
-
-        self.setMinimumSize(20,20)
-        self.aspectRatio = 1.0
-        self.styleStr = "background-color: {}"
-
-        self.setStyleSheet(self.styleStr.format(self.LEDcolor.name()))
-
-        
-    def resizeEvent(self, event):
-        h = event.size().height()
-        w = event.size().width()
-        if w > self.aspectRatio*h:
-            w = int(self.aspectRatio*h)
-        else:
-            h = int(w/self.aspectRatio)
-        self.resize(w, h)
-    
-    def updateCurrentColor(self):
-        self.LEDcolor = self.parent.getCurrentColor()
-
-    def mousePressEvent(self, ev):
-        if ev.button() == QtCore.Qt.LeftButton:
-            newColor = self.parent.getCurrentColor()
-            if newColor == self.LEDcolor:
-                self.eraseColor_signal.emit(self.x, self.y, self.z)
-            else:
-                self.newColor_signal.emit(self.x, self.y, self.z, self.parent.getCurrentColor()) #Write new color
-            
-        elif ev.button() == QtCore.Qt.RightButton:
-            #Erase LED
-            self.eraseColor_signal.emit(self.x, self.y, self.z)
-            self.effect.setBlurRadius(1)
-    
-    def changeColor(self, posX :int, posY :int, posZ :int, color : QColor):
-        if posX == self.x and posY == self.y and posZ == self.z:
-            self.LEDcolor = color
-            self.setStyleSheet(self.styleStr.format(self.LEDcolor.name()))
-            self.effect.setBlurRadius(20)
-            self.effect.setColor(self.LEDcolor)
-    
-    def eraseColor(self, posX :int, posY :int, posZ :int):
-        if posX == self.x and posY == self.y and posZ == self.z:
-            self.LEDcolor = self.nullColor
-            self.setStyleSheet(self.styleStr.format(self.LEDcolor.name()))
-            self.effect.setBlurRadius(1)
-
-
-
-
 class CubeLayerView(Qtw.QWidget):
-    """ One layer of a cube.
+    """ One layer of a cube, all its LEDs are painted by the widget and picked from the mouse position.
+
+    Left click paints the LED with the color given by the parent, or erases it if it already has this color.
+    Right click erases the LED.
 
     Attributes:
         nbrColumn, nbrRow (int): Number of row and column of LEDs.
-        matrixLED (list[[LEDbutton]]): Store the representation of the LEDs in the layer.
+        coordinates (np.ndarray): Position (x,y,z) in the cube of the LED displayed in each cell, shape (nbrColumn, nbrRow, 3).
+        colors (np.ndarray): RGB color displayed in each cell, shape (nbrColumn, nbrRow, 3).
+        nullColor (QColor): Color displayed when an LED is erased.
     """
 
+    cellSpacing = 4
+    cellSize = 20
 
     def __init__(self, cubeSize, layerID, 
                  columnAxis : Axis, rowAxis : Axis, normalAxis : Axis, 
@@ -165,49 +88,113 @@ class CubeLayerView(Qtw.QWidget):
             newColor_signal, eraseColor_signal (pyqtSignal): Signal emited when an LED color is changed or erased.
             parent (QWidget): Need a method getCurrentColor()->QColor.
         """
-        super(Qtw.QWidget, self).__init__(parent)
+        super(Qtw.QWidget, self).__init__(parent, cursor=QtCore.Qt.PointingHandCursor)
         self._parent = parent
+        self.newColor_signal = newColor_signal
+        self.eraseColor_signal = eraseColor_signal
         self.nbrColumn = cubeSize.getSize(columnAxis)
         self.nbrRow = cubeSize.getSize(rowAxis)
 
         self.aspectRatio = self.nbrRow/self.nbrColumn
+        self.nullColor = QColor(255,255,255)
+        self.borderColor = QColor(QtCore.Qt.gray)
 
-        self.layout=Qtw.QGridLayout(self)
-        self.setLayout(self.layout)
-        self.layout.setSpacing(4)
-
-        self.matrixLED = []
-        self.LEDcoordinate = {}
-        self.LEDcoordinate[Axis.X] = 0
-        self.LEDcoordinate[Axis.Y] = 0
-        self.LEDcoordinate[Axis.Z] = 0
-        self.LEDcoordinate[normalAxis] = layerID
+        ## LED positions, rows are along the column axis to match the nominal representation
+        self.coordinates = np.zeros((self.nbrColumn, self.nbrRow, 3), dtype=np.intp)
+        self.coordinates[:,:,normalAxis.value] = layerID
+        if columnAxis == Axis.X: # To set bottom on the last layer 
+            self.coordinates[:,:,columnAxis.value] = np.arange(self.nbrColumn)[:,np.newaxis]
+        else:
+            self.coordinates[:,:,columnAxis.value] = np.arange(self.nbrColumn)[::-1,np.newaxis]
+        self.coordinates[:,:,rowAxis.value] = np.arange(self.nbrRow)[np.newaxis,:]
 
-        for i in range(self.nbrColumn):
-            self.matrixLED.append([])
-            
-            if columnAxis == Axis.X: # To set bottom on the last layer 
-                self.LEDcoordinate[columnAxis] = i
-            else:
-                self.LEDcoordinate[columnAxis] = self.nbrColumn - 1 - i
+        self.colors = np.empty((self.nbrColumn, self.nbrRow, 3), dtype=np.uint8)
+        self.colors[:] = self.nullColor.getRgb()[:3]
 
-            for j in range(self.nbrRow):
-                self.LEDcoordinate[rowAxis] = j
+        self.setMinimumSize(self.nbrRow * (self.cellSize//2 + self.cellSpacing), self.nbrColumn * (self.cellSize//2 + self.cellSpacing))
+        self.setSizePolicy(Qtw.QSizePolicy.Preferred, Qtw.QSizePolicy.Preferred)
 
-                self.matrixLED[i].append(LEDbutton(self.LEDcoordinate, newColor_signal, eraseColor_signal, self))
-                self.layout.addWidget(self.matrixLED[i][j],i,j)
+    def sizeHint(self):
+        return QtCore.QSize(self.nbrRow * (self.cellSize + self.cellSpacing), self.nbrColumn * (self.cellSize + self.cellSpacing))
 
     def getCurrentColor(self) -> QColor :
         return self._parent.getCurrentColor()
 
-    def resizeEvent(self, event):
-        h = event.size().height()
-        w = event.size().width()
-        if w > self.aspectRatio*h:
-            w = int(self.aspectRatio*h)
-        else:
-            h = int(w/self.aspectRatio)
-        self.resize(w, h)
+    def getPitch(self) -> float:
+        """ Distance between two consecutive LEDs in pixels."""
+        return min(self.width() / self.nbrRow, self.height() / self.nbrColumn)
+
+    def cellRect(self, i:int, j:int) -> QtCore.QRectF:
+        pitch = self.getPitch()
+        margin = min(self.cellSpacing, pitch/4) / 2
+        return QtCore.QRectF(j*pitch + margin, i*pitch + margin, pitch - 2*margin, pitch - 2*margin)
+
+    def cellAt(self, pos : QtCore.QPoint):
+        """ Return the (i,j) cell under a position in the widget, None if outside the grid."""
+        pitch = self.getPitch()
+        if pitch <= 0:
+            return None
+        i, j = int(pos.y() // pitch), int(pos.x() // pitch)
+        if 0 <= i < self.nbrColumn and 0 <= j < self.nbrRow:
+            return i, j
+        return None
+
+    def getLEDcolor(self, i:int, j:int) -> QColor:
+        return QColor(*self.colors[i,j].tolist())
+
+    def setLEDcolor(self, i:int, j:int, color : QColor):
+        self.colors[i,j] = color.getRgb()[:3]
+        self.update(self.cellRect(i,j).toAlignedRect().adjusted(-2,-2,2,2))
+
+    def setColors(self, colors : np.ndarray):
+        """ Update all the cells at once from a (nbrColumn, nbrRow, 3) uint8 array."""
+        self.colors[:] = colors
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        nullRGB = self.nullColor.getRgb()[:3]
+        radius = self.getPitch() / 5
+        for i in range(self.nbrColumn):
+            for j in range(self.nbrRow):
+                rect = self.cellRect(i,j)
+                if not event.rect().intersects(rect.toAlignedRect()):
+                    continue
+                rgb = self.colors[i,j].tolist()
+                if tuple(rgb) == nullRGB:
+                    painter.setPen(QtGui.QPen(self.borderColor, 1))
+                    painter.setBrush(self.nullColor)
+                else: # Lit LEDs are surrounded by their own color
+                    painter.setPen(QtGui.QPen(QColor(rgb[0], rgb[1], rgb[2], 150), 3))
+                    painter.setBrush(QColor(*rgb))
+                painter.drawRoundedRect(rect, radius, radius)
+        painter.end()
+
+    def mousePressEvent(self, ev):
+        cell = self.cellAt(ev.pos())
+        if cell is None:
+            return
+        x, y, z = self.coordinates[cell].tolist()
+        if ev.button() == QtCore.Qt.LeftButton:
+            newColor = self.getCurrentColor()
+            if newColor.rgb() == self.getLEDcolor(*cell).rgb():
+                self.eraseColor_signal.emit(x, y, z)
+            else:
+                self.newColor_signal.emit(x, y, z, newColor) #Write new color
+        elif ev.button() == QtCore.Qt.RightButton:
+            #Erase LED
+            self.eraseColor_signal.emit(x, y, z)
+
+    def event(self, ev):
+        if ev.type() == QtCore.QEvent.ToolTip:
+            cell = self.cellAt(ev.pos())
+            if cell is not None:
+                Qtw.QToolTip.showText(ev.globalPos(), '({},{},{})'.format(*self.coordinates[cell].tolist()), self)
+            else:
+                Qtw.QToolTip.hideText()
+            return True
+        return super(CubeLayerView, self).event(ev)
 
 
 
@@ -263,6 +250,9 @@ class Cube3DView(Qtw.QScrollArea):
     
     def getCurrentColor(self) -> QColor :
         return self._parent.getCurrentColor()
+    
+    def getLayers(self) -> list:
+        return self.ledLayers
 
 
 
@@ -271,6 +261,7 @@ class CCubeViewerSliced(Qtw.QWidget):
     
     Attributes:
         cubeSize (CubeSize)): Number of LEDs along each axis.
+        ledDispatch (dict[tuple,list[tuple]]): Cells (CubeLayerView, i, j) displaying each (x,y,z) position, one per tab.
     """
 
     def __init__(self, cubeSize:CubeSize, newColor_signal:QtCore.pyqtSignal, eraseColor_signal:QtCore.pyqtSignal, parent):
@@ -301,7 +292,10 @@ class CCubeViewerSliced(Qtw.QWidget):
 
         self.newColor_signal = newColor_signal
         self.eraseColor_signal = eraseColor_signal
+        self.newColor_signal.connect(self.changeColor)
+        self.eraseColor_signal.connect(self.eraseColor)
 
+        self.ledDispatch = {}
         self.cubeSize = cubeSize
         self.createTabs(self.cubeSize)
         
@@ -336,9 +330,37 @@ class CCubeViewerSliced(Qtw.QWidget):
         self.tabWidget.addTab(self.cube_BackView, "Back to front")
         self.tabWidget.addTab(self.cube_LeftView, "Left to right")
         self.tabWidget.addTab(self.cube_BottomView, "Bottom to top")
+
+        self.ledLayers = []
+        self.ledDispatch = {}
+        for view in (self.cube_BackView, self.cube_LeftView, self.cube_BottomView):
+            for layer in view.getLayers():
+                self.ledLayers.append(layer)
+                for (i, j), position in zip(np.ndindex(layer.coordinates.shape[:2]), layer.coordinates.reshape(-1,3).tolist()):
+                    self.ledDispatch.setdefault(tuple(position), []).append((layer, i, j))
+    
+    def changeColor(self, posX :int, posY :int, posZ :int, color : QColor):
+        for layer, i, j in self.ledDispatch.get((posX, posY, posZ), []):
+            layer.setLEDcolor(i, j, color)
+    
+    def eraseColor(self, posX :int, posY :int, posZ :int):
+        for layer, i, j in self.ledDispatch.get((posX, posY, posZ), []):
+            layer.setLEDcolor(i, j, layer.nullColor)
     
     def changeCubeSize(self, cubeSize:CubeSize):
         """Change sizes of the cube."""
         self.erase()
         self.createTabs(cubeSize)
+    
+    def applyFrame(self, colors : np.ndarray, mask : np.ndarray = None):
+        """Display a whole frame at once in the three tabs.
+
+        Args:
+            colors (np.ndarray): uint8 array of shape (X, Y, Z, 3).
+            mask (np.ndarray): Boolean array of shape (X, Y, Z), only the LEDs set are updated. All LEDs if None.
+        """
+        for layer in self.ledLayers:
+            x, y, z = layer.coordinates[...,0], layer.coordinates[...,1], layer.coordinates[...,2]
+            if mask is None or mask[x, y, z].any():
+                layer.setColors(colors[x, y, z])
     
\ No newline at end of file
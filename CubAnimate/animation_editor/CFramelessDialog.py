@@ -1,12 +1,17 @@
 from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal, QMimeData, QRect, QThread
 from PyQt5.QtGui import QPalette, QPixmap, QIcon, QColor, QPainter
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QWidget,\
-    QGraphicsDropShadowEffect, QPushButton, QGridLayout, QSpacerItem, QSizePolicy, QLabel, QFileDialog
+    QGraphicsDropShadowEffect, QPushButton, QGridLayout, QSpacerItem, QSizePolicy, QLabel, QFileDialog,\
+    QComboBox, QLineEdit, QSpinBox, QDoubleSpinBox, QStackedWidget, QCheckBox
 from PyQt5.QtSvg import QSvgWidget
 
+import os
 import sys
 from math import ceil
 
+from ..common.COutputStage import ColorCorrection, PowerLimiter
+from ..common.CFrameOutput import FrameTransport, SerialTransport, UDPTransport, PtyTransport, has_serial, FORMAT_RGB888, FORMAT_PALETTE8
+
 
 class DropArea(QPushButton):
     Stylesheet = """
@@ -87,7 +92,7 @@ class DropArea(QPushButton):
     
     def isAnimation(self, file:QMimeData):
         if file.hasText():
-            return file.text()[-5:] == '.anim'
+            return file.text().lower().endswith(('.anim', '.canim'))
         return False
 
     def resizeEvent(self, event):
@@ -96,13 +101,17 @@ class DropArea(QPushButton):
         self.svgWidget.setFixedSize(min(h,w)*0.8,min(h,w)*0.8)
     
     def searchFile(self):
-        directoryName, fileExtension = QFileDialog.getOpenFileName(self, 'Load animation',"./","Animation Files (*.anim)")
+        directoryName, fileExtension = QFileDialog.getOpenFileName(self, 'Load animation',"./","Animation Files (*.anim *.canim)")
         self.loadNewAnimation_signal.emit(directoryName)
 
 
 
-class NewAnimationDialog(QDialog):
-    
+class FramelessDialog(QDialog):
+    """ Modal pop-up without window frame, drawn as a white rounded box casting a shadow.
+
+    Subclasses build their content in the grid layout returned by initFrame.
+    """
+
     Stylesheet = """
     #Custom_Widget {
         background: white;
@@ -136,21 +145,15 @@ class NewAnimationDialog(QDialog):
     }
 
     """
-    loadNewAnimation_signal = pyqtSignal(str)
 
     def __init__(self, *args, **kwargs):
-        super(NewAnimationDialog, self).__init__(*args, **kwargs)
-
-        self.fileLocation = ''
-        self.createAnimation = True
-        self.loadNewAnimation_signal.connect(self.setFileLocation)
+        super(FramelessDialog, self).__init__(*args, **kwargs)
 
         self.setObjectName('Custom_Dialog')
         self.setModal(True)
         self.setWindowFlags(self.windowFlags() | Qt.FramelessWindowHint)
         self.setAttribute(Qt.WA_TranslucentBackground, True)
         self.setStyleSheet(self.Stylesheet)
-        self.initUi()
 
         # 添加阴影
         effect = QGraphicsDropShadowEffect(self)
@@ -159,22 +162,40 @@ class NewAnimationDialog(QDialog):
         effect.setColor(Qt.gray)
         self.setGraphicsEffect(effect)
 
-    def initUi(self):
-        self.layout = QVBoxLayout(self)
+    def initFrame(self) -> QGridLayout:
+        """ Create the white box filling the dialog and return its layout."""
+        layout = QVBoxLayout(self)
         # 重点： 这个widget作为背景和圆角
         self.widget = QWidget(self)
         self.widget.setObjectName('Custom_Widget')
-        self.layout.addWidget(self.widget)
+        layout.addWidget(self.widget)
+        return QGridLayout(self.widget)
 
+    def createCloseButton(self) -> QPushButton:
+        return QPushButton('r', self, clicked=self.reject, objectName='closeButton')
+
+
+class NewAnimationDialog(FramelessDialog):
+
+    loadNewAnimation_signal = pyqtSignal(str)
+
+    def __init__(self, *args, **kwargs):
+        super(NewAnimationDialog, self).__init__(*args, **kwargs)
+
+        self.fileLocation = ''
+        self.createAnimation = True
+        self.loadNewAnimation_signal.connect(self.setFileLocation)
+        self.initUi()
+
+    def initUi(self):
         # 在widget中添加ui
-        self.layout = QGridLayout(self.widget)
+        self.layout = self.initFrame()
         self.layout.addItem(QSpacerItem(
             40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum), 0, 0)
         self.layout.addWidget(QLabel('Load animation', self), 0, 1)
         self.layout.addItem(QSpacerItem(
             40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum), 0, 2)
-        self.layout.addWidget(QPushButton(
-            'r', self, clicked=self.reject, objectName='closeButton'), 0, 3)
+        self.layout.addWidget(self.createCloseButton(), 0, 3)
         self.layout.addItem(QSpacerItem(20, 40, QSizePolicy.Minimum,
                                    QSizePolicy.Expanding), 2, 0)
         
@@ -206,6 +227,141 @@ class NewAnimationDialog(QDialog):
 
     
 
+class FrameOutputDialog(FramelessDialog):
+    """ Pop-up choosing the link used to stream the frames to the cube."""
+
+    SERIAL = 'Serial port'
+    UDP = 'Network (UDP)'
+    PTY = 'Pseudo-terminal'
+    FORMATS = {'RGB, 3 bytes per LED': FORMAT_RGB888, 'Palette, 1 byte per LED': FORMAT_PALETTE8}
+
+    def __init__(self, *args, **kwargs):
+        super(FrameOutputDialog, self).__init__(*args, **kwargs)
+        self.initUi()
+
+    def initUi(self):
+        layout = self.initFrame()
+        layout.addWidget(QLabel('Stream to cube', self), 0, 0, 1, 2)
+        layout.addWidget(self.createCloseButton(), 0, 2)
+
+        self.transportBox = QComboBox(self)
+        layout.addWidget(self.transportBox, 1, 0, 1, 3)
+
+        ## One page of settings per transport
+        self.settingsStack = QStackedWidget(self)
+        self.transportBox.currentIndexChanged.connect(self.settingsStack.setCurrentIndex)
+        layout.addWidget(self.settingsStack, 2, 0, 1, 3)
+
+        if has_serial:
+            page = QWidget(self)
+            pageLayout = QGridLayout(page)
+            self.serialPortEdit = QLineEdit('COM3' if sys.platform.startswith('win') else '/dev/ttyUSB0', page)
+            self.baudrateBox = QComboBox(page)
+            self.baudrateBox.addItems(['115200', '500000', '1000000', '2000000'])
+            self.baudrateBox.setCurrentText('1000000')
+            pageLayout.addWidget(self.serialPortEdit, 0, 0)
+            pageLayout.addWidget(self.baudrateBox, 0, 1)
+            self.settingsStack.addWidget(page)
+            self.transportBox.addItem(self.SERIAL)
+
+        page = QWidget(self)
+        pageLayout = QGridLayout(page)
+        self.hostEdit = QLineEdit('192.168.4.1', page)
+        self.udpPortBox = QSpinBox(page, minimum=1, maximum=65535, value=7777)
+        pageLayout.addWidget(self.hostEdit, 0, 0)
+        pageLayout.addWidget(self.udpPortBox, 0, 1)
+        self.settingsStack.addWidget(page)
+        self.transportBox.addItem(self.UDP)
+
+        if hasattr(os, 'openpty'): # POSIX only
+            self.settingsStack.addWidget(QLabel('The device name is shown once streaming', self))
+            self.transportBox.addItem(self.PTY)
+
+        self.formatBox = QComboBox(self)
+        self.formatBox.addItems(list(self.FORMATS.keys()))
+        layout.addWidget(self.formatBox, 3, 0, 1, 3)
+
+        self.startButton = QPushButton('Start streaming', self, clicked=self.accept, cursor=Qt.PointingHandCursor, objectName='Custom_Button')
+        layout.addWidget(self.startButton, 4, 0, 1, 3)
+
+    def getTransport(self) -> FrameTransport:
+        """ Return the transport described by the dialog."""
+        transport = self.transportBox.currentText()
+        if transport == self.SERIAL:
+            return SerialTransport(self.serialPortEdit.text(), int(self.baudrateBox.currentText()))
+        if transport == self.UDP:
+            return UDPTransport(self.hostEdit.text(), self.udpPortBox.value())
+        return PtyTransport()
+
+    def getFormat(self) -> int:
+        return self.FORMATS[self.formatBox.currentText()]
+
+
+class OutputSettingsDialog(FramelessDialog):
+    """ Pop-up setting the color correction and the power limit of the output frames."""
+
+    def __init__(self, correction : ColorCorrection, limiter : PowerLimiter, report = None, *args, **kwargs):
+        """
+        Args:
+            report (PowerReport): Power drawn by the current animation, shown if given.
+        """
+        super(OutputSettingsDialog, self).__init__(*args, **kwargs)
+        self.initUi(correction, limiter, report)
+
+    def initUi(self, correction : ColorCorrection, limiter : PowerLimiter, report):
+        layout = self.initFrame()
+        layout.addWidget(QLabel('Output colors', self), 0, 0, 1, 3)
+        layout.addWidget(self.createCloseButton(), 0, 3)
+        layout.addWidget(QLabel('Gamma', self), 1, 1)
+        layout.addWidget(QLabel('Balance', self), 1, 2)
+        layout.addWidget(QLabel('mA', self), 1, 3)
+
+        self.gammaBoxes = []
+        self.balanceBoxes = []
+        self.currentBoxes = []
+        for row, (channel, gamma, balance, current) in enumerate(zip(('Red', 'Green', 'Blue'), correction.gamma, correction.whiteBalance, limiter.channelCurrent)):
+            self.gammaBoxes.append(QDoubleSpinBox(self, minimum=0.1, maximum=4.0, singleStep=0.1, decimals=2, value=gamma))
+            self.balanceBoxes.append(QDoubleSpinBox(self, minimum=0.0, maximum=1.0, singleStep=0.05, decimals=2, value=balance))
+            self.currentBoxes.append(QDoubleSpinBox(self, minimum=0.0, maximum=100.0, singleStep=1.0, decimals=1, value=current, toolTip='Current of the channel at full value'))
+            layout.addWidget(QLabel(channel, self), row + 2, 0)
+            layout.addWidget(self.gammaBoxes[-1], row + 2, 1)
+            layout.addWidget(self.balanceBoxes[-1], row + 2, 2)
+            layout.addWidget(self.currentBoxes[-1], row + 2, 3)
+
+        self.brightnessBox = QSpinBox(self, minimum=0, maximum=100, suffix=' %', value=int(round(correction.brightness * 100)))
+        layout.addWidget(QLabel('Brightness', self), 5, 0)
+        layout.addWidget(self.brightnessBox, 5, 1, 1, 2)
+
+        ## Power limit
+        self.limiterBox = QCheckBox('Power limit', self, checked=limiter.enabled)
+        self.budgetBox = QDoubleSpinBox(self, minimum=0.1, maximum=1000.0, singleStep=0.5, decimals=1, suffix=' A', value=limiter.budget / 1000)
+        self.voltageBox = QDoubleSpinBox(self, minimum=1.0, maximum=48.0, singleStep=0.5, decimals=1, suffix=' V', value=limiter.voltage)
+        self.smoothingBox = QSpinBox(self, minimum=1, maximum=120, suffix=' frames', value=limiter.smoothingFrames, toolTip='Frames over which the brightness changes')
+        layout.addWidget(self.limiterBox, 6, 0)
+        layout.addWidget(self.budgetBox, 6, 1)
+        layout.addWidget(self.voltageBox, 6, 2)
+        layout.addWidget(self.smoothingBox, 6, 3)
+
+        if report is not None:
+            reportLabel = QLabel(str(report), self, wordWrap=True)
+            reportLabel.setStyleSheet('font-size: 14px;')
+            layout.addWidget(reportLabel, 7, 0, 1, 4)
+
+        layout.addWidget(QPushButton('Apply', self, clicked=self.accept, cursor=Qt.PointingHandCursor, objectName='Custom_Button'), 8, 0, 1, 4)
+
+    def getParameters(self) -> tuple:
+        """ Return the (gamma, whiteBalance, brightness) parameters of ColorCorrection.setParameters."""
+        return (tuple(box.value() for box in self.gammaBoxes), tuple(box.value() for box in self.balanceBoxes), self.brightnessBox.value() / 100)
+
+    def applyLimits(self, limiter : PowerLimiter):
+        """ Copy the power settings into a limiter."""
+        limiter.enabled = self.limiterBox.isChecked()
+        limiter.budget = self.budgetBox.value() * 1000
+        limiter.voltage = self.voltageBox.value()
+        limiter.smoothingFrames = self.smoothingBox.value()
+        limiter.channelCurrent = tuple(box.value() for box in self.currentBoxes)
+
+
 class LoadingDialog(QDialog):
     def __init__(self, *args, **kwargs):
         super(LoadingDialog, self).__init__(*args, **kwargs)
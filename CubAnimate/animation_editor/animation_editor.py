@@ -1,13 +1,21 @@
+import numpy as np
 from PyQt5 import QtWidgets as Qtw
 from PyQt5 import QtCore
 from PyQt5.QtGui import QColor, QPixmap, QKeySequence
 
 from ..common.CubeViewer3D import CubeViewer3DInteract
 from ..common.CToolBox.CToolBox import CToolBox_Animator
-from ..common.CTypes import Axis, CubeSize
+from ..common.CTypes import Axis, CubeSize, CubeLEDFrame_DATA
+from ..common.CAnimationFile import ANIM_EXTENSION, openAnimationFile, createAnimationWriter
+from ..common.CAnimationBinary import BINARY_EXTENSION, COMPRESSION_NONE, COMPRESSION_DELTA_RLE, COMPRESSION_PALETTE8
+from ..common.CPalette import buildPalette
+from ..common.COutputStage import OutputPipeline, loadColorCorrection, saveColorCorrection, loadPowerLimiter, savePowerLimiter
+from ..common.CAnimationPlayer import AnimationPlayer
+from ..common.CFrameOutput import FrameOutputThread
+from ..common.CFramePacking import PACKED_EXTENSION, HEADER_EXTENSION, PACKING_NAMES, PACK_BCM, packAnimation
 from .CCubeViewerSliced import CCubeViewerSliced
 from .CAnimationTimeline import AnimationList, CubeLEDFrame
-from .CFramelessDialog import NewAnimationDialog
+from .CFramelessDialog import NewAnimationDialog, FrameOutputDialog, OutputSettingsDialog
 
 
 class DimmingLayerWidget(Qtw.QWidget):
@@ -28,6 +36,10 @@ class DimmingLayerWidget(Qtw.QWidget):
         color: white;
         background: rgb(190, 0, 0);
     }
+    #playbackStats {
+        color: white;
+        font-size: 14px;
+    }
     """
 
     def __init__(self, dimmedWidget:Qtw.QWidget, focusedWidget:Qtw.QWidget):
@@ -45,6 +57,8 @@ class DimmingLayerWidget(Qtw.QWidget):
         self.lower()
         self.exitButton = Qtw.QPushButton('r', self, clicked=lambda:self.dimOut(False), objectName='closeButton')
         self.exitButton.hide()
+        self.statsLabel = Qtw.QLabel(self, objectName='playbackStats')
+        self.statsLabel.hide()
 
         ## Animations
         self.animFadeIn = QtCore.QPropertyAnimation(self, duration=50, easingCurve=QtCore.QEasingCurve.Linear)
@@ -67,6 +81,8 @@ class DimmingLayerWidget(Qtw.QWidget):
                 self.animFadeIn.setEndValue(100)
                 self.animFadeIn.start()
                 self.exitButton.show()
+                self.statsLabel.setText('')
+                self.statsLabel.show()
 
         else:
             if self.isOn:
@@ -78,6 +94,7 @@ class DimmingLayerWidget(Qtw.QWidget):
                 self.animFadeOut.start()
                 #self.lower()
                 self.exitButton.hide()
+                self.statsLabel.hide()
 
     def getOpacityDim(self):
         return self.opacity
@@ -90,6 +107,11 @@ class DimmingLayerWidget(Qtw.QWidget):
 
     def moveButton(self, upRightWindowX:int, upRightWindowY:int):
         self.exitButton.move(upRightWindowX + 20, upRightWindowY)
+        self.statsLabel.move(upRightWindowX + 20, upRightWindowY + 70)
+
+    def setStats(self, text:str):
+        self.statsLabel.setText(text)
+        self.statsLabel.adjustSize()
 
 
 
@@ -111,6 +133,9 @@ class Animator(Qtw.QWidget):
     eraseColorLED_signal = QtCore.pyqtSignal(int,int,int)
     saveAnimation_signal = QtCore.pyqtSignal()
     playAnimation_signal = QtCore.pyqtSignal()
+    streamAnimation_signal = QtCore.pyqtSignal(bool)
+    exportAnimation_signal = QtCore.pyqtSignal()
+    outputSettings_signal = QtCore.pyqtSignal()
 
     stylesheet = """
     QSplitter::handle:vertical {
@@ -140,7 +165,7 @@ class Animator(Qtw.QWidget):
         self.setStyleSheet(self.stylesheet)
 
         ## Widget instantiation
-        self.toolBox = CToolBox_Animator(False, False, self.saveAnimation_signal, self.playAnimation_signal, self)
+        self.toolBox = CToolBox_Animator(False, False, self.saveAnimation_signal, self.playAnimation_signal, self.streamAnimation_signal, self.exportAnimation_signal, self.outputSettings_signal, self)
         self.cubeViewer = CubeViewer3DInteract(True, self.cubeSize, self.newColorLED_signal, self.eraseColorLED_signal, self)
         self.cubeSliced = CCubeViewerSliced(self.cubeSize, self.newColorLED_signal, self.eraseColorLED_signal, self)
         self.animationViewer = AnimationList(self.cubeSize, self.animatorWidth)
@@ -170,8 +195,21 @@ class Animator(Qtw.QWidget):
         ## Dim out layer
         self.alphaWidget = DimmingLayerWidget(self, self.cubeViewer)
 
+        ## Playback
+        self.player = None
+        self.alphaWidget.exitButton.clicked.connect(self.stopAnimation)
+
+        ## Output to the hardware
+        self.colorCorrection = loadColorCorrection()
+        self.powerLimiter = loadPowerLimiter()
+        self.outputPipeline = OutputPipeline([self.colorCorrection, self.powerLimiter]) # Applied to exports and streaming, not to saving
+        self.frameOutput = None
+        self.outputTimer = QtCore.QTimer(self, singleShot=True, interval=0, timeout=self.streamCurrentFrame) # Once the edit is applied to the frame
+        Qtw.QApplication.instance().aboutToQuit.connect(self.stopStreaming)
+
         ## Other
-        self.blankIllustration = self.getCurrentCubePixmap()
+        self.blankIllustration = self.getBlankIllustration()
+        self.animationViewer.setBlankIllustration(self.blankIllustration)
         #self.currentSelectedFrame = self.addFrame()
         self.currentSelectedFrame = None
 
@@ -179,7 +217,7 @@ class Animator(Qtw.QWidget):
         #self.newColorLED_signal.connect(self.currentSelectedFrame.getFrameData().setColorLED)
         #self.eraseColorLED_signal.connect(self.currentSelectedFrame.getFrameData().eraseColorLED)
         self.animationViewer.addFrameButton.clicked.connect(self.addFrame)
-        self.animationViewer.timeLine.itemSelectionChanged.connect(self.changeCurrentFrame)
+        self.animationViewer.frameSelectionChanged.connect(self.changeCurrentFrame)
 
         self.newColorLED_signal.connect(self.notSaved)
         self.eraseColorLED_signal.connect(self.notSaved)
@@ -187,6 +225,11 @@ class Animator(Qtw.QWidget):
 
         self.saveAnimation_signal.connect(self.saveAnimation)
         self.playAnimation_signal.connect(self.playAnimation)
+        self.streamAnimation_signal.connect(self.toggleStreaming)
+        self.exportAnimation_signal.connect(self.exportAnimation)
+        self.outputSettings_signal.connect(self.editOutputSettings)
+        self.newColorLED_signal.connect(self.outputTimer.start)
+        self.eraseColorLED_signal.connect(self.outputTimer.start)
         self.SaveShortcut = Qtw.QShortcut(QKeySequence("Ctrl+S"), self)
         self.SaveShortcut.activated.connect(self.saveAnimation)
 
@@ -199,6 +242,11 @@ class Animator(Qtw.QWidget):
         """ Return the color selected in the widget colorPicker(ColorPicker)."""
         return self.toolBox.getColor()
     
+    def getBlankIllustration(self) -> QPixmap:
+        """ Return the timeline illustration of an erased frame."""
+        blankColors = CubeLEDFrame_DATA(self.cubeSize).getArray()
+        return self.animationViewer.thumbnailRenderer.render(blankColors)
+
     def getCurrentCubePixmap(self) -> QPixmap:
         """ Return the vizualisation of the widget cubeViewer(CubeViewer3DInteract)."""
         illustrationWidth = self.animatorWidth*0.85
@@ -210,77 +258,133 @@ class Animator(Qtw.QWidget):
         self.waitingCursor_signal.emit(True)
 
         if self.currentSelectedFrame != None:
-            self.currentSelectedFrame.setIllustration(self.getCurrentCubePixmap()) #Update illustration of the leaved frame
+            self.animationViewer.invalidateThumbnail(self.currentSelectedFrame) #Update illustration of the leaved frame
         
-        if len(self.animationViewer.timeLine.selectedItems()) > 0:
-            newFrame = self.animationViewer.timeLine.selectedItems()[0] 
+        newFrame = self.animationViewer.getSelectedFrame()
+        if newFrame != None:
             newFrameData = newFrame.getFrameData()
-            newSize = newFrameData.getSize()
 
             if self.currentSelectedFrame != None:
-                if self.currentSelectedFrame.getFrameData().getSize() == newSize: #Verify size compatibility
+                if self.currentSelectedFrame.getFrameData().getSize().getShape() == newFrameData.getSize().getShape(): #Verify size compatibility
                     self.newColorLED_signal.disconnect(self.currentSelectedFrame.getFrameData().setColorLED) #Disconnect old frame
                     self.eraseColorLED_signal.disconnect(self.currentSelectedFrame.getFrameData().eraseColorLED)
-                    for x in range(newSize.getSize(Axis.X)):
-                        for y in range(newSize.getSize(Axis.Y)):
-                            for z in range(newSize.getSize(Axis.Z)):
-                                newColor = newFrameData.getColorLED(x,y,z)
-                                if self.cubeViewer.getDisplayedColor(x,y,z).name() != newColor.name():  #Great gain in refresh speed if the frames are similare
-                                    self.newColorLED_signal.emit(x,y,z, newColor)
-
-                    self.currentSelectedFrame = newFrame
-                    self.newColorLED_signal.connect(self.currentSelectedFrame.getFrameData().setColorLED) #Connect new frame
-                    self.eraseColorLED_signal.connect(self.currentSelectedFrame.getFrameData().eraseColorLED)
                 else:
                     print("Cube size incompatibility")
-            else:
-                print('enter')
-                for x in range(newSize.getSize(Axis.X)):
-                    for y in range(newSize.getSize(Axis.Y)):
-                        for z in range(newSize.getSize(Axis.Z)):
-                            newColor = newFrameData.getColorLED(x,y,z)
-                            #print(newColor.name() + ' ' + self.cubeViewer.getDisplayedColor(x,y,z).name())
-                            if self.cubeViewer.getDisplayedColor(x,y,z).name() != newColor.name():  #Great gain in refresh speed if the frames are similare
-                                self.newColorLED_signal.emit(x,y,z, newColor)
-                self.currentSelectedFrame = newFrame
-                self.newColorLED_signal.connect(self.currentSelectedFrame.getFrameData().setColorLED) #Connect new frame
-                self.eraseColorLED_signal.connect(self.currentSelectedFrame.getFrameData().eraseColorLED)
+                    self.waitingCursor_signal.emit(False)
+                    return
+
+            self.displayFrame(newFrameData)
+            self.currentSelectedFrame = newFrame
+            self.newColorLED_signal.connect(self.currentSelectedFrame.getFrameData().setColorLED) #Connect new frame
+            self.eraseColorLED_signal.connect(self.currentSelectedFrame.getFrameData().eraseColorLED)
         
         self.waitingCursor_signal.emit(False)
+    
+    def displayFrame(self, frameData : CubeLEDFrame_DATA):
+        """ Show a frame in all the views, only the LEDs which differ from the displayed frame are updated."""
+        colors = frameData.getArray()
+        changedMask = np.any(self.cubeViewer.getDisplayedArray() != colors, axis=-1) #Great gain in refresh speed if the frames are similare
+        self.cubeViewer.applyFrame(colors, changedMask)
+        self.cubeSliced.applyFrame(colors, changedMask)
+        self.streamFrame(colors)
 
     
     def addFrame(self) -> CubeLEDFrame:
         """ Create and add a new frame to the animation."""
-        num = len(self.animationViewer.frameList)
-        frameWidth = self.animatorWidth*0.9
-        self.animationViewer.frameList.append(CubeLEDFrame('#{}'.format(num+1), self.cubeSize,frameWidth , self.animationViewer.timeLine, self.animationViewer))
-        self.animationViewer.changeFrameSelected(self.animationViewer.frameList[num])
-        self.animationViewer.frameList[num].setIllustration(self.blankIllustration)
+        frame = self.appendFrame()
+        self.animationViewer.changeFrameSelected(frame)
         #self.cubeViewer.newFrameAnimation()
         self.animationSaved = False
-        return self.animationViewer.frameList[num]
+        return frame
+    
+    def appendFrame(self) -> CubeLEDFrame:
+        """ Create a new frame at the end of the animation without selecting it."""
+        frame = CubeLEDFrame(self.cubeSize)
+        self.animationViewer.appendFrame(frame)
+        return frame
     
     def saveAnimation(self):
-        fileLocation, fileExtension = Qtw.QFileDialog.getSaveFileName(self, 'Save File',"./{}".format(self.animationName.replace(' ','_')),"Animation Files (*.anim)")
+        fileLocation, fileExtension = Qtw.QFileDialog.getSaveFileName(self, 'Save File',"./{}".format(self.animationName.replace(' ','_')),"Animation Files (*.anim);;Binary Animation Files (*.canim);;Compressed Binary Animation Files (*.canim);;Palette Binary Animation Files (*.canim)")
 
         if len(fileLocation)>0:
-            file = open(fileLocation,'w')
-            headerLine = "{}-{},{},{}-{}\n".format(self.animationName, self.cubeSize.getSize(Axis.X), self.cubeSize.getSize(Axis.Y), self.cubeSize.getSize(Axis.Z), str(self.toolBox.getFPS()))
-            file.write(headerLine)
-            for frame in self.animationViewer.frameList:
-                frameSTR = frame.encodeData() + '\n'
-                file.write(frameSTR)
-            file.close()
+            if not fileLocation.lower().endswith((ANIM_EXTENSION, BINARY_EXTENSION)):
+                fileLocation += BINARY_EXTENSION if BINARY_EXTENSION in fileExtension else ANIM_EXTENSION
+            compression = COMPRESSION_DELTA_RLE if fileExtension.startswith('Compressed') else COMPRESSION_NONE
+            palette = None
+            if fileExtension.startswith('Palette') and fileLocation.lower().endswith(BINARY_EXTENSION):
+                compression = COMPRESSION_PALETTE8
+                palette = buildPalette(self.getFramesArray())
+                if not palette.exact:
+                    answer = Qtw.QMessageBox.warning(self, 'Save File', 'The animation uses more than {} colors, they will be replaced by the nearest colors of the palette.\nSave anyway?'.format(len(palette)),
+                                                     Qtw.QMessageBox.Save | Qtw.QMessageBox.Cancel, Qtw.QMessageBox.Cancel)
+                    if answer != Qtw.QMessageBox.Save:
+                        return self.animationSaved
+            with createAnimationWriter(fileLocation, self.animationName, self.cubeSize, self.toolBox.getFPS(), compression, palette) as writer:
+                for frame in self.animationViewer.frameList:
+                    writer.writeFrame(frame.getFrameData().getArray())
             self.animationSaved = True
         else:
             print('Saving canceled')
         
         return self.animationSaved
     
+    def getFramesArray(self) -> np.ndarray:
+        """ Return the (frames, X, Y, Z, 3) colors of the whole animation."""
+        return np.stack([frame.getFrameData().getArray() for frame in self.animationViewer.frameList])
+
+    def exportAnimation(self):
+        """ Export the animation for the hardware, through the output stages.
+
+        Frames are packed for a micro-controller (.cpk blob or C header) or written as an animation file (.anim or .canim).
+        """
+        if len(self.animationViewer.frameList) == 0:
+            return
+        extensions = {'Packed': PACKED_EXTENSION, 'C Header': HEADER_EXTENSION, 'Animation': ANIM_EXTENSION, 'Binary': BINARY_EXTENSION}
+        fileLocation, fileExtension = Qtw.QFileDialog.getSaveFileName(self, 'Export File',"./{}".format(self.animationName.replace(' ','_')),"Packed Frames (*.cpk);;C Header (*.h);;Animation Files (*.anim);;Binary Animation Files (*.canim)")
+        if len(fileLocation) == 0:
+            print('Export canceled')
+            return
+        if not fileLocation.lower().endswith(tuple(extensions.values())):
+            fileLocation += next((extension for key, extension in extensions.items() if fileExtension.startswith(key)), PACKED_EXTENSION)
+
+        packing = fileLocation.lower().endswith((PACKED_EXTENSION, HEADER_EXTENSION))
+        if packing:
+            layouts = list(PACKING_NAMES.keys())
+            layoutName, ok = Qtw.QInputDialog.getItem(self, 'Export', 'Frame layout', [PACKING_NAMES[layout] for layout in layouts], 0, False)
+            if not ok:
+                return
+            layout = layouts[[PACKING_NAMES[layout] for layout in layouts].index(layoutName)]
+            bitDepth = 8
+            if layout == PACK_BCM:
+                bitDepth, ok = Qtw.QInputDialog.getInt(self, 'Export', 'Bits per channel', 4, 1, 8)
+                if not ok:
+                    return
+
+        self.waitingCursor_signal.emit(True)
+        try:
+            frames = self.outputPipeline.processFrames(self.getFramesArray())
+            if not packing:
+                with createAnimationWriter(fileLocation, self.animationName, self.cubeSize, self.toolBox.getFPS()) as writer:
+                    writer.writeFrames(frames)
+            else:
+                packed = packAnimation(self.animationName, frames, self.toolBox.getFPS(), layout, bitDepth)
+                if fileLocation.lower().endswith(HEADER_EXTENSION):
+                    packed.writeCHeader(fileLocation)
+                else:
+                    packed.writeBlob(fileLocation)
+        except (ValueError, OSError) as error:
+            Qtw.QMessageBox.warning(self, 'Export failed', str(error))
+            return
+        finally:
+            self.waitingCursor_signal.emit(False)
+        Qtw.QMessageBox.information(self, 'Export', 'Power drawn by the exported frames:\n{}'.format(self.powerLimiter.report)) # Computed by the pipeline, as getPowerReport does
+
     def changeCubeSize(self, cubeSize : CubeSize):
         self.cubeSize = cubeSize
         self.cubeViewer.changeCubeSize(cubeSize)
         self.cubeSliced.changeCubeSize(cubeSize)
+        self.blankIllustration = self.getBlankIllustration()
+        self.animationViewer.setBlankIllustration(self.blankIllustration)
     
     def isSaved(self) -> bool:
         return self.animationSaved
@@ -307,33 +411,35 @@ class Animator(Qtw.QWidget):
             '''
             if newAnimDialog.loadAnimation(): #Load an existing animation
                 print('Load animation: ' + newAnimDialog.getFileLocation())
-                self.changeCubeSize(self.cubeSize)
                 self.loadAnimation(newAnimDialog.getFileLocation())
             #self.waitingCursor_signal.emit(False)
             #self.windowStack.setCurrentIndex(newIndexWindow)
         #self.animator.resizeEvent(None) #update positions
     
     def loadAnimation(self, fileLocation : str):
+        """ Open a .anim or .canim file, frames are only decoded when they are first displayed."""
+        reader = openAnimationFile(fileLocation, self.cubeSize, self.toolBox.getFPS())
         self.animationViewer.clearAllFrames()
-        file = open(fileLocation,'r')
-        for line in file:
-            if line[0] == '#':
-                self.loadFrame(line[:-1])
-        file.close()
+        if self.currentSelectedFrame != None: # The size of the loaded cube can differ
+            self.newColorLED_signal.disconnect(self.currentSelectedFrame.getFrameData().setColorLED)
+            self.eraseColorLED_signal.disconnect(self.currentSelectedFrame.getFrameData().eraseColorLED)
+            self.currentSelectedFrame = None
+        self.animationName = reader.getName()
+        if reader.getCubeSize().getShape() != self.cubeSize.getShape(): # Rebuilding the views is slow
+            self.changeCubeSize(reader.getCubeSize())
+        self.toolBox.changeFPS(reader.getFPS())
+        frames = []
+        for index in range(reader.getFrameCount()):
+            frame = CubeLEDFrame(self.cubeSize)
+            frame.getFrameData().setLoader(reader.frameLoader(index))
+            frame.thumbnailOutdated = True # Drawn when scrolled into view
+            frames.append(frame)
+        self.animationViewer.appendFrames(frames) # A single insertion in the timeline
+        if len(self.animationViewer.frameList) > 0:
+            self.animationViewer.changeFrameSelected(self.animationViewer.frameList[0])
         self.noAnimationEdited = False
         self.animationSaved = True
     
-    def loadFrame(self, dataLine:str):
-        self.addFrame()
-        self.currentSelectedFrame.decodeData(dataLine)
-        for x in range(self.cubeSize.getSize(Axis.X)):
-            for y in range(self.cubeSize.getSize(Axis.Y)):
-                for z in range(self.cubeSize.getSize(Axis.Z)):
-                    newColor = self.currentSelectedFrame.getFrameData().getColorLED(x,y,z)
-                    if self.cubeViewer.getDisplayedColor(x,y,z).name() != newColor.name():  #Great gain in refresh speed if the frames are similare, compare name to avoid alpha comparison
-                        self.newColorLED_signal.emit(x,y,z, newColor)
-        self.currentSelectedFrame.setIllustration(self.getCurrentCubePixmap())
-    
     def resizeEvent(self,e):
         self.alphaWidget.moveButton(self.cubeViewer.pos().x() + self.cubeViewer.size().width(), self.cubeViewer.pos().y())
         super(Animator, self).resizeEvent(e)
@@ -342,4 +448,81 @@ class Animator(Qtw.QWidget):
         self.cubeViewer.setBackgroundColor(color)
 
     def playAnimation(self):
-        self.alphaWidget.dimOut(True)
\ No newline at end of file
+        """ Play the animation in the 3D view at the frame rate of the tool box, late frames are skipped."""
+        frameList = self.animationViewer.frameList
+        if len(frameList) == 0:
+            return
+        if self.player is not None:
+            self.player.stop()
+        self.alphaWidget.dimOut(True)
+        self.player = AnimationPlayer(lambda index: frameList[index].getFrameData().getArray(), len(frameList), self.toolBox.getFPS(), parent=self)
+        self.player.frameChanged.connect(lambda index, colors: self.cubeViewer.applyFrame(colors))
+        self.player.frameChanged.connect(lambda index, colors: self.streamFrame(colors))
+        self.player.statsChanged.connect(lambda fps, dropped: self.alphaWidget.setStats('{:.1f} / {} FPS\n{} frames dropped'.format(fps, self.player.fps, dropped)))
+        self.player.play()
+
+    def stopAnimation(self):
+        """ Stop the playback and show the frame being edited again."""
+        if self.player is not None:
+            self.player.stop()
+            self.player = None
+            if self.currentSelectedFrame != None:
+                self.displayFrame(self.currentSelectedFrame.getFrameData())
+
+    def toggleStreaming(self, on : bool):
+        """ Start sending the displayed frames to the cube, the link is chosen in a pop-up."""
+        if not on:
+            self.stopStreaming()
+            return
+        dialog = FrameOutputDialog(self)
+        if not dialog.exec_():
+            self.toolBox.setStreaming(False)
+            return
+        self.stopStreaming()
+        self.frameOutput = FrameOutputThread(dialog.getTransport(), dialog.getFormat(), outputStage=self.outputPipeline.copy(), parent=self) # The thread owns its stages
+        self.frameOutput.opened.connect(self.streamingStarted)
+        self.frameOutput.failed.connect(self.streamingFailed)
+        self.toolBox.setStreaming(True, 'Connecting...')
+        self.frameOutput.start()
+        self.streamCurrentFrame()
+
+    def streamingStarted(self):
+        name = self.frameOutput.transport.getName() if self.frameOutput is not None else ''
+        self.toolBox.setStreaming(True, 'Streaming to {}'.format(name))
+
+    def stopStreaming(self):
+        if self.frameOutput is not None:
+            self.frameOutput.stop()
+            self.frameOutput = None
+        self.toolBox.setStreaming(False)
+
+    def streamingFailed(self, message : str):
+        self.stopStreaming()
+        Qtw.QMessageBox.warning(self, 'Streaming stopped', message)
+
+    def streamFrame(self, colors : np.ndarray):
+        if self.frameOutput is not None:
+            self.frameOutput.pushFrame(colors)
+
+    def streamCurrentFrame(self):
+        """ Send the frame being edited, playback frames are sent by the player."""
+        if self.player is None and self.currentSelectedFrame != None:
+            self.streamFrame(self.currentSelectedFrame.getFrameData().getArray())
+
+    def editOutputSettings(self):
+        """ Change the color correction and the power limit of the exported and streamed frames."""
+        dialog = OutputSettingsDialog(self.colorCorrection, self.powerLimiter, self.getPowerReport(), self)
+        if dialog.exec_():
+            self.colorCorrection.setParameters(*dialog.getParameters())
+            dialog.applyLimits(self.powerLimiter)
+            saveColorCorrection(self.colorCorrection)
+            savePowerLimiter(self.powerLimiter)
+            if self.frameOutput is not None:
+                self.frameOutput.setOutputStage(self.outputPipeline.copy())
+            self.streamCurrentFrame()
+
+    def getPowerReport(self):
+        """ Return the PowerReport of the animation as it would be exported."""
+        if len(self.animationViewer.frameList) == 0:
+            return None
+        return self.powerLimiter.analyse(self.colorCorrection.processFrames(self.getFramesArray()))[1]
@@ -0,0 +1,249 @@
+""" Binary animation container (.canim).
+
+Layout, little-endian:
+    header      magic 'CANM', version (u8), compression (u8), reserved (u16),
+                X, Y, Z, FPS (u16), frame count (u32), index offset (u32), name length (u16), UTF-8 name,
+                zero padding up to a multiple of 16 bytes.
+    frames      COMPRESSION_NONE: frame count x (X*Y*Z*3) bytes, raw RGB in .anim order (x varies first, then y, then z).
+                COMPRESSION_DELTA_RLE: one keyframe or delta record per frame, see CFrameCompression.
+                COMPRESSION_PALETTE8: frame count x (X*Y*Z) bytes, palette index of each LED in .anim order.
+    index       COMPRESSION_DELTA_RLE only: file offset (u32) of each frame record, starting at the index offset.
+    palette     COMPRESSION_PALETTE8 only: color count (u16) and RGB colors, starting at the index offset.
+
+Offsets are stored on 32 bits: compressed and palette animations are limited to 4 GiB, raw animations are not.
+
+Raw and palette frames have the same size, frame N is thus at headerSize + N * frameSize and the whole data
+block of raw frames can be memory-mapped as a single (frames, Z, Y, X, 3) array. Compressed frames are reached through the index,
+by decoding the records from the closest preceding keyframe.
+"""
+
+import struct
+import numpy as np
+
+from .CTypes import CubeSize
+from .CFrameCodec import toLineOrder, fromLineOrder
+from .CFrameCompression import DeltaFrameEncoder, decodeRecord, isFullRecord
+from .CPalette import ColorPalette
+from .CAnimationWriter import AnimationWriter
+
+BINARY_EXTENSION = '.canim'
+BINARY_MAGIC = b'CANM'
+BINARY_VERSION = 1
+HEADER_STRUCT = struct.Struct('<4sBBHHHHHIIH')
+HEADER_ALIGNMENT = 16
+
+COMPRESSION_NONE = 0
+COMPRESSION_DELTA_RLE = 1
+COMPRESSION_PALETTE8 = 2
+PALETTE_COUNT_STRUCT = struct.Struct('<H')
+MAX_OFFSET = 0xFFFFFFFF
+
+
+class BinaryAnimationHeader:
+    """ Fixed part of a .canim file.
+
+    Attributes:
+        name (str): Name of the animation.
+        cubeSize (CubeSize): Number of LEDs along each axis.
+        fps (int): Frame rate of the animation.
+        frameCount (int): Number of frames stored.
+        compression (int): Encoding of the frames, COMPRESSION_NONE for raw RGB.
+        indexOffset (int): File offset of the frame index of compressed animations, of the palette of palette animations.
+    """
+
+    def __init__(self, name : str, cubeSize : CubeSize, fps : int, frameCount : int = 0, compression : int = COMPRESSION_NONE, indexOffset : int = 0):
+        self.name = name
+        self.cubeSize = cubeSize
+        self.fps = fps
+        self.frameCount = frameCount
+        self.compression = compression
+        self.indexOffset = indexOffset
+
+    def getFrameSize(self) -> int:
+        if self.compression == COMPRESSION_PALETTE8:
+            return self.cubeSize.getTotalNode()
+        return self.cubeSize.getTotalNode() * 3
+
+    def getHeaderSize(self) -> int:
+        size = HEADER_STRUCT.size + len(self.name.encode('utf-8'))
+        return size + (-size % HEADER_ALIGNMENT)
+
+    def pack(self) -> bytes:
+        nameBytes = self.name.encode('utf-8')
+        data = HEADER_STRUCT.pack(BINARY_MAGIC, BINARY_VERSION, self.compression, 0,
+                                  *self.cubeSize.getShape(), self.fps, self.frameCount, self.indexOffset, len(nameBytes)) + nameBytes
+        return data + bytes(-len(data) % HEADER_ALIGNMENT)
+
+    @classmethod
+    def read(cls, file):
+        """ Parse the header at the beginning of an opened binary file."""
+        fields = HEADER_STRUCT.unpack(file.read(HEADER_STRUCT.size))
+        magic, version, compression, _, x, y, z, fps, frameCount, indexOffset, nameLength = fields
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a binary animation file")
+        if version > BINARY_VERSION:
+            raise ValueError("Unsupported binary animation version {}".format(version))
+        name = file.read(nameLength).decode('utf-8')
+        return cls(name, CubeSize(x, y, z), fps, frameCount, compression, indexOffset)
+
+
+class BinaryAnimationReader:
+    """ Random access to the frames of a .canim file, same interface as AnimationFileReader.
+
+    Attributes:
+        header (BinaryAnimationHeader): Description of the animation.
+        recordOffsets (np.ndarray): File offset of each frame record, compressed animations only.
+        palette (ColorPalette): Colors of the LED indices, palette animations only.
+    """
+
+    def __init__(self, fileLocation : str):
+        self.fileLocation = fileLocation
+        self.recordOffsets = None
+        self.palette = None
+        self.lastDecoded = (None, None) # (index, packed frame), speeds up sequential reading of compressed frames
+        with open(self.fileLocation, 'rb') as file:
+            self.header = BinaryAnimationHeader.read(file)
+            if self.header.compression == COMPRESSION_DELTA_RLE:
+                file.seek(self.header.indexOffset)
+                offsets = np.frombuffer(file.read(4 * self.header.frameCount), dtype='<u4').astype(np.int64)
+                self.recordOffsets = np.append(offsets, self.header.indexOffset) # Last offset ends the last record
+            elif self.header.compression == COMPRESSION_PALETTE8:
+                file.seek(self.header.indexOffset)
+                count, = PALETTE_COUNT_STRUCT.unpack(file.read(PALETTE_COUNT_STRUCT.size))
+                self.palette = ColorPalette(np.frombuffer(file.read(3 * count), dtype=np.uint8).reshape(count, 3))
+            elif self.header.compression != COMPRESSION_NONE:
+                raise ValueError("Unsupported compression {}".format(self.header.compression))
+
+    def getName(self) -> str:
+        return self.header.name
+
+    def getCubeSize(self) -> CubeSize:
+        return self.header.cubeSize
+
+    def getFPS(self) -> int:
+        return self.header.fps
+
+    def getFrameCount(self) -> int:
+        return self.header.frameCount
+
+    def isCompressed(self) -> bool:
+        return self.header.compression == COMPRESSION_DELTA_RLE
+
+    def getPalette(self) -> ColorPalette:
+        return self.palette
+
+    def getFrameOffset(self, index : int) -> int:
+        return self.header.getHeaderSize() + index * self.header.getFrameSize()
+
+    def readFrame(self, index : int) -> np.ndarray:
+        """ Read the frame at the given index as a (X, Y, Z, 3) uint8 array."""
+        if not 0 <= index < self.header.frameCount:
+            raise IndexError("Frame {} out of range".format(index))
+        with open(self.fileLocation, 'rb') as file:
+            if self.isCompressed():
+                packed = self.decodeFrame(file, index)
+            else:
+                file.seek(self.getFrameOffset(index))
+                packed = self.unpackFrame(file.read(self.header.getFrameSize()))
+        return fromLineOrder(packed, self.header.cubeSize.getShape())
+
+    def unpackFrame(self, data : bytes) -> np.ndarray:
+        """ Return the (X*Y*Z, 3) colors of a raw or palette frame."""
+        packed = np.frombuffer(data, dtype=np.uint8)
+        return self.palette.colorsOf(packed) if self.palette is not None else packed
+
+    def readRecord(self, file, index : int) -> bytes:
+        file.seek(self.recordOffsets[index])
+        return file.read(self.recordOffsets[index+1] - self.recordOffsets[index])
+
+    def decodeFrame(self, file, index : int) -> np.ndarray:
+        """ Rebuild a compressed frame from the closest preceding keyframe, or from the last decoded frame."""
+        lastIndex, packed = self.lastDecoded
+        records = []
+        start = index
+        while start != lastIndex:
+            record = self.readRecord(file, start)
+            records.append(record)
+            if isFullRecord(record):
+                packed = None
+                break
+            start -= 1
+        for record in reversed(records):
+            packed = decodeRecord(record, packed)
+        self.lastDecoded = (index, packed)
+        return packed
+
+    def frameLoader(self, index : int):
+        """ Return a callable reading the frame at the given index, used to load frames lazily."""
+        return lambda: self.readFrame(index)
+
+    def mapFrames(self) -> np.ndarray:
+        """ Memory-map all the frames as a read-only (frames, X, Y, Z, 3) array view, raw animations only."""
+        if self.header.compression != COMPRESSION_NONE:
+            raise ValueError("Compressed animations can not be memory-mapped")
+        x, y, z = self.header.cubeSize.getShape()
+        data = np.memmap(self.fileLocation, dtype=np.uint8, mode='r', offset=self.header.getHeaderSize(),
+                         shape=(self.header.frameCount, z, y, x, 3))
+        return data.transpose(0,3,2,1,4)
+
+    def __iter__(self):
+        shape = self.header.cubeSize.getShape()
+        with open(self.fileLocation, 'rb') as file:
+            if self.isCompressed():
+                packed = None
+                for index in range(self.header.frameCount):
+                    packed = decodeRecord(self.readRecord(file, index), packed)
+                    yield fromLineOrder(packed, shape)
+            else:
+                file.seek(self.header.getHeaderSize())
+                for _ in range(self.header.frameCount):
+                    yield fromLineOrder(self.unpackFrame(file.read(self.header.getFrameSize())), shape)
+
+
+class BinaryAnimationWriter(AnimationWriter):
+    """ Write a .canim file frame by frame, see AnimationWriter.
+
+    The frame count of the header, the index of compressed animations and the palette of palette animations
+    are written on close(). Palette animations need the palette beforehand, colors missing from it are
+    replaced by the nearest one.
+    """
+
+    def __init__(self, fileLocation : str, name : str, cubeSize : CubeSize, fps : int,
+                 compression : int = COMPRESSION_NONE, keyframeInterval : int = 30, palette : ColorPalette = None):
+        self.header = BinaryAnimationHeader(name, cubeSize, fps, compression=compression)
+        self.frameShape = cubeSize.getShape() + (3,)
+        self.recordOffsets = []
+        self.encoder = DeltaFrameEncoder(keyframeInterval) if compression == COMPRESSION_DELTA_RLE else None
+        self.palette = palette if compression == COMPRESSION_PALETTE8 else None
+        if compression not in (COMPRESSION_NONE, COMPRESSION_DELTA_RLE, COMPRESSION_PALETTE8):
+            raise ValueError("Unsupported compression {}".format(compression))
+        if compression == COMPRESSION_PALETTE8 and palette is None:
+            raise ValueError("Palette animations need a palette")
+        super(BinaryAnimationWriter, self).__init__(fileLocation, 'wb')
+        self.file.write(self.header.pack())
+
+    def writeFrame(self, colors : np.ndarray):
+        """ Append a (X, Y, Z, 3) uint8 frame to the animation."""
+        if colors.shape != self.frameShape:
+            raise ValueError("Frame shape {} does not match cube shape {}".format(colors.shape, self.frameShape))
+        packed = np.ascontiguousarray(toLineOrder(colors), dtype=np.uint8)
+        if self.palette is not None:
+            self.file.write(self.palette.indicesOf(packed).tobytes())
+        elif self.encoder is None:
+            self.file.write(packed.tobytes())
+        else:
+            self.recordOffsets.append(self.file.tell())
+            self.file.write(self.encoder.encode(packed))
+        self.header.frameCount += 1
+
+    def finish(self):
+        if (self.encoder is not None or self.palette is not None) and self.file.tell() > MAX_OFFSET:
+            raise ValueError("Compressed and palette animations are limited to 4 GiB")
+        if self.encoder is not None:
+            self.header.indexOffset = self.file.tell()
+            self.file.write(np.array(self.recordOffsets, dtype='<u4').tobytes())
+        elif self.palette is not None:
+            self.header.indexOffset = self.file.tell()
+            self.file.write(PALETTE_COUNT_STRUCT.pack(len(self.palette)) + self.palette.colors.tobytes())
+        self.file.seek(0)
+        self.file.write(self.header.pack())
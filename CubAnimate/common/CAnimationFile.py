@@ -0,0 +1,136 @@
+""" Reading and writing of .anim files.
+
+A .anim file starts with the header line 'name-X,Y,Z-FPS' followed by one '#rrggbb...' data line per frame.
+"""
+
+import os
+import numpy as np
+
+from .CTypes import CubeSize
+from .CFrameCodec import encodeFrameLine, decodeFrameLine
+from .CAnimationBinary import BINARY_EXTENSION, COMPRESSION_NONE, BinaryAnimationReader, BinaryAnimationWriter
+from .CAnimationWriter import AnimationWriter
+
+ANIM_EXTENSION = '.anim'
+
+
+def formatHeaderLine(name : str, cubeSize : CubeSize, fps : int) -> str:
+    """ Generate the header line of a .anim file."""
+    return "{}-{},{},{}-{}\n".format(name, *cubeSize.getShape(), fps)
+
+def parseHeaderLine(headerLine : str):
+    """ Return (name, CubeSize, FPS) described by the header line of a .anim file."""
+    name, sizeStr, fpsStr = headerLine.strip().rsplit('-', 2) # The name can contain dashes
+    x, y, z = [int(s) for s in sizeStr.split(',')]
+    return name, CubeSize(x, y, z), int(fpsStr)
+
+
+class AnimationFileReader:
+    """ Random access to the frames of a .anim file.
+
+    The file is scanned once to index the byte offset of each frame line, frames are only decoded when read.
+
+    Attributes:
+        fileLocation (str): Path of the .anim file.
+        frameOffsets (list[int]): Byte offset of each frame line in the file.
+    """
+
+    def __init__(self, fileLocation : str, cubeSize : CubeSize = None, fps : int = 24):
+        """
+        Args:
+            fileLocation (str): Path of the .anim file.
+            cubeSize, fps: Values used if the file has no header line.
+        """
+        self.fileLocation = fileLocation
+        self.name = os.path.splitext(os.path.basename(fileLocation))[0]
+        self.cubeSize = cubeSize
+        self.fps = fps
+        self.frameOffsets = []
+
+        with open(self.fileLocation, 'rb') as file:
+            offset = 0
+            for line in file:
+                if line[:1] == b'#':
+                    self.frameOffsets.append(offset)
+                elif offset == 0 and len(line.strip()) > 0:
+                    self.name, self.cubeSize, self.fps = parseHeaderLine(line.decode('utf-8'))
+                offset += len(line)
+
+        if self.cubeSize is None:
+            raise ValueError("No cube size defined for {}".format(self.fileLocation))
+
+    def getName(self) -> str:
+        return self.name
+
+    def getCubeSize(self) -> CubeSize:
+        return self.cubeSize
+
+    def getFPS(self) -> int:
+        return self.fps
+
+    def getFrameCount(self) -> int:
+        return len(self.frameOffsets)
+
+    def readFrameLine(self, index : int) -> bytes:
+        with open(self.fileLocation, 'rb') as file:
+            file.seek(self.frameOffsets[index])
+            return file.readline().rstrip()
+
+    def readFrame(self, index : int) -> np.ndarray:
+        """ Decode the frame at the given index as a (X, Y, Z, 3) uint8 array."""
+        return decodeFrameLine(self.readFrameLine(index), self.cubeSize.getShape())
+
+    def frameLoader(self, index : int):
+        """ Return a callable decoding the frame at the given index, used to load frames lazily."""
+        return lambda: self.readFrame(index)
+
+    def __iter__(self):
+        with open(self.fileLocation, 'rb') as file:
+            for offset in self.frameOffsets:
+                file.seek(offset)
+                yield decodeFrameLine(file.readline(), self.cubeSize.getShape())
+
+
+class AnimationFileWriter(AnimationWriter):
+    """ Write a .anim file frame by frame, see AnimationWriter."""
+
+    def __init__(self, fileLocation : str, name : str, cubeSize : CubeSize, fps : int):
+        super(AnimationFileWriter, self).__init__(fileLocation, 'w')
+        self.cubeSize = cubeSize
+        self.frameCount = 0
+        self.file.write(formatHeaderLine(name, cubeSize, fps))
+
+    def writeFrame(self, colors : np.ndarray):
+        """ Append a (X, Y, Z, 3) uint8 frame to the animation."""
+        self.file.write(encodeFrameLine(colors) + '\n')
+        self.frameCount += 1
+
+    def writeFrameLine(self, dataLine : str):
+        """ Append an already encoded frame line to the animation."""
+        self.file.write(dataLine + '\n')
+        self.frameCount += 1
+
+
+def openAnimationFile(fileLocation : str, cubeSize : CubeSize = None, fps : int = 24):
+    """ Return the reader matching the extension of an animation file (.anim or .canim)."""
+    if os.path.splitext(fileLocation)[1].lower() == BINARY_EXTENSION:
+        return BinaryAnimationReader(fileLocation)
+    return AnimationFileReader(fileLocation, cubeSize, fps)
+
+def createAnimationWriter(fileLocation : str, name : str, cubeSize : CubeSize, fps : int, compression : int = COMPRESSION_NONE, palette = None):
+    """ Return the writer matching the extension of an animation file (.anim or .canim).
+
+    Parameters:
+        compression (int): Frame encoding of .canim files, see CAnimationBinary.
+        palette (ColorPalette): Colors of COMPRESSION_PALETTE8 .canim files.
+    """
+    if os.path.splitext(fileLocation)[1].lower() == BINARY_EXTENSION:
+        return BinaryAnimationWriter(fileLocation, name, cubeSize, fps, compression, palette=palette)
+    return AnimationFileWriter(fileLocation, name, cubeSize, fps)
+
+def convertAnimationFile(sourceLocation : str, destinationLocation : str, compression : int = COMPRESSION_NONE):
+    """ Losslessly convert an animation between the .anim and .canim formats, one frame at a time."""
+    reader = openAnimationFile(sourceLocation)
+    with createAnimationWriter(destinationLocation, reader.getName(), reader.getCubeSize(), reader.getFPS(), compression) as writer:
+        for colors in reader:
+            writer.writeFrame(colors)
@@ -0,0 +1,142 @@
+""" Real-time playback of animations.
+
+The frame shown is chosen from the playback time of a PlaybackClock, never from a tick count: when
+displaying takes longer than a frame period the late frames are skipped and the animation stays on
+time. Upcoming frames are decoded in advance into a small ring buffer between two ticks.
+"""
+
+import numpy as np
+from PyQt5 import QtCore
+
+from .CPlaybackClock import PlaybackClock
+
+
+class FrameRingBuffer:
+    """ Fixed number of decoded frames, frame i is stored in slot i % size.
+
+    Attributes:
+        size (int): Number of slots.
+    """
+
+    def __init__(self, size : int):
+        self.size = max(1, size)
+        self.indices = [None] * self.size
+        self.frames = [None] * self.size
+
+    def get(self, index : int) -> np.ndarray:
+        """ Return the frame at the given index, None if not buffered."""
+        slot = index % self.size
+        return self.frames[slot] if self.indices[slot] == index else None
+
+    def put(self, index : int, colors : np.ndarray):
+        slot = index % self.size
+        self.indices[slot] = index
+        self.frames[slot] = colors
+
+    def clear(self):
+        self.indices = [None] * self.size
+        self.frames = [None] * self.size
+
+
+class AnimationPlayer(QtCore.QObject):
+    """ Play a sequence of frames at a given frame rate.
+
+    Signals:
+        frameChanged (int, np.ndarray): Index and (X, Y, Z, 3) colors of the frame to display.
+        statsChanged (float, int): Frame rate achieved over the last second, frames dropped since the start.
+    """
+    frameChanged = QtCore.pyqtSignal(int, object)
+    statsChanged = QtCore.pyqtSignal(float, int)
+
+    def __init__(self, frameSource, frameCount : int, fps : int, bufferSize : int = 8, loop : bool = True, parent = None):
+        """
+        Args:
+            frameSource (callable): Return the (X, Y, Z, 3) uint8 colors of a frame index.
+            frameCount (int): Number of frames of the animation.
+            fps (int): Frame rate of the animation.
+            bufferSize (int): Number of frames decoded in advance.
+            loop (bool): Restart from the first frame after the last one.
+        """
+        super(AnimationPlayer, self).__init__(parent)
+        self.frameSource = frameSource
+        self.frameCount = frameCount
+        self.fps = max(1, fps)
+        self.loop = loop
+        self.buffer = FrameRingBuffer(bufferSize)
+        self.clock = PlaybackClock(max(1, int(500 / self.fps)), self) # Ticks twice per frame to limit the display jitter
+        self.clock.tick.connect(self.update)
+
+        self.lastFrame = -1 # Absolute index of the last frame displayed, loops included
+        self.droppedFrames = 0
+        self.shownTimes = [] # Playback times of the frames displayed during the last second
+        self.statsTimer = QtCore.QTimer(self, interval=1000, timeout=self.emitStats)
+        self.prefetchTimer = QtCore.QTimer(self, singleShot=True, interval=0, timeout=self.prefetch)
+
+    def setFPS(self, fps : int):
+        self.fps = max(1, fps)
+        self.clock.setInterval(max(1, int(500 / self.fps)))
+        self.clock.reset(max(self.lastFrame, 0) / self.fps)
+
+    def isPlaying(self) -> bool:
+        return self.clock.isActive()
+
+    def play(self):
+        if self.frameCount == 0:
+            return
+        self.prefetch()
+        self.clock.start()
+        self.statsTimer.start()
+
+    def pause(self):
+        self.clock.stop()
+        self.statsTimer.stop()
+
+    def stop(self):
+        self.pause()
+        self.clock.reset()
+        self.buffer.clear()
+        self.lastFrame = -1
+        self.droppedFrames = 0
+        self.shownTimes = []
+
+    def readFrame(self, index : int) -> np.ndarray:
+        colors = self.buffer.get(index)
+        if colors is None:
+            colors = self.frameSource(index)
+            self.buffer.put(index, colors)
+        return colors
+
+    def update(self, time : float):
+        """ Display the frame due at the given playback time (s), skipping the frames which are late."""
+        target = int(time * self.fps)
+        if target <= self.lastFrame:
+            return
+        if not self.loop and target >= self.frameCount:
+            target = self.frameCount - 1
+            self.pause()
+            if target <= self.lastFrame:
+                return
+        if self.lastFrame >= 0:
+            self.droppedFrames += target - self.lastFrame - 1
+        self.lastFrame = target
+
+        index = target % self.frameCount
+        self.frameChanged.emit(index, self.readFrame(index))
+        self.shownTimes.append(time)
+        self.prefetchTimer.start() # Decode the next frames once the event loop is idle
+
+    def prefetch(self):
+        """ Decode the frames following the last one displayed."""
+        first = self.lastFrame + 1
+        for target in range(first, first + self.buffer.size - 1):
+            if not self.loop and target >= self.frameCount:
+                break
+            self.readFrame(target % self.frameCount)
+
+    def getAchievedFPS(self) -> float:
+        now = self.clock.getTime()
+        self.shownTimes = [t for t in self.shownTimes if now - t < 1.0]
+        return float(len(self.shownTimes))
+
+    def emitStats(self):
+        self.statsChanged.emit(self.getAchievedFPS(), self.droppedFrames)
@@ -0,0 +1,69 @@
+""" Base of the animation file writers (.anim and .canim).
+
+Frames are written in a temporary file which replaces the destination once the animation is complete:
+frames read lazily from the destination file thus stay available while saving, and a failed or
+canceled save leaves the destination untouched.
+"""
+
+import abc
+import os
+
+import numpy as np
+
+
+class AnimationWriter(abc.ABC):
+    """ Write an animation file frame by frame through a temporary file.
+
+    Subclasses write the frames and complete the file in finish(), called by close() before the
+    temporary file replaces the destination.
+
+    Attributes:
+        fileLocation (str): Path of the animation file.
+        tempLocation (str): Path of the file being written.
+        file: Temporary file, open until close() or abort().
+    """
+
+    def __init__(self, fileLocation : str, mode : str):
+        """
+        Args:
+            mode (str): Mode of the temporary file, 'w' or 'wb'.
+        """
+        self.fileLocation = fileLocation
+        self.tempLocation = fileLocation + '.tmp'
+        self.file = open(self.tempLocation, mode)
+
+    @abc.abstractmethod
+    def writeFrame(self, colors : np.ndarray):
+        """ Append a (X, Y, Z, 3) uint8 frame to the animation."""
+
+    def writeFrames(self, frames : np.ndarray):
+        """ Append a (frames, X, Y, Z, 3) uint8 array to the animation."""
+        for colors in frames:
+            self.writeFrame(colors)
+
+    def finish(self):
+        """ Write what can only be written once all the frames are known."""
+        pass
+
+    def close(self):
+        try:
+            self.finish()
+        except Exception:
+            self.abort()
+            raise
+        self.file.close()
+        os.replace(self.tempLocation, self.fileLocation)
+
+    def abort(self):
+        """ Stop writing and leave the destination file untouched."""
+        self.file.close()
+        os.remove(self.tempLocation)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
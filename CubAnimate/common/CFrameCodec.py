@@ -0,0 +1,63 @@
+""" Conversion between .anim frame lines and RGB arrays.
+
+A frame line is the concatenation of the '#rrggbb' names of all the LEDs, x varying first, then y, then z.
+Both directions work on the whole line at once through lookup tables instead of one QColor per LED.
+"""
+
+import numpy as np
+
+COLOR_NAME_SIZE = 7 # '#rrggbb'
+
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+_HEX_VALUES = np.full(256, 255, dtype=np.uint8) # ASCII code -> value of the hexadecimal digit, 255 if invalid
+_HEX_VALUES[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_HEX_VALUES[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+_HEX_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+
+
+def toLineOrder(colors : np.ndarray) -> np.ndarray:
+    """ Return the (X*Y*Z, 3) view of a (X, Y, Z, 3) array in .anim order (x varies first, then y, then z)."""
+    return colors.transpose(2,1,0,3).reshape(-1,3)
+
+def fromLineOrder(packed : np.ndarray, shape : tuple) -> np.ndarray:
+    """ Inverse of toLineOrder, return a contiguous (X, Y, Z, 3) array.
+
+    Parameters:
+        shape (tuple): Number of LEDs along each axis (X, Y, Z).
+    """
+    return np.ascontiguousarray(packed.reshape(shape[::-1] + (3,)).transpose(2,1,0,3))
+
+def encodeFrameLine(colors : np.ndarray) -> str:
+    """ Generate the .anim data line of a frame.
+
+    Parameters:
+        colors (np.ndarray): uint8 array of shape (X, Y, Z, 3).
+    """
+    packed = toLineOrder(colors)
+    chars = np.empty((packed.shape[0], COLOR_NAME_SIZE), dtype=np.uint8)
+    chars[:,0] = ord('#')
+    chars[:,1::2] = _HEX_DIGITS[packed >> 4]
+    chars[:,2::2] = _HEX_DIGITS[packed & 0x0F]
+    return chars.tobytes().decode('ascii')
+
+def decodeFrameLine(dataLine, shape : tuple) -> np.ndarray:
+    """ Return the (X, Y, Z, 3) uint8 array described by a .anim data line.
+
+    Parameters:
+        dataLine (str or bytes): Line of '#rrggbb' color names, trailing whitespaces are ignored.
+        shape (tuple): Number of LEDs along each axis (X, Y, Z).
+    """
+    if isinstance(dataLine, str):
+        dataLine = dataLine.encode('ascii')
+    dataLine = dataLine.rstrip()
+    nbrLED = int(np.prod(shape))
+    if len(dataLine) != nbrLED * COLOR_NAME_SIZE:
+        raise ValueError("Frame line of {} characters does not match {} LEDs".format(len(dataLine), nbrLED))
+
+    chars = np.frombuffer(dataLine, dtype=np.uint8).reshape(nbrLED, COLOR_NAME_SIZE)
+    digits = _HEX_VALUES[chars[:,1:]]
+    if np.any(chars[:,0] != ord('#')) or np.any(digits == 255):
+        raise ValueError("Invalid color name in frame line")
+    packed = (digits[:,0::2] << 4) | digits[:,1::2]
+    return fromLineOrder(packed, shape)
@@ -0,0 +1,152 @@
+""" Keyframe and delta compression of animation frames.
+
+Frames are handled as (X*Y*Z, 3) uint8 arrays in .anim LED order. Each frame is stored as one record:
+    keyframe    type 0 (u8), run count (u32), runs of (length u16, R, G, B)
+                covering all the LEDs in order, solid regions thus take 5 bytes.
+    delta       type 1 (u8), run count (u32), runs of (first LED index u16, length u16, R, G, B)
+                overwriting the LEDs changed since the previous frame, consecutive LEDs set to the same color share a run.
+                Only used for cubes of at most MAX_LED_NUMBER LEDs.
+    raw         type 2 (u8), LED count (u32), R, G, B of each LED, used instead of a keyframe when the runs
+                would take more room: a record is thus never more than 5 bytes larger than the raw frame.
+All integers are little-endian and no record needs more than the previous frame to be decoded,
+a micro-controller can thus play the records sequentially with a single frame buffer.
+"""
+
+import numpy as np
+
+RECORD_KEYFRAME = 0
+RECORD_DELTA = 1
+RECORD_RAW = 2
+
+MAX_RUN_LENGTH = 0xFFFF
+MAX_LED_NUMBER = 0x10000 # LED indices are stored on 16 bits
+
+KEYFRAME_RUN = np.dtype([('length', '<u2'), ('r', 'u1'), ('g', 'u1'), ('b', 'u1')])
+DELTA_RUN = np.dtype([('index', '<u2'), ('length', '<u2'), ('r', 'u1'), ('g', 'u1'), ('b', 'u1')])
+RECORD_HEADER = np.dtype([('type', 'u1'), ('count', '<u4')])
+
+
+def packColors(packed : np.ndarray) -> np.ndarray:
+    """ Return one 24-bit integer per LED of a (N, 3) uint8 array, to compare colors in a single operation."""
+    packed = packed.astype(np.uint32)
+    return (packed[:,0] << 16) | (packed[:,1] << 8) | packed[:,2]
+
+def _splitRuns(starts : np.ndarray, lengths : np.ndarray):
+    """ Split the runs longer than MAX_RUN_LENGTH."""
+    if lengths.size == 0 or lengths.max() <= MAX_RUN_LENGTH:
+        return starts, lengths
+    pieces = (lengths + MAX_RUN_LENGTH - 1) // MAX_RUN_LENGTH
+    runIndex = np.repeat(np.arange(starts.size), pieces)
+    pieceIndex = np.arange(runIndex.size) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    newStarts = starts[runIndex] + pieceIndex * MAX_RUN_LENGTH
+    newLengths = np.minimum(lengths[runIndex] - pieceIndex * MAX_RUN_LENGTH, MAX_RUN_LENGTH)
+    return newStarts, newLengths
+
+def _record(recordType : int, runs : np.ndarray) -> bytes:
+    header = np.array([(recordType, runs.size)], dtype=RECORD_HEADER)
+    return header.tobytes() + runs.tobytes()
+
+def encodeKeyframe(packed : np.ndarray) -> bytes:
+    """ Run-length encode all the LEDs of a (N, 3) uint8 frame."""
+    colors = packColors(packed)
+    starts = np.flatnonzero(np.concatenate(([True], colors[1:] != colors[:-1])))
+    lengths = np.diff(np.append(starts, colors.size))
+    starts, lengths = _splitRuns(starts, lengths)
+
+    runs = np.empty(starts.size, dtype=KEYFRAME_RUN)
+    runs['length'] = lengths
+    runs['r'], runs['g'], runs['b'] = packed[starts].T
+    return _record(RECORD_KEYFRAME, runs)
+
+def encodeRaw(packed : np.ndarray) -> bytes:
+    """ Store all the LEDs of a (N, 3) uint8 frame as they are."""
+    header = np.array([(RECORD_RAW, packed.shape[0])], dtype=RECORD_HEADER)
+    return header.tobytes() + np.ascontiguousarray(packed, dtype=np.uint8).tobytes()
+
+def encodeFullFrame(packed : np.ndarray) -> bytes:
+    """ Return the smaller of the keyframe and raw records of a (N, 3) uint8 frame."""
+    keyframe = encodeKeyframe(packed)
+    return keyframe if len(keyframe) <= RECORD_HEADER.itemsize + packed.nbytes else encodeRaw(packed)
+
+def encodeDelta(previous : np.ndarray, packed : np.ndarray) -> bytes:
+    """ Encode the LEDs of a (N, 3) uint8 frame which differ from the previous frame."""
+    if packed.shape[0] > MAX_LED_NUMBER:
+        raise ValueError("Delta records are limited to {} LEDs".format(MAX_LED_NUMBER))
+    colors = packColors(packed)
+    changed = colors != packColors(previous)
+    newRun = changed.copy()
+    newRun[1:] &= ~changed[:-1] | (colors[1:] != colors[:-1])
+    starts = np.flatnonzero(newRun)
+    # A run ends at the next start or at the first unchanged LED
+    ends = np.flatnonzero(np.diff(np.concatenate(([False], changed, [False])).astype(np.int8)) == -1)
+    ends = np.minimum(np.append(starts[1:], colors.size), ends[np.searchsorted(ends, starts, side='right')])
+    starts, lengths = _splitRuns(starts, ends - starts)
+
+    runs = np.empty(starts.size, dtype=DELTA_RUN)
+    runs['index'] = starts
+    runs['length'] = lengths
+    runs['r'], runs['g'], runs['b'] = packed[starts].T
+    return _record(RECORD_DELTA, runs)
+
+def recordType(data : bytes) -> int:
+    return data[0]
+
+def isFullRecord(data : bytes) -> bool:
+    """ Return True for the records decoded without the previous frame."""
+    return data[0] in (RECORD_KEYFRAME, RECORD_RAW)
+
+def decodeRecord(data : bytes, previous : np.ndarray = None) -> np.ndarray:
+    """ Decode a keyframe, delta or raw record.
+
+    Parameters:
+        data (bytes): Encoded record.
+        previous (np.ndarray): (N, 3) uint8 frame preceding the record, required for delta records.
+    Returns:
+        (N, 3) uint8 array of the decoded frame.
+    """
+    header = np.frombuffer(data, dtype=RECORD_HEADER, count=1)[0]
+    if header['type'] == RECORD_KEYFRAME:
+        runs = np.frombuffer(data, dtype=KEYFRAME_RUN, count=header['count'], offset=RECORD_HEADER.itemsize)
+        colors = np.stack((runs['r'], runs['g'], runs['b']), axis=-1)
+        return np.repeat(colors, runs['length'].astype(np.intp), axis=0)
+    elif header['type'] == RECORD_DELTA:
+        if previous is None:
+            raise ValueError("Delta record without previous frame")
+        runs = np.frombuffer(data, dtype=DELTA_RUN, count=header['count'], offset=RECORD_HEADER.itemsize)
+        lengths = runs['length'].astype(np.intp)
+        firstLED = np.repeat(runs['index'].astype(np.intp), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        packed = previous.copy()
+        packed[firstLED + offsets] = np.repeat(np.stack((runs['r'], runs['g'], runs['b']), axis=-1), lengths, axis=0)
+        return packed
+    elif header['type'] == RECORD_RAW:
+        return np.frombuffer(data, dtype=np.uint8, count=int(header['count']) * 3, offset=RECORD_HEADER.itemsize).reshape(-1, 3)
+    else:
+        raise ValueError("Unknown record type {}".format(header['type']))
+
+
+class DeltaFrameEncoder:
+    """ Encode a sequence of frames as keyframes (or raw records) followed by deltas.
+
+    A keyframe is inserted every keyframeInterval frames, which bounds the number of records to decode
+    to reach any frame, or when it is smaller than the delta. Cubes of more than MAX_LED_NUMBER LEDs
+    only get keyframes.
+    """
+
+    def __init__(self, keyframeInterval : int = 30):
+        self.keyframeInterval = max(1, keyframeInterval)
+        self.previous = None
+        self.sinceKeyframe = 0
+
+    def encode(self, packed : np.ndarray) -> bytes:
+        """ Return the record of the next (N, 3) uint8 frame."""
+        keyframe = encodeFullFrame(packed)
+        if self.previous is not None and self.sinceKeyframe < self.keyframeInterval - 1 and packed.shape[0] <= MAX_LED_NUMBER:
+            delta = encodeDelta(self.previous, packed)
+            if len(delta) < len(keyframe):
+                self.previous = packed.copy()
+                self.sinceKeyframe += 1
+                return delta
+        self.previous = packed.copy()
+        self.sinceKeyframe = 0
+        return keyframe
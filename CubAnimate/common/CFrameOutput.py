@@ -0,0 +1,399 @@
+""" Live output of frames to a physical cube.
+
+Each frame is sent as one packet, little-endian:
+    header      magic 'CF', version (u8), format (u8), sequence number (u32), X, Y, Z (u16), payload length (u32)
+    payload     FORMAT_RGB888: X*Y*Z*3 bytes, raw RGB in .anim order (x varies first, then y, then z)
+                FORMAT_PALETTE8: color count (u16), RGB colors, then X*Y*Z bytes, palette index of each LED.
+                Each packet carries its own palette, a lost packet never corrupts the next frames.
+    crc         CRC-32 of the header and the payload (u32)
+
+The sequence number grows by one per packet sent, the cube can thus detect lost packets. On a serial
+link the magic and the CRC let the receiver find the start of the next packet after a corrupted one.
+A transport whose link is busy drops the packet instead of blocking the thread, see FrameTransport.send.
+
+Over UDP a packet is split in fragments, one per datagram, a 32x32x32 RGB frame being larger than a datagram:
+    header      magic 'CU', packet number (u32), offset of the fragment in the packet (u32), packet length (u32)
+    data        the bytes of the packet from the offset, at most UDP_FRAGMENT_SIZE
+The receiver rebuilds a packet once all its bytes arrived (see PacketAssembler), a packet missing a
+fragment is dropped when the fragments of a newer one arrive.
+
+Packets are built and written by a FrameOutputThread, after the frames went through the output
+stages of the thread (see COutputStage). Only the latest frame pushed is kept: when the
+link is slower than the editor, intermediate frames are dropped instead of piling up.
+"""
+
+import abc
+import os
+import select
+import socket
+import struct
+import threading
+import zlib
+from collections import deque
+
+import numpy as np
+from PyQt5 import QtCore
+
+from .CFrameCodec import toLineOrder, fromLineOrder
+from .CPalette import PALETTE_MAX_SIZE, buildPalette
+from .COutputStage import OutputStage
+
+try:
+    import serial
+    has_serial = True
+except ImportError:
+    has_serial = False
+
+PACKET_MAGIC = b'CF'
+PACKET_VERSION = 1
+PACKET_HEADER = struct.Struct('<2sBBIHHHI')
+PACKET_CRC = struct.Struct('<I')
+PALETTE_COUNT = struct.Struct('<H')
+
+FORMAT_RGB888 = 0
+FORMAT_PALETTE8 = 2
+
+UDP_FRAGMENT_MAGIC = b'CU'
+UDP_FRAGMENT_HEADER = struct.Struct('<2sIII')
+UDP_FRAGMENT_SIZE = 1400 # Fits the usual Ethernet MTU, the datagrams are not fragmented by IP
+WRITE_TIMEOUT = 1.0 # Time (s) a packet started may take to be written
+STOP_TIMEOUT = 2000 # Time (ms) given to the thread to close the transport
+
+
+def buildPacket(colors : np.ndarray, sequence : int, format : int = FORMAT_RGB888, paletteSize : int = PALETTE_MAX_SIZE) -> bytes:
+    """ Return the packet carrying a frame.
+
+    Parameters:
+        colors (np.ndarray): (X, Y, Z, 3) uint8 colors.
+        sequence (int): Sequence number, wrapped on 32 bits.
+        paletteSize (int): Maximum number of colors of FORMAT_PALETTE8, the frame is quantized above.
+    """
+    if format == FORMAT_RGB888:
+        payload = toLineOrder(colors).tobytes()
+    elif format == FORMAT_PALETTE8:
+        packed = toLineOrder(colors)
+        palette = buildPalette(packed, paletteSize)
+        payload = PALETTE_COUNT.pack(len(palette)) + palette.colors.tobytes() + palette.indicesOf(packed).tobytes()
+    else:
+        raise ValueError("Unknown frame format {}".format(format))
+    header = PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, format, sequence & 0xFFFFFFFF, *colors.shape[:3], len(payload))
+    return header + payload + PACKET_CRC.pack(zlib.crc32(payload, zlib.crc32(header)))
+
+def parsePacket(data : bytes) -> tuple:
+    """ Inverse of buildPacket.
+
+    Returns:
+        (sequence, format, colors): colors is the (X, Y, Z, 3) uint8 array of the frame.
+    """
+    if len(data) < PACKET_HEADER.size + PACKET_CRC.size:
+        raise ValueError("Truncated frame packet")
+    magic, version, format, sequence, x, y, z, length = PACKET_HEADER.unpack_from(data)
+    if magic != PACKET_MAGIC:
+        raise ValueError("Not a frame packet")
+    if version > PACKET_VERSION:
+        raise ValueError("Unsupported frame packet version {}".format(version))
+    end = PACKET_HEADER.size + length
+    if len(data) < end + PACKET_CRC.size:
+        raise ValueError("Truncated frame packet")
+    if PACKET_CRC.unpack_from(data, end)[0] != zlib.crc32(data[:end]):
+        raise ValueError("Corrupted frame packet")
+    payload = np.frombuffer(data, dtype=np.uint8, count=length, offset=PACKET_HEADER.size)
+    if format == FORMAT_PALETTE8:
+        if length < PALETTE_COUNT.size:
+            raise ValueError("Truncated frame packet")
+        count, = PALETTE_COUNT.unpack_from(payload)
+        start = PALETTE_COUNT.size + 3 * count
+        if length < start:
+            raise ValueError("Truncated frame packet")
+        palette = payload[PALETTE_COUNT.size:start].reshape(count, 3)
+        indices = payload[start:]
+        if len(indices) > 0 and indices.max() >= count:
+            raise ValueError("Palette index out of range in a frame packet")
+        payload = palette[indices]
+    elif format != FORMAT_RGB888:
+        raise ValueError("Unknown frame format {}".format(format))
+    return sequence, format, fromLineOrder(payload, (x, y, z))
+
+
+def splitPacket(packet : bytes, number : int, fragmentSize : int = UDP_FRAGMENT_SIZE) -> list:
+    """ Return the datagrams carrying the fragments of a packet.
+
+    Parameters:
+        number (int): Packet number, wrapped on 32 bits.
+    """
+    number &= 0xFFFFFFFF
+    return [UDP_FRAGMENT_HEADER.pack(UDP_FRAGMENT_MAGIC, number, offset, len(packet)) + packet[offset:offset + fragmentSize]
+            for offset in range(0, max(len(packet), 1), fragmentSize)]
+
+
+class PacketAssembler:
+    """ Rebuild the packets split by splitPacket, the datagrams of a packet can arrive in any order.
+
+    Attributes:
+        number (int): Number of the packet being rebuilt, None before the first datagram.
+        missing (int): Bytes of the packet not received yet.
+    """
+
+    def __init__(self):
+        self.number = None
+        self.buffer = bytearray()
+        self.offsets = set()
+        self.missing = 0
+
+    def push(self, datagram : bytes) -> bytes:
+        """ Add a datagram, return the packet it completes, None otherwise."""
+        if len(datagram) < UDP_FRAGMENT_HEADER.size:
+            raise ValueError("Truncated packet fragment")
+        magic, number, offset, length = UDP_FRAGMENT_HEADER.unpack_from(datagram)
+        if magic != UDP_FRAGMENT_MAGIC:
+            raise ValueError("Not a packet fragment")
+        if self.number is not None and number != self.number:
+            if (number - self.number) & 0xFFFFFFFF >= 0x80000000:
+                return None # Late fragment of an older packet
+            self.number = None
+        if self.number is None:
+            self.number, self.buffer, self.offsets, self.missing = number, bytearray(length), set(), length
+        data = datagram[UDP_FRAGMENT_HEADER.size:]
+        if length != len(self.buffer) or offset + len(data) > length:
+            raise ValueError("Packet fragment out of bounds")
+        if offset in self.offsets or self.missing == 0:
+            return None # Duplicate
+        self.buffer[offset:offset + len(data)] = data
+        self.offsets.add(offset)
+        self.missing -= len(data)
+        return bytes(self.buffer) if self.missing == 0 else None
+
+
+class FrameTransport(abc.ABC):
+    """ Link to the cube, packets are written as a whole by send."""
+
+    def open(self):
+        pass
+
+    @abc.abstractmethod
+    def send(self, packet : bytes) -> bool:
+        """ Write a whole packet, raise an exception when the link fails.
+
+        Returns:
+            False if the link was busy and the packet dropped, True otherwise.
+        """
+
+    def close(self):
+        pass
+
+    def getName(self) -> str:
+        return self.__class__.__name__
+
+
+class SerialTransport(FrameTransport):
+    """ Serial port of the cube controller, needs pyserial.
+
+    Attributes:
+        port (str): Name of the port ('COM3', '/dev/ttyUSB0').
+        baudrate (int): Speed of the link (bit/s).
+    """
+
+    def __init__(self, port : str, baudrate : int = 1000000):
+        self.port = port
+        self.baudrate = baudrate
+        self.link = None
+
+    def open(self):
+        if not has_serial:
+            raise RuntimeError("Streaming over a serial port requires pyserial")
+        self.link = serial.Serial(self.port, self.baudrate, write_timeout=WRITE_TIMEOUT)
+
+    def send(self, packet : bytes) -> bool:
+        self.link.write(packet)
+        return True
+
+    def close(self):
+        if self.link is not None:
+            self.link.close()
+            self.link = None
+
+    def getName(self) -> str:
+        return '{} @ {} bit/s'.format(self.port, self.baudrate)
+
+
+class UDPTransport(FrameTransport):
+    """ Cube controller reached over the network, packets are split over several datagrams (see splitPacket).
+
+    Attributes:
+        host (str): Address of the controller.
+        port (int): UDP port of the controller.
+        packetNumber (int): Number of the next packet sent.
+    """
+
+    def __init__(self, host : str, port : int):
+        self.host = host
+        self.port = port
+        self.socket = None
+        self.packetNumber = 0
+
+    def open(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, packet : bytes) -> bool:
+        for datagram in splitPacket(packet, self.packetNumber):
+            self.socket.sendto(datagram, (self.host, self.port))
+        self.packetNumber = (self.packetNumber + 1) & 0xFFFFFFFF
+        return True
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def getName(self) -> str:
+        return 'udp://{}:{}'.format(self.host, self.port)
+
+
+class PtyTransport(FrameTransport):
+    """ Pseudo-terminal standing in for a serial port (POSIX only).
+
+    A cube simulator or a test opens the device named by getDeviceName and reads the packets from it.
+    The terminal is switched to raw mode, bytes go through unchanged. Packets are dropped while the
+    terminal buffer is full, when nobody reads them, a packet started is given WRITE_TIMEOUT to complete.
+    """
+
+    def __init__(self):
+        self.master = None
+        self.slave = None
+
+    def open(self):
+        import tty # POSIX only
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+
+    def getDeviceName(self) -> str:
+        return os.ttyname(self.slave) if self.slave is not None else ''
+
+    def send(self, packet : bytes) -> bool:
+        view = memoryview(packet)
+        while len(view) > 0:
+            try:
+                view = view[os.write(self.master, view):]
+            except BlockingIOError:
+                if len(view) == len(packet):
+                    return False # Nothing written yet, the packet is dropped
+                if not select.select([], [self.master], [], WRITE_TIMEOUT)[1]:
+                    return False # The end of the packet is lost, the receiver skips it with the CRC
+        return True
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def getName(self) -> str:
+        return self.getDeviceName() or 'pty'
+
+
+class LoopbackTransport(FrameTransport):
+    """ Keep the packets sent in memory instead of writing them.
+
+    Attributes:
+        packets (deque): Last packets sent, oldest first.
+    """
+
+    def __init__(self, maxPackets : int = 64):
+        self.packets = deque(maxlen=maxPackets)
+
+    def send(self, packet : bytes) -> bool:
+        self.packets.append(packet)
+        return True
+
+    def getName(self) -> str:
+        return 'loopback'
+
+
+class FrameOutputThread(QtCore.QThread):
+    """ Send the frames pushed from the GUI thread to a transport.
+
+    pushFrame only copies the frame, building and writing the packets happens in the thread.
+
+    Signals:
+        opened (): The transport is open, the device name of a PtyTransport is known.
+        failed (str): Error message, the thread stops after emitting it.
+        statsChanged (int, int): Packets sent, frames dropped because the link was busy.
+    """
+    opened = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)
+    statsChanged = QtCore.pyqtSignal(int, int)
+    stuckThreads = set()
+
+    def __init__(self, transport : FrameTransport, format : int = FORMAT_RGB888, paletteSize : int = PALETTE_MAX_SIZE,
+                 outputStage : OutputStage = None, parent = None):
+        super(FrameOutputThread, self).__init__(parent)
+        self.transport = transport
+        self.outputStage = outputStage if outputStage is not None else OutputStage()
+        self.format = format
+        self.paletteSize = paletteSize
+        self.condition = threading.Condition()
+        self.pendingFrame = None # Latest frame not sent yet
+        self.running = False
+        self.sequence = 0
+        self.sentPackets = 0
+        self.droppedFrames = 0
+
+    def start(self):
+        self.running = True
+        super(FrameOutputThread, self).start()
+
+    def pushFrame(self, colors : np.ndarray):
+        """ Queue a frame for sending, replacing the one still waiting."""
+        with self.condition:
+            if self.pendingFrame is not None:
+                self.droppedFrames += 1
+            self.pendingFrame = np.array(colors, dtype=np.uint8) # The editor keeps modifying its arrays
+            self.condition.notify()
+
+    def setOutputStage(self, outputStage : OutputStage):
+        """ Replace the stage applied to the next frames, it must not be used by another thread anymore."""
+        with self.condition:
+            self.outputStage = outputStage
+
+    def stop(self) -> bool:
+        """ Stop sending and wait for the thread to close the transport, at most STOP_TIMEOUT ms.
+
+        Returns:
+            False if the thread is still stuck in the transport, it is then left to finish on its own.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.wait(STOP_TIMEOUT):
+            return True
+        FrameOutputThread.stuckThreads.add(self) # Not destroyed with its parent while running
+        self.setParent(None)
+        self.finished.connect(lambda: FrameOutputThread.stuckThreads.discard(self))
+        return False
+
+    def run(self):
+        try:
+            self.transport.open()
+            self.opened.emit()
+            while True:
+                with self.condition:
+                    while self.running and self.pendingFrame is None:
+                        self.condition.wait()
+                    if not self.running:
+                        break
+                    colors, self.pendingFrame = self.pendingFrame, None
+                    outputStage = self.outputStage
+                colors = outputStage.processFrame(colors)
+                if self.transport.send(buildPacket(colors, self.sequence, self.format, self.paletteSize)):
+                    self.sentPackets += 1
+                else:
+                    with self.condition:
+                        self.droppedFrames += 1
+                self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+                self.statsChanged.emit(self.sentPackets, self.droppedFrames)
+        except Exception as error:
+            self.running = False
+            self.failed.emit(str(error))
+        finally:
+            self.transport.close()
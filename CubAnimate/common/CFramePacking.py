@@ -0,0 +1,162 @@
+""" Packing of animations for micro-controllers.
+
+Frames are packed all at once from a (frames, X, Y, Z, 3) uint8 array, LEDs in .anim order (x varies
+first, then y, then z). Layouts of one frame:
+    PACK_RGB888     3 bytes per LED, R, G, B.
+    PACK_RGB565     2 bytes per LED, little-endian RRRRRGGG GGGBBBBB word.
+    PACK_PALETTE8   1 byte per LED, index in the palette of the animation, quantized when the
+                    animation uses more colors than the palette holds (see CPalette).
+    PACK_BCM        Bit planes for binary code modulation, layer by layer (z), most significant plane first.
+                    A plane holds one bit of each channel of the layer LEDs, R, G, B for each LED,
+                    packed 8 bits per byte most significant bit first: the order they are shifted out.
+
+Blob layout (.cpk), little-endian:
+    header      magic 'CPK', version (u8), layout (u8), bit depth (u8), reserved (u16),
+                X, Y, Z, FPS (u16), frame count (u32), frame size in bytes (u32), palette size (u16)
+    palette     palette size x 3 bytes, RGB
+    frames      frame count x frame size bytes
+"""
+
+import re
+import struct
+
+import numpy as np
+
+from .CTypes import CubeSize
+from .CPalette import PALETTE_MAX_SIZE, buildPalette
+
+PACKED_EXTENSION = '.cpk'
+HEADER_EXTENSION = '.h'
+PACKED_MAGIC = b'CPK'
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<3sBBBHHHHHIIH')
+
+PACK_RGB888 = 0
+PACK_RGB565 = 1
+PACK_PALETTE8 = 2
+PACK_BCM = 3
+
+PACKING_NAMES = {PACK_RGB888: 'RGB888', PACK_RGB565: 'RGB565', PACK_PALETTE8: 'Palette (8 bit)', PACK_BCM: 'Bit planes (BCM)'}
+
+_HEX_LITERALS = np.array([list('0x{:02x},'.format(value).encode('ascii')) for value in range(256)], dtype=np.uint8)
+
+
+def toPackOrder(frames : np.ndarray) -> np.ndarray:
+    """ Return the (frames, X*Y*Z, 3) view of (frames, X, Y, Z, 3) colors, LEDs in .anim order."""
+    return frames.transpose(0,3,2,1,4).reshape(frames.shape[0], -1, 3)
+
+def packRGB565(frames : np.ndarray) -> np.ndarray:
+    packed = toPackOrder(frames).astype(np.uint16)
+    words = ((packed[..., 0] >> 3) << 11) | ((packed[..., 1] >> 2) << 5) | (packed[..., 2] >> 3)
+    return words.astype('<u2').view(np.uint8).reshape(frames.shape[0], -1)
+
+def packBitPlanes(frames : np.ndarray, bitDepth : int = 8) -> np.ndarray:
+    """ Return the (frames, Z * bitDepth * planeSize) bytes of the BCM planes, see PACK_BCM."""
+    count, x, y, z = frames.shape[:4]
+    layers = frames.transpose(0,3,2,1,4).reshape(count, z, x * y * 3) >> (8 - bitDepth) # (frames, Z, layer channels)
+    shifts = np.arange(bitDepth - 1, -1, -1, dtype=np.uint8) # Most significant plane first
+    bits = (layers[:, :, np.newaxis, :] >> shifts[:, np.newaxis]) & 1 # (frames, Z, planes, layer channels)
+    return np.packbits(bits, axis=-1).reshape(count, -1)
+
+
+class PackedAnimation:
+    """ Animation packed in a layout ready for a micro-controller.
+
+    Attributes:
+        name (str): Name of the animation.
+        cubeSize (CubeSize): Number of LEDs along each axis.
+        fps (int): Frame rate of the animation.
+        layout (int): One of PACK_RGB888, PACK_RGB565, PACK_PALETTE8, PACK_BCM.
+        bitDepth (int): Bits per channel of PACK_BCM.
+        palette (np.ndarray): (P, 3) uint8 colors of PACK_PALETTE8, empty for the other layouts.
+        frames (np.ndarray): (frames, frame size) uint8 packed frames.
+    """
+
+    def __init__(self, name : str, cubeSize : CubeSize, fps : int, layout : int, frames : np.ndarray, palette : np.ndarray = None, bitDepth : int = 8):
+        self.name = name
+        self.cubeSize = cubeSize
+        self.fps = fps
+        self.layout = layout
+        self.bitDepth = bitDepth
+        self.frames = frames
+        self.palette = palette if palette is not None else np.zeros((0, 3), dtype=np.uint8)
+
+    def getFrameCount(self) -> int:
+        return self.frames.shape[0]
+
+    def getFrameSize(self) -> int:
+        return self.frames.shape[1]
+
+    def getSize(self) -> int:
+        """ Return the size in bytes of the palette and the frames."""
+        return self.palette.nbytes + self.frames.nbytes
+
+    def packHeader(self) -> bytes:
+        return PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, self.layout, self.bitDepth, 0, *self.cubeSize.getShape(),
+                                  self.fps, self.getFrameCount(), self.getFrameSize(), len(self.palette))
+
+    def writeBlob(self, fileLocation : str):
+        """ Write the .cpk file of the animation."""
+        with open(fileLocation, 'wb') as file:
+            file.write(self.packHeader())
+            file.write(np.ascontiguousarray(self.palette).tobytes())
+            file.write(np.ascontiguousarray(self.frames).tobytes())
+
+    def getIdentifier(self) -> str:
+        """ Return the name of the animation as a C identifier."""
+        identifier = re.sub(r'\W', '_', self.name, flags=re.ASCII).strip('_') or 'animation'
+        return identifier if not identifier[0].isdigit() else 'anim_' + identifier
+
+    def writeCHeader(self, fileLocation : str):
+        """ Write the animation as const arrays of a C header, one frame per line."""
+        identifier = self.getIdentifier()
+        prefix = identifier.upper()
+        x, y, z = self.cubeSize.getShape()
+        with open(fileLocation, 'w') as file:
+            file.write('/* {} - {} */\n'.format(self.name.replace('*/', '* /'), PACKING_NAMES[self.layout]))
+            file.write('#ifndef {0}_H\n#define {0}_H\n\n#include <stdint.h>\n\n'.format(prefix))
+            for key, value in (('SIZE_X', x), ('SIZE_Y', y), ('SIZE_Z', z), ('FPS', self.fps), ('FRAME_COUNT', self.getFrameCount()),
+                               ('FRAME_SIZE', self.getFrameSize()), ('LAYOUT', self.layout), ('BIT_DEPTH', self.bitDepth), ('PALETTE_SIZE', len(self.palette))):
+                file.write('#define {}_{} {}\n'.format(prefix, key, value))
+            if len(self.palette) > 0:
+                file.write('\nstatic const uint8_t {}_palette[{}][3] = {{\n'.format(identifier, len(self.palette)))
+                file.write(self.formatRows(self.palette))
+                file.write('};\n')
+            file.write('\nstatic const uint8_t {}_frames[{}][{}] = {{\n'.format(identifier, self.getFrameCount(), self.getFrameSize()))
+            file.write(self.formatRows(self.frames))
+            file.write('};\n\n#endif\n')
+
+    @staticmethod
+    def formatRows(rows : np.ndarray) -> str:
+        """ Return the C initializers of the rows of a uint8 array, the literals are built with a lookup table."""
+        literals = _HEX_LITERALS[rows].reshape(rows.shape[0], -1) # '0x00,' for each byte
+        return ''.join('    {' + row.tobytes().decode('ascii')[:-1] + '},\n' for row in literals)
+
+
+def packAnimation(name : str, frames : np.ndarray, fps : int, layout : int, bitDepth : int = 8, paletteSize : int = PALETTE_MAX_SIZE) -> PackedAnimation:
+    """ Pack the frames of an animation.
+
+    Parameters:
+        frames (np.ndarray): (frames, X, Y, Z, 3) uint8 colors.
+        layout (int): One of PACK_RGB888, PACK_RGB565, PACK_PALETTE8, PACK_BCM.
+        bitDepth (int): Bits per channel of PACK_BCM, from 1 to 8.
+        paletteSize (int): Maximum number of colors of PACK_PALETTE8, from 1 to 256.
+    """
+    frames = np.asarray(frames, dtype=np.uint8)
+    cubeSize = CubeSize(*frames.shape[1:4])
+    palette = None
+    if layout == PACK_RGB888:
+        packed = toPackOrder(frames).reshape(frames.shape[0], -1)
+    elif layout == PACK_RGB565:
+        packed = packRGB565(frames)
+    elif layout == PACK_PALETTE8:
+        colorPalette = buildPalette(frames, paletteSize)
+        palette = colorPalette.colors
+        packed = colorPalette.indicesOf(toPackOrder(frames))
+    elif layout == PACK_BCM:
+        if not 1 <= bitDepth <= 8:
+            raise ValueError("Bit depth must be from 1 to 8")
+        packed = packBitPlanes(frames, bitDepth)
+    else:
+        raise ValueError("Unknown packing layout {}".format(layout))
+    return PackedAnimation(name, cubeSize, fps, layout, np.ascontiguousarray(packed), palette, bitDepth if layout == PACK_BCM else 8)
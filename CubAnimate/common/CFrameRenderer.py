@@ -0,0 +1,137 @@
+""" Parallel rendering of procedural animations.
+
+A frame generator is a picklable callable taking an array of times (s) and returning the matching
+(frames, X, Y, Z, 3) uint8 array. Rendering a job splits its time range into chunks computed by a pool
+of processes, finished chunks are streamed back in frame order so they can be written as they arrive.
+
+Workers are spawned on every platform: forking the threads of the Qt application is unsafe. The
+generator is thus imported in each worker, its module must not build widgets when imported, and
+frozen builds must call multiprocessing.freeze_support() at start-up.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PyQt5 import QtCore
+
+
+def _renderChunk(generator, times : np.ndarray) -> np.ndarray:
+    return generator(times)
+
+
+class FrameRenderJob:
+    """ Description of the frames to render.
+
+    Attributes:
+        generator (callable): Picklable frame generator, called with an array of times (s).
+        fps (int): Frame rate of the animation.
+        firstFrame (int): Index of the first frame to render.
+        frameCount (int): Number of frames to render.
+        chunkSize (int): Number of frames computed by a worker at once.
+    """
+
+    def __init__(self, generator, fps : int, frameCount : int, firstFrame : int = 0, chunkSize : int = 24):
+        self.generator = generator
+        self.fps = fps
+        self.firstFrame = firstFrame
+        self.frameCount = frameCount
+        self.chunkSize = max(1, chunkSize)
+
+    def chunks(self):
+        """ Yield the times (s) of the frames of each chunk, in order."""
+        for start in range(self.firstFrame, self.firstFrame + self.frameCount, self.chunkSize):
+            stop = min(start + self.chunkSize, self.firstFrame + self.frameCount)
+            yield np.arange(start, stop) / self.fps
+
+    def getChunkCount(self) -> int:
+        return -(-self.frameCount // self.chunkSize)
+
+
+def renderFrames(job : FrameRenderJob, maxWorkers : int = None, progress = None, isCanceled = None):
+    """ Yield the frames of a job in order, computed by a pool of processes.
+
+    At most two chunks per worker are pending at once, memory thus stays bounded however long the animation is.
+
+    Parameters:
+        maxWorkers (int): Number of processes, all the cores by default.
+        progress (callable): Called with (frames done, total frames) each time a chunk is received.
+        isCanceled (callable): Polled between chunks, stops the rendering when it returns True.
+    """
+    maxWorkers = maxWorkers or os.cpu_count() or 1
+    chunks = job.chunks()
+    done = 0
+    with ProcessPoolExecutor(max_workers=maxWorkers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        pending = deque()
+        for times in chunks:
+            pending.append(executor.submit(_renderChunk, job.generator, times))
+            if len(pending) >= 2 * maxWorkers:
+                break
+        while len(pending) > 0:
+            frames = pending.popleft().result()
+            if isCanceled is not None and isCanceled():
+                for future in pending:
+                    future.cancel()
+                return
+            times = next(chunks, None)
+            if times is not None:
+                pending.append(executor.submit(_renderChunk, job.generator, times))
+            for colors in frames:
+                yield colors
+            done += len(frames)
+            if progress is not None:
+                progress(done, job.frameCount)
+
+
+class FrameRenderThread(QtCore.QThread):
+    """ Render a job in the background and write its frames with an animation writer.
+
+    The writer is closed when all the frames are written and aborted on failure or cancellation.
+    The waiting cursor signal of the editors is raised during the rendering.
+
+    Signals:
+        progress (int, int): Frames written, total frames.
+        failed (str): Error message, emitted instead of succeeded.
+        canceled (): The rendering was canceled, emitted instead of succeeded.
+        succeeded (): All the frames are written.
+    """
+    progress = QtCore.pyqtSignal(int, int)
+    failed = QtCore.pyqtSignal(str)
+    canceled = QtCore.pyqtSignal()
+    succeeded = QtCore.pyqtSignal()
+
+    def __init__(self, job : FrameRenderJob, writer, waitingCursor_signal : QtCore.pyqtSignal = None, maxWorkers : int = None, parent = None):
+        super(FrameRenderThread, self).__init__(parent)
+        self.job = job
+        self.writer = writer
+        self.maxWorkers = maxWorkers
+        self.cancelRequested = False
+        if waitingCursor_signal is not None:
+            self.started.connect(lambda: waitingCursor_signal.emit(True))
+            self.finished.connect(lambda: waitingCursor_signal.emit(False))
+
+    def cancel(self):
+        """ Stop the rendering after the chunk in progress, the file is not written."""
+        self.cancelRequested = True
+
+    def stop(self):
+        """ Cancel the rendering and wait for the thread to abort the writer."""
+        self.cancel()
+        self.wait()
+
+    def run(self):
+        try:
+            for colors in renderFrames(self.job, self.maxWorkers, self.progress.emit, lambda: self.cancelRequested):
+                self.writer.writeFrame(colors)
+            if self.cancelRequested:
+                self.writer.abort()
+                self.canceled.emit()
+                return
+            self.writer.close()
+        except Exception as error:
+            self.writer.abort()
+            self.failed.emit(str(error))
+            return
+        self.succeeded.emit()
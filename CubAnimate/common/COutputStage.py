@@ -0,0 +1,282 @@
+""" Transformations applied to the frames sent to the hardware.
+
+Editors work with the colors seen on screen, LEDs do not render them the same way. Output stages adapt
+the frames on their way to an export or to the cube, the animation itself is left untouched: saving
+an animation stays lossless.
+
+A stage processes either a whole animation at once, (frames, X, Y, Z, 3) uint8 array, or a stream of
+frames one by one, (X, Y, Z, 3) uint8 arrays, in which case it may keep a state from frame to frame.
+"""
+
+import copy
+import json
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PyQt5.QtCore import QSettings
+
+_CHANNEL_OFFSETS = np.array([0, 256, 512], dtype=np.intp) # Start of each channel in a flattened (3, 256) table
+
+
+class OutputStage:
+    """ Transformation of the output frames, the identity by default."""
+
+    def processFrames(self, frames : np.ndarray) -> np.ndarray:
+        """ Return the processed (frames, X, Y, Z, 3) uint8 array of a whole animation."""
+        return np.stack([self.processFrame(colors) for colors in frames]) if len(frames) > 0 else frames
+
+    def processFrame(self, colors : np.ndarray) -> np.ndarray:
+        """ Return the processed (X, Y, Z, 3) uint8 array of the next frame of a stream."""
+        return colors
+
+    def reset(self):
+        """ Forget the frames of the stream processed so far."""
+        pass
+
+    def copy(self):
+        """ Return an independent copy of the stage, its stream state reset.
+
+        A stream runs in its own thread, it works on a copy while the editor keeps changing the original.
+        """
+        stage = copy.deepcopy(self)
+        stage.reset()
+        return stage
+
+
+class ColorCorrection(OutputStage):
+    """ Per channel gamma, white balance and global brightness.
+
+    Each channel value v becomes 255 * brightness * whiteBalance * (v / 255) ** gamma. The three curves
+    are computed once in a 256-entry lookup table per channel, a frame then costs a single np.take.
+
+    Attributes:
+        gamma (tuple): Exponent of the red, green and blue channels, 1.0 keeps the values.
+        whiteBalance (tuple): Gain of the red, green and blue channels, from 0.0 to 1.0.
+        brightness (float): Gain of all the channels, from 0.0 to 1.0.
+    """
+
+    def __init__(self, gamma : tuple = (2.2, 2.2, 2.2), whiteBalance : tuple = (1.0, 1.0, 1.0), brightness : float = 1.0):
+        self.setParameters(gamma, whiteBalance, brightness)
+
+    def setParameters(self, gamma : tuple, whiteBalance : tuple, brightness : float):
+        self.gamma = tuple(float(value) for value in gamma)
+        self.whiteBalance = tuple(min(max(float(value), 0.0), 1.0) for value in whiteBalance)
+        self.brightness = min(max(float(brightness), 0.0), 1.0)
+        levels = np.arange(256) / 255
+        curves = [gain * self.brightness * levels ** exponent for exponent, gain in zip(self.gamma, self.whiteBalance)]
+        self.lut = np.clip(np.rint(np.stack(curves) * 255), 0, 255).astype(np.uint8) # (3, 256)
+        self.flatLUT = self.lut.ravel()
+
+    def getLUT(self) -> np.ndarray:
+        """ Return the (3, 256) uint8 table of the red, green and blue channels."""
+        return self.lut
+
+    def isIdentity(self) -> bool:
+        return bool(np.all(self.lut == np.arange(256, dtype=np.uint8)))
+
+    def apply(self, colors : np.ndarray) -> np.ndarray:
+        """ Return the corrected colors of any (..., 3) uint8 array."""
+        return np.take(self.flatLUT, colors + _CHANNEL_OFFSETS)
+
+    def processFrames(self, frames : np.ndarray) -> np.ndarray:
+        return self.apply(frames)
+
+    def processFrame(self, colors : np.ndarray) -> np.ndarray:
+        return self.apply(colors)
+
+    def toDict(self) -> dict:
+        return {'gamma': list(self.gamma), 'whiteBalance': list(self.whiteBalance), 'brightness': self.brightness}
+
+    @classmethod
+    def fromDict(cls, data : dict):
+        return cls(data['gamma'], data['whiteBalance'], data['brightness'])
+
+
+class PowerReport:
+    """ Power drawn by an animation, before and after limiting.
+
+    Attributes:
+        currents (np.ndarray): Estimated current (mA) of each frame, before limiting.
+        limitedCurrents (np.ndarray): Estimated current (mA) of each frame, after limiting.
+        voltage (float): Supply voltage (V).
+    """
+
+    def __init__(self, currents : np.ndarray, limitedCurrents : np.ndarray, voltage : float):
+        self.currents = currents
+        self.limitedCurrents = limitedCurrents
+        self.voltage = voltage
+
+    def getPeakPower(self, limited : bool = True) -> float:
+        """ Return the power (W) of the most demanding frame."""
+        currents = self.limitedCurrents if limited else self.currents
+        return float(currents.max()) * self.voltage / 1000 if len(currents) > 0 else 0.0
+
+    def getAveragePower(self, limited : bool = True) -> float:
+        currents = self.limitedCurrents if limited else self.currents
+        return float(currents.mean()) * self.voltage / 1000 if len(currents) > 0 else 0.0
+
+    def getLimitedFrameCount(self) -> int:
+        return int(np.count_nonzero(self.limitedCurrents < self.currents))
+
+    def __str__(self) -> str:
+        return 'Peak {:.1f} W ({:.1f} W before limiting), average {:.1f} W, {} frames dimmed'.format(
+            self.getPeakPower(), self.getPeakPower(False), self.getAveragePower(), self.getLimitedFrameCount())
+
+
+class PowerLimiter(OutputStage):
+    """ Dim the frames drawing more current than the power supply provides.
+
+    The current of a frame is estimated as idleCurrent per LED plus channelCurrent times value / 255 for
+    each channel. Frames over the budget are scaled down, the scale changes smoothly to avoid flickering:
+    for a whole animation the scale of each frame is the minimum over a window of frames, averaged over
+    the same window, it is thus never above the scale the frame needs. A stream can not look ahead, its
+    scale drops at once and rises back over smoothingFrames frames.
+
+    Attributes:
+        budget (float): Maximum current (mA) of the cube.
+        channelCurrent (tuple): Current (mA) of a red, green and blue channel at full value.
+        idleCurrent (float): Current (mA) of an LED switched off, drivers included.
+        voltage (float): Supply voltage (V), used to report the power.
+        smoothingFrames (int): Number of frames over which the scale changes.
+        enabled (bool): Frames are only dimmed when enabled, reports are always computed.
+        report (PowerReport): Report of the last animation processed.
+    """
+
+    def __init__(self, budget : float = 4000.0, channelCurrent : tuple = (20.0, 20.0, 20.0), idleCurrent : float = 0.0,
+                 voltage : float = 5.0, smoothingFrames : int = 12, enabled : bool = False):
+        self.budget = float(budget)
+        self.channelCurrent = tuple(float(value) for value in channelCurrent)
+        self.idleCurrent = float(idleCurrent)
+        self.voltage = float(voltage)
+        self.smoothingFrames = max(1, int(smoothingFrames))
+        self.enabled = enabled
+        self.report = None
+        self.streamScale = 1.0
+
+    @staticmethod
+    def ledCount(frames : np.ndarray) -> int:
+        """ Return the number of LEDs of a frame of a (frames, X, Y, Z, 3) array, even without frames."""
+        return int(np.prod(frames.shape[1:-1]))
+
+    def estimateCurrents(self, frames : np.ndarray) -> np.ndarray:
+        """ Return the current (mA) of each frame of a (frames, X, Y, Z, 3) array."""
+        leds = self.ledCount(frames)
+        channelSums = frames.reshape(frames.shape[0], leds, 3).sum(axis=1, dtype=np.int64) # (frames, 3)
+        return channelSums @ (np.asarray(self.channelCurrent) / 255) + self.idleCurrent * leds
+
+    def requiredScales(self, currents : np.ndarray, leds : int) -> np.ndarray:
+        """ Return the largest scale keeping each frame within the budget, idle current not scalable."""
+        idle = self.idleCurrent * leds
+        dynamic = currents - idle
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scales = np.where(dynamic > 0, (self.budget - idle) / dynamic, 1.0)
+        return np.clip(scales, 0.0, 1.0)
+
+    def smoothScales(self, scales : np.ndarray) -> np.ndarray:
+        """ Windowed minimum then moving average of the scales of consecutive frames."""
+        radius = self.smoothingFrames // 2
+        if radius == 0 or len(scales) < 2:
+            return scales
+        padded = np.pad(scales, radius, mode='edge')
+        minimum = sliding_window_view(padded, 2 * radius + 1).min(axis=1)
+        padded = np.pad(minimum, radius, mode='edge')
+        cumulated = np.concatenate([[0.0], np.cumsum(padded)])
+        smoothed = (cumulated[2 * radius + 1:] - cumulated[:-2 * radius - 1]) / (2 * radius + 1)
+        return np.minimum(smoothed, scales) # Rounding errors only
+
+    def analyse(self, frames : np.ndarray) -> tuple:
+        """ Return the smoothed scale of each frame and the power report of an animation."""
+        currents = self.estimateCurrents(frames)
+        leds = self.ledCount(frames)
+        scales = self.smoothScales(self.requiredScales(currents, leds)) if self.enabled else np.ones(len(currents))
+        idle = self.idleCurrent * leds
+        return scales, PowerReport(currents, idle + (currents - idle) * scales, self.voltage)
+
+    def scaleFrames(self, frames : np.ndarray, scales : np.ndarray) -> np.ndarray:
+        if np.all(scales >= 1.0):
+            return frames
+        scales = np.floor(scales * 256).astype(np.uint16).reshape((-1,) + (1,) * (frames.ndim - 1)) # Fixed point, rounded down
+        return ((frames * scales) >> 8).astype(np.uint8)
+
+    def processFrames(self, frames : np.ndarray) -> np.ndarray:
+        scales, self.report = self.analyse(frames)
+        return self.scaleFrames(frames, scales)
+
+    def processFrame(self, colors : np.ndarray) -> np.ndarray:
+        if not self.enabled:
+            return colors
+        frame = colors[np.newaxis]
+        required = self.requiredScales(self.estimateCurrents(frame), self.ledCount(frame))[0]
+        self.streamScale = min(required, self.streamScale + 1.0 / self.smoothingFrames) # Drop at once, rise slowly
+        return self.scaleFrames(frame, np.array([self.streamScale]))[0]
+
+    def reset(self):
+        self.streamScale = 1.0
+
+    def toDict(self) -> dict:
+        return {'budget': self.budget, 'channelCurrent': list(self.channelCurrent), 'idleCurrent': self.idleCurrent,
+                'voltage': self.voltage, 'smoothingFrames': self.smoothingFrames, 'enabled': self.enabled}
+
+    @classmethod
+    def fromDict(cls, data : dict):
+        return cls(data['budget'], data['channelCurrent'], data['idleCurrent'], data['voltage'], data['smoothingFrames'], bool(data['enabled']))
+
+
+class OutputPipeline(OutputStage):
+    """ Stages applied one after the other.
+
+    Attributes:
+        stages (list): OutputStage objects, in order.
+    """
+
+    def __init__(self, stages : list = None):
+        self.stages = list(stages) if stages is not None else []
+
+    def getStage(self, stageType):
+        """ Return the first stage of the given class, None if there is none."""
+        for stage in self.stages:
+            if isinstance(stage, stageType):
+                return stage
+        return None
+
+    def processFrames(self, frames : np.ndarray) -> np.ndarray:
+        for stage in self.stages:
+            frames = stage.processFrames(frames)
+        return frames
+
+    def processFrame(self, colors : np.ndarray) -> np.ndarray:
+        for stage in self.stages:
+            colors = stage.processFrame(colors)
+        return colors
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+
+def loadStage(key : str, stageType):
+    """ Return the stage saved in the settings of the application under the given key, the default one otherwise.
+
+    Parameters:
+        stageType: ColorCorrection or PowerLimiter.
+    """
+    data = QSettings('CubAnimate', 'Output').value(key, '')
+    try:
+        return stageType.fromDict(json.loads(data))
+    except (TypeError, ValueError, KeyError):
+        return stageType()
+
+def saveStage(key : str, stage):
+    QSettings('CubAnimate', 'Output').setValue(key, json.dumps(stage.toDict()))
+
+def loadColorCorrection() -> ColorCorrection:
+    return loadStage('colorCorrection', ColorCorrection)
+
+def saveColorCorrection(correction : ColorCorrection):
+    saveStage('colorCorrection', correction)
+
+def loadPowerLimiter() -> PowerLimiter:
+    return loadStage('powerLimiter', PowerLimiter)
+
+def savePowerLimiter(limiter : PowerLimiter):
+    saveStage('powerLimiter', limiter)
@@ -0,0 +1,132 @@
+""" Color palettes of animations.
+
+Animations drawn by hand use a few colors, each LED can then be stored as an index in a palette of
+the animation instead of a full RGB color. When an animation uses more colors than the palette can
+hold, the palette is built by a median cut over the distinct colors weighted by their number of LEDs
+and each color is replaced by the nearest one of the palette.
+"""
+
+import numpy as np
+
+PALETTE_MAX_SIZE = 256
+NEAREST_CHUNK_SIZE = 65536 # Colors compared to the palette at once, bounds the memory used
+
+
+def colorKeys(colors : np.ndarray) -> np.ndarray:
+    """ Return the 0xRRGGBB uint32 key of each color of a (..., 3) uint8 array."""
+    colors = colors.astype(np.uint32)
+    return (colors[..., 0] << 16) | (colors[..., 1] << 8) | colors[..., 2]
+
+def keyColors(keys : np.ndarray) -> np.ndarray:
+    """ Inverse of colorKeys."""
+    return np.stack([keys >> 16, (keys >> 8) & 0xFF, keys & 0xFF], axis=-1).astype(np.uint8)
+
+def distinctColors(colors : np.ndarray) -> tuple:
+    """ Return the distinct colors of a (..., 3) uint8 array.
+
+    Returns:
+        (colors, counts): (P, 3) uint8 colors sorted by key and the number of LEDs of each.
+    """
+    keys, counts = np.unique(colorKeys(colors), return_counts=True)
+    return keyColors(keys), counts
+
+def medianCut(colors : np.ndarray, counts : np.ndarray, size : int) -> np.ndarray:
+    """ Reduce weighted colors to a palette.
+
+    The box of colors with the largest channel range times weight is split at the weighted median of
+    that channel, until the palette size is reached or no box can be split. Each box gives the weighted
+    mean of its colors.
+
+    Parameters:
+        colors (np.ndarray): (P, 3) uint8 distinct colors.
+        counts (np.ndarray): (P,) weight of each color.
+        size (int): Number of colors of the palette.
+    Returns:
+        (K, 3) uint8 palette, K <= size.
+    """
+    colors = colors.astype(np.int32)
+    counts = counts.astype(np.float64)
+
+    def score(box):
+        spread = np.ptp(colors[box], axis=0)
+        return spread.max() * counts[box].sum(), int(spread.argmax())
+
+    boxes = [np.arange(len(colors))]
+    scores = [score(boxes[0])]
+    while len(boxes) < size:
+        index = max(range(len(boxes)), key=lambda i: scores[i][0])
+        if scores[index][0] == 0: # Only single color boxes left
+            break
+        box, channel = boxes[index], scores[index][1]
+        box = box[np.argsort(colors[box, channel], kind='stable')]
+        cumulated = np.cumsum(counts[box])
+        cut = int(np.searchsorted(cumulated, cumulated[-1] / 2)) + 1
+        cut = min(max(cut, 1), len(box) - 1)
+        while cut < len(box) and colors[box[cut], channel] == colors[box[cut-1], channel]: # Keep equal values together
+            cut += 1
+        if cut == len(box):
+            cut = int(np.searchsorted(colors[box, channel], colors[box[-1], channel]))
+        boxes[index:index+1] = [box[:cut], box[cut:]]
+        scores[index:index+1] = [score(box[:cut]), score(box[cut:])]
+
+    palette = [np.rint((colors[box] * counts[box, np.newaxis]).sum(axis=0) / counts[box].sum()) for box in boxes]
+    return np.array(palette, dtype=np.uint8)
+
+def nearestColors(colors : np.ndarray, palette : np.ndarray) -> np.ndarray:
+    """ Return the index of the nearest palette color (euclidean RGB distance) of each (P, 3) color."""
+    palette = palette.astype(np.float32)
+    paletteNorms = (palette**2).sum(axis=1)
+    indices = np.empty(len(colors), dtype=np.intp)
+    for start in range(0, len(colors), NEAREST_CHUNK_SIZE):
+        chunk = colors[start:start + NEAREST_CHUNK_SIZE].astype(np.float32)
+        distances = paletteNorms[np.newaxis] - 2 * chunk @ palette.T # |c|^2 is the same for all the palette
+        indices[start:start + NEAREST_CHUNK_SIZE] = distances.argmin(axis=1)
+    return indices
+
+
+class ColorPalette:
+    """ Palette mapping colors to uint8 indices.
+
+    Attributes:
+        colors (np.ndarray): (K, 3) uint8 colors of the palette, K <= 256.
+        exact (bool): Every color of the analysed frames is in the palette, indexing is lossless.
+    """
+
+    def __init__(self, colors : np.ndarray, exact : bool = True):
+        if not 0 < len(colors) <= PALETTE_MAX_SIZE:
+            raise ValueError("A palette holds from 1 to {} colors".format(PALETTE_MAX_SIZE))
+        self.colors = np.ascontiguousarray(colors, dtype=np.uint8)
+        self.exact = exact
+        keys = colorKeys(self.colors)
+        self.order = np.argsort(keys, kind='stable')
+        self.sortedKeys = keys[self.order]
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def indicesOf(self, colors : np.ndarray) -> np.ndarray:
+        """ Return the uint8 palette index of each color of a (..., 3) array, the nearest one for the colors missing."""
+        keys, inverse = np.unique(colorKeys(colors), return_inverse=True) # Each distinct color is looked up once
+        position = np.minimum(np.searchsorted(self.sortedKeys, keys), len(self.sortedKeys) - 1)
+        found = self.sortedKeys[position] == keys
+        indices = self.order[position]
+        if not found.all():
+            indices[~found] = nearestColors(keyColors(keys[~found]), self.colors)
+        return indices.astype(np.uint8)[inverse].reshape(colors.shape[:-1])
+
+    def colorsOf(self, indices : np.ndarray) -> np.ndarray:
+        """ Return the (..., 3) colors of palette indices."""
+        return self.colors[indices]
+
+
+def buildPalette(colors : np.ndarray, size : int = PALETTE_MAX_SIZE) -> ColorPalette:
+    """ Return the palette of frames, exact when they use at most size colors, quantized otherwise.
+
+    Parameters:
+        colors (np.ndarray): (..., 3) uint8 colors, a frame or a whole animation.
+        size (int): Maximum number of colors of the palette, from 1 to 256.
+    """
+    distinct, counts = distinctColors(colors)
+    if len(distinct) <= size:
+        return ColorPalette(distinct, exact=True)
+    return ColorPalette(medianCut(distinct, counts, size), exact=False)
@@ -0,0 +1,71 @@
+""" Clock driving the animation previews.
+
+The clock lives in the GUI thread: a QTimer never queues more than one pending timeout, ticks the GUI
+could not handle in time are thus dropped instead of piling up. Each tick carries the time elapsed since
+the clock started, previews compute their frame from it and stay on time whatever the dropped ticks.
+"""
+
+from PyQt5 import QtCore
+
+
+class PlaybackClock(QtCore.QObject):
+    """ Periodic tick source measuring the playback time.
+
+    Signals:
+        tick (float): Playback time (s), paused periods excluded.
+    """
+    tick = QtCore.pyqtSignal(float)
+
+    def __init__(self, interval : int, parent = None):
+        """
+        Args:
+            interval (int): Time between ticks (ms).
+        """
+        super(PlaybackClock, self).__init__(parent)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.emitTick)
+        self.elapsedTimer = QtCore.QElapsedTimer()
+        self.pausedTime = 0.0 # Playback time accumulated before the last start (s)
+
+    def setInterval(self, interval : int):
+        self.timer.setInterval(interval)
+
+    def getInterval(self) -> int:
+        return self.timer.interval()
+
+    def isActive(self) -> bool:
+        return self.timer.isActive()
+
+    def start(self):
+        if not self.timer.isActive():
+            self.elapsedTimer.start()
+            self.timer.start()
+
+    def stop(self):
+        """ Pause the clock, the playback time resumes from here on the next start."""
+        if self.timer.isActive():
+            self.timer.stop()
+            self.pausedTime += self.elapsedTimer.elapsed() / 1000
+
+    def setRunning(self, running : bool):
+        if running:
+            self.start()
+        else:
+            self.stop()
+
+    def reset(self, time : float = 0.0):
+        """ Set the playback time (s)."""
+        self.pausedTime = time
+        if self.timer.isActive():
+            self.elapsedTimer.restart()
+
+    def getTime(self) -> float:
+        """ Return the playback time (s)."""
+        if self.timer.isActive():
+            return self.pausedTime + self.elapsedTimer.elapsed() / 1000
+        return self.pausedTime
+
+    def emitTick(self):
+        self.tick.emit(self.getTime())
@@ -0,0 +1,169 @@
+""" Thumbnails of frames for the animation timeline.
+
+Thumbnails are drawn from the frame arrays by a small 2D rasterizer instead of the 3D graph: each LED is
+projected as a dot, nearest dots first. The rasterizer only uses numpy and QImage, it thus runs in the
+threads of a QThreadPool. Thumbnails are cached by frame content, identical frames share the same image.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5 import QtCore
+from PyQt5.QtGui import QImage, QPixmap
+
+THUMBNAIL_YAW = np.radians(-35)   # Rotation of the cube around its vertical axis
+THUMBNAIL_PITCH = np.radians(25)  # Elevation of the point of view
+ERASED_ALPHA = 60
+
+
+def rasterizeThumbnail(colors : np.ndarray, width : int, height : int, nullRGB : tuple = (255,255,255)) -> np.ndarray:
+    """ Draw a frame seen from above one of its corners.
+
+    Parameters:
+        colors (np.ndarray): (X, Y, Z, 3) uint8 colors, z is the height.
+        width, height (int): Size of the image in pixels.
+        nullRGB (tuple): Color of the erased LEDs, drawn smaller and translucent.
+    Returns:
+        (height, width, 4) uint8 RGBA image, transparent background.
+    """
+    shape = colors.shape[:3]
+    x, y, z = [axis.ravel() - (size - 1) / 2 for axis, size in zip(np.meshgrid(*[np.arange(s, dtype=float) for s in shape], indexing='ij'), shape)]
+    rgb = colors.reshape(-1, 3)
+    lit = np.any(rgb != np.asarray(nullRGB, dtype=np.uint8), axis=-1)
+
+    ## Projection
+    u = x * np.cos(THUMBNAIL_YAW) - y * np.sin(THUMBNAIL_YAW)
+    ground = x * np.sin(THUMBNAIL_YAW) + y * np.cos(THUMBNAIL_YAW)
+    v = z * np.cos(THUMBNAIL_PITCH) - ground * np.sin(THUMBNAIL_PITCH)
+    depth = ground * np.cos(THUMBNAIL_PITCH) + z * np.sin(THUMBNAIL_PITCH) # Greater is farther
+    extent = max(np.ptp(u), np.ptp(v), 1.0)
+    scale = 0.85 * min(width, height) / (extent + 1)
+    centerX = np.rint(width / 2 + u * scale).astype(np.intp)
+    centerY = np.rint(height / 2 - v * scale).astype(np.intp)
+
+    ## Dots, erased LEDs are smaller
+    radius = max(1, int(scale * 0.4))
+    radii = np.where(lit, radius, max(0, radius // 2))
+    offsetY, offsetX = np.mgrid[-radius:radius+1, -radius:radius+1]
+    offsetX, offsetY = offsetX.ravel(), offsetY.ravel()
+    inside = offsetX[np.newaxis]**2 + offsetY[np.newaxis]**2 <= radii[:, np.newaxis]**2 # (LEDs, offsets)
+    led, offset = np.nonzero(inside)
+    pixelX = centerX[led] + offsetX[offset]
+    pixelY = centerY[led] + offsetY[offset]
+    visible = (pixelX >= 0) & (pixelX < width) & (pixelY >= 0) & (pixelY < height)
+    led, pixel = led[visible], pixelY[visible] * width + pixelX[visible]
+
+    ## Keep the nearest dot of each pixel
+    order = np.argsort(depth[led], kind='stable')
+    pixel, nearest = np.unique(pixel[order], return_index=True)
+    led = led[order][nearest]
+
+    image = np.zeros((height * width, 4), dtype=np.uint8)
+    image[pixel, :3] = rgb[led]
+    image[pixel, 3] = np.where(lit[led], 255, ERASED_ALPHA)
+    return image.reshape(height, width, 4)
+
+def thumbnailKey(colors : np.ndarray, size : QtCore.QSize) -> tuple:
+    """ Return the cache key of a frame drawn at the given size."""
+    digest = hashlib.blake2b(np.ascontiguousarray(colors).tobytes(), digest_size=16).digest()
+    return (digest, colors.shape, size.width(), size.height())
+
+
+class ThumbnailCache:
+    """ Least recently used thumbnails.
+
+    Attributes:
+        maxSize (int): Number of thumbnails kept.
+    """
+
+    def __init__(self, maxSize : int = 512):
+        self.maxSize = maxSize
+        self.pixmaps = OrderedDict()
+
+    def get(self, key) -> QPixmap:
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap : QPixmap):
+        self.pixmaps[key] = pixmap
+        self.pixmaps.move_to_end(key)
+        while len(self.pixmaps) > self.maxSize:
+            self.pixmaps.popitem(last=False)
+
+    def clear(self):
+        self.pixmaps.clear()
+
+
+class ThumbnailTaskSignals(QtCore.QObject):
+    ready = QtCore.pyqtSignal(object, QImage)
+
+
+class ThumbnailTask(QtCore.QRunnable):
+    def __init__(self, key, colors : np.ndarray, size : QtCore.QSize, nullRGB : tuple):
+        super(ThumbnailTask, self).__init__()
+        self.key = key
+        self.colors = colors
+        self.size = size
+        self.nullRGB = nullRGB
+        self.signals = ThumbnailTaskSignals()
+
+    def run(self):
+        width, height = self.size.width(), self.size.height()
+        data = rasterizeThumbnail(self.colors, width, height, self.nullRGB)
+        image = QImage(data.data, width, height, 4 * width, QImage.Format_RGBA8888).copy() # Own the pixels before data is freed
+        self.signals.ready.emit(self.key, image)
+
+
+class ThumbnailRenderer(QtCore.QObject):
+    """ Draw thumbnails in a thread pool and cache them.
+
+    Signals:
+        thumbnailReady (object, QPixmap): Key and thumbnail of a requested frame.
+    """
+    thumbnailReady = QtCore.pyqtSignal(object, QPixmap)
+
+    def __init__(self, size : QtCore.QSize, nullRGB : tuple = (255,255,255), cacheSize : int = 512, parent = None):
+        super(ThumbnailRenderer, self).__init__(parent)
+        self.size = size
+        self.nullRGB = nullRGB
+        self.cache = ThumbnailCache(cacheSize)
+        self.pending = set()
+        self.threadPool = QtCore.QThreadPool(self)
+
+    def setSize(self, size : QtCore.QSize):
+        self.size = size
+
+    def render(self, colors : np.ndarray) -> QPixmap:
+        """ Return the thumbnail of a frame, drawn in the GUI thread if not cached."""
+        key = thumbnailKey(colors, self.size)
+        pixmap = self.cache.get(key)
+        if pixmap is None:
+            data = rasterizeThumbnail(colors, self.size.width(), self.size.height(), self.nullRGB)
+            image = QImage(data.data, self.size.width(), self.size.height(), 4 * self.size.width(), QImage.Format_RGBA8888)
+            pixmap = QPixmap.fromImage(image)
+            self.cache.put(key, pixmap)
+        return pixmap
+
+    def request(self, colors : np.ndarray):
+        """ Ask for the thumbnail of a frame.
+
+        Returns:
+            (key, pixmap): pixmap is None when the thumbnail is being drawn, thumbnailReady is then emitted with the key.
+        """
+        key = thumbnailKey(colors, self.size)
+        pixmap = self.cache.get(key)
+        if pixmap is None and key not in self.pending:
+            self.pending.add(key)
+            task = ThumbnailTask(key, colors.copy(), QtCore.QSize(self.size), self.nullRGB)
+            task.signals.ready.connect(self.taskFinished)
+            self.threadPool.start(task)
+        return key, pixmap
+
+    def taskFinished(self, key, image : QImage):
+        self.pending.discard(key)
+        pixmap = QPixmap.fromImage(image)
+        self.cache.put(key, pixmap)
+        self.thumbnailReady.emit(key, pixmap)
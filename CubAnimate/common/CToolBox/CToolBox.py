@@ -13,7 +13,7 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QWidget,\
     QGraphicsDropShadowEffect, QSpacerItem, QSizePolicy,\
-    QHBoxLayout, QPushButton, QGridLayout, QLabel, QSlider
+    QHBoxLayout, QPushButton, QGridLayout, QLabel, QSlider, QComboBox
 
 from .CColorControl import CColorControl
 from .CColorInfos import CColorInfos
@@ -234,7 +234,7 @@ class ColorPickerWidget(QWidget):
 
 class CToolBox_Animator(QWidget):
 
-    def __init__(self, alphaSelection : bool, movableWindow : bool, saveAnimation_signal:pyqtSignal, playAnimation_signal:pyqtSignal, *args, **kwargs):
+    def __init__(self, alphaSelection : bool, movableWindow : bool, saveAnimation_signal:pyqtSignal, playAnimation_signal:pyqtSignal, streamAnimation_signal:pyqtSignal, exportAnimation_signal:pyqtSignal, outputSettings_signal:pyqtSignal, *args, **kwargs):
         super(CToolBox_Animator, self).__init__(*args, **kwargs)
 
         self.alphaON = alphaSelection
@@ -242,6 +242,9 @@ class CToolBox_Animator(QWidget):
 
         self.saveAnimation_signal = saveAnimation_signal
         self.playAnimation_signal = playAnimation_signal
+        self.streamAnimation_signal = streamAnimation_signal
+        self.exportAnimation_signal = exportAnimation_signal
+        self.outputSettings_signal = outputSettings_signal
 
         self.animationFPS = 24
 
@@ -274,15 +277,23 @@ class CToolBox_Animator(QWidget):
 
         self.labelName = QLabel('FPS', self)
         self.labelValue = QLabel('{}'.format(self.animationFPS), self)
-        self.sliderFPS = QSlider(Qt.Horizontal, valueChanged=lambda v: self.labelValue.setText(str(v)))
+        self.sliderFPS = QSlider(Qt.Horizontal, minimum=1, maximum=60)
         self.sliderFPS.setValue(self.animationFPS)
+        self.sliderFPS.valueChanged.connect(self.changeFPS)
 
         self.upperLayout.addWidget(self.sliderFPS,0,1)
         self.upperLayout.addWidget(self.labelValue,0,2)
         self.upperLayout.addWidget(self.labelName,0,0)
 
-        #self.playButton = QPushButton('', self, objectName='playButton', cursor=Qt.PointingHandCursor, toolTip='Play animation on screen',clicked= lambda :self.playAnimation_signal.emit())
-        #self.upperLayout.addWidget(self.playButton,2,1)
+        self.playButton = QPushButton('Play', self, objectName='playButton', cursor=Qt.PointingHandCursor, toolTip='Play animation on screen',clicked= lambda :self.playAnimation_signal.emit())
+        self.upperLayout.addWidget(self.playButton,2,1)
+        self.streamButton = QPushButton('Stream', self, objectName='playButton', cursor=Qt.PointingHandCursor, toolTip='Send the frames to the cube', checkable=True)
+        self.streamButton.toggled.connect(self.streamAnimation_signal.emit)
+        self.upperLayout.addWidget(self.streamButton,3,1)
+        self.exportButton = QPushButton('Export', self, objectName='playButton', cursor=Qt.PointingHandCursor, toolTip='Pack the animation for a micro-controller',clicked= lambda :self.exportAnimation_signal.emit())
+        self.upperLayout.addWidget(self.exportButton,4,1)
+        self.outputButton = QPushButton('Output', self, objectName='playButton', cursor=Qt.PointingHandCursor, toolTip='Color correction and power limit of the exported and streamed frames',clicked= lambda :self.outputSettings_signal.emit())
+        self.upperLayout.addWidget(self.outputButton,5,1)
         layout.addWidget(QWidget(self.colorView, objectName='splitLine'))
 
         self.colorPicker = ColorPickerWidget(self.alphaON, self.movableON)
@@ -314,6 +325,14 @@ class CToolBox_Animator(QWidget):
     def getFPS(self) -> int:
         return self.animationFPS
     
+    def setStreaming(self, on : bool, description : str = ''):
+        """ Show the streaming state without emitting streamAnimation_signal."""
+        self.streamButton.blockSignals(True)
+        self.streamButton.setChecked(on)
+        self.streamButton.blockSignals(False)
+        self.streamButton.setText('Stop stream' if on else 'Stream')
+        self.streamButton.setToolTip(description if on else 'Send the frames to the cube')
+
     def changeFPS(self, value):
         self.animationFPS = value
         self.labelValue.setText(str(self.animationFPS))
@@ -359,13 +378,19 @@ class CToolBox_HUE(QWidget):
 
         self.labelName = QLabel('Loop speed', self)
         self.labelValue = QLabel('{}'.format(int(self.loopDuration/1000)), self)
-        self.sliderFPS = QSlider(Qt.Horizontal, valueChanged=lambda v: self.labelValue.setText(str(v)))
+        self.sliderFPS = QSlider(Qt.Horizontal, minimum=1, maximum=60) # Loop duration in seconds, never null
         self.sliderFPS.setValue(int(self.loopDuration/1000))
+        self.sliderFPS.valueChanged.connect(lambda v: self.changeLoopDuration(v*1000))
 
         self.upperLayout.addWidget(self.sliderFPS,0,1)
         self.upperLayout.addWidget(self.labelValue,0,2)
         self.upperLayout.addWidget(self.labelName,0,0)
 
+        self.labelPattern = QLabel('Pattern', self)
+        self.patternBox = QComboBox(self)
+        self.upperLayout.addWidget(self.labelPattern,1,0)
+        self.upperLayout.addWidget(self.patternBox,1,1,1,2)
+
         layout.addWidget(QWidget(self.colorView, objectName='splitLine'))
 
         self.colorPicker = ColorPickerWidget(self.alphaON, self.movableON)
@@ -398,6 +423,16 @@ class CToolBox_HUE(QWidget):
         return self.loopDuration
     
     def changeLoopDuration(self, value):
-        self.loopDuration = value
+        self.loopDuration = max(1000, value)
         self.labelValue.setText(str(int(self.loopDuration/1000)))
         self.sliderFPS.setValue(int(self.loopDuration/1000))
+
+    def setPatterns(self, patterns : list):
+        self.patternBox.clear()
+        self.patternBox.addItems(patterns)
+
+    def getPattern(self) -> str:
+        return self.patternBox.currentText()
+
+    def changePattern(self, pattern : str):
+        self.patternBox.setCurrentText(pattern)
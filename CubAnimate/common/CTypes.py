@@ -1,6 +1,9 @@
 from enum import Enum
+import numpy as np
 from PyQt5.QtGui import QColor
 
+from .CFrameCodec import encodeFrameLine, decodeFrameLine
+
 class Axis(Enum):
     X = 0
     Y = 1
@@ -28,7 +31,23 @@ class CubeSize:
     def max(self):
         return max(self.size.values())
 
+    def getShape(self) -> tuple:
+        """ Return the number of LEDs along each axis as a (X, Y, Z) tuple."""
+        return (self.size[Axis.X], self.size[Axis.Y], self.size[Axis.Z])
+
 class CubeLEDFrame_DATA:
+    """ Colors of all the LEDs of a cube for a single frame.
+
+    Colors are stored in a contiguous uint8 array of shape (X, Y, Z, 3) holding the RGB channels of each LED,
+    a 16x16x16 frame thus only weighs 12 KB and whole-frame operations can be vectorized.
+
+    Attributes:
+        cubeSize (CubeSize): Number of LEDs along each axis.
+        nullColor (QColor): Color of an erased LED.
+        LEDcolors (np.ndarray): RGB colors of the LEDs, shape (X, Y, Z, 3).
+        loader (callable): If set, returns the colors of the frame the first time they are accessed.
+    """
+
     def __init__(self, cubeSize:CubeSize):
 
         self.illustration = None
@@ -37,40 +56,78 @@ class CubeLEDFrame_DATA:
 
         self.nullColor = QColor(255,255,255)
 
-        self.LEDcolors = []
-        for i in range(self.cubeSize.getSize(Axis.X)):
-            self.LEDcolors.append([])
-            for j in range(self.cubeSize.getSize(Axis.Y)):
-                self.LEDcolors[i].append([])
-                for k in range(self.cubeSize.getSize(Axis.Z)):
-                    self.LEDcolors[i][j].append(self.nullColor)
+        self.loader = None
+        self.LEDcolors = np.empty(self.cubeSize.getShape() + (3,), dtype=np.uint8)
+        self.LEDcolors[:] = self.nullColor.getRgb()[:3]
+    
+    @property
+    def LEDcolors(self) -> np.ndarray:
+        if self.loader is not None: # Decode the frame on first access
+            loader = self.loader
+            self.loader = None
+            self._LEDcolors = loader()
+        return self._LEDcolors
+    
+    @LEDcolors.setter
+    def LEDcolors(self, colors : np.ndarray):
+        self.loader = None
+        self._LEDcolors = colors
+    
+    def setLoader(self, loader):
+        """ Defer the loading of the colors until they are accessed.
+
+        Parameters:
+            loader (callable): Returns the (X, Y, Z, 3) uint8 array of the frame.
+        """
+        self.loader = loader
+    
+    def isLoaded(self) -> bool:
+        return self.loader is None
     
     def setColorLED(self, x:int, y:int, z:int, color : QColor):
         if self.cubeSize.pointDefined(x,y,z):
-            self.LEDcolors[x][y][z] = color
+            self.LEDcolors[x,y,z] = color.getRgb()[:3]
         else:
             print("No matching LED")
     
     def eraseColorLED(self, x:int, y :int, z :int):
         if self.cubeSize.pointDefined(x,y,z):
-            self.LEDcolors[x][y][z] = self.nullColor
+            self.LEDcolors[x,y,z] = self.nullColor.getRgb()[:3]
         else:
             print("No matching LED")
     
     def getColorLED(self, x :int, y :int, z :int) -> QColor:
         if self.cubeSize.pointDefined(x,y,z):
-            return self.LEDcolors[x][y][z]
+            return QColor(*self.LEDcolors[x,y,z].tolist())
         else:
             print("No matching LED")
             return self.nullColor
     
     def getColorLED_HEX(self, x :int, y :int, z :int) -> str:
         if self.cubeSize.pointDefined(x,y,z):
-            return self.LEDcolors[x][y][z].name()
+            return '#{:02x}{:02x}{:02x}'.format(*self.LEDcolors[x,y,z].tolist())
         else:
             print("No matching LED")
             return self.nullColor.name()
     
+    def getArray(self) -> np.ndarray:
+        """ Return the (X, Y, Z, 3) uint8 array of the LED colors, modifications are applied to the frame."""
+        return self.LEDcolors
+    
+    def setArray(self, colors : np.ndarray):
+        """ Copy the RGB colors of all the LEDs at once.
+
+        Parameters:
+            colors (np.ndarray): Array of shape (X, Y, Z, 3), values between 0 and 255.
+        """
+        if colors.shape != self.LEDcolors.shape:
+            raise ValueError("Frame shape {} does not match cube shape {}".format(colors.shape, self.LEDcolors.shape))
+        np.copyto(self.LEDcolors, colors, casting='unsafe')
+    
+    def clear(self):
+        """ Erase all the LEDs."""
+        self.LEDcolors[:] = self.nullColor.getRgb()[:3]
+    
     def getSize(self) -> CubeSize:
         return self.cubeSize
     
@@ -79,32 +136,14 @@ class CubeLEDFrame_DATA:
     
     def encode(self) -> str:
         """ Generate data line representing the frame for creating .anim file """
-        strOut = ''
-        for z in range(self.cubeSize.getSize(Axis.Z)):
-            for y in range(self.cubeSize.getSize(Axis.Y)):
-                for x in range(self.cubeSize.getSize(Axis.X)):
-                    strOut = strOut + self.LEDcolors[x][y][z].name()
-        return strOut
+        return encodeFrameLine(self.LEDcolors)
     
     def decode(self, dataLine : str):
-        
-        colorNameSize = 7
-        dataLength = len(dataLine)
-        listColorName = [ dataLine[i:i+colorNameSize] for i in range(0, dataLength, colorNameSize) ]
-        
-        self.LEDcolors.clear()
-        for i in range(self.cubeSize.getSize(Axis.X)):
-            self.LEDcolors.append([])
-            for j in range(self.cubeSize.getSize(Axis.Y)):
-                self.LEDcolors[i].append([])
-                for k in range(self.cubeSize.getSize(Axis.Z)):
-                    index = i + j * self.cubeSize.getSize(Axis.X) + k * self.cubeSize.getSize(Axis.X) * self.cubeSize.getSize(Axis.Y) 
-                    self.LEDcolors[i][j].append(QColor(listColorName[index]))
+        """ Set the colors of all the LEDs from a .anim data line """
+        self.LEDcolors = decodeFrameLine(dataLine, self.cubeSize.getShape())
     
     def printColors(self):
         for z in range(self.cubeSize.getSize(Axis.Z)):
                 for y in range(self.cubeSize.getSize(Axis.Y)):
                     for x in range(self.cubeSize.getSize(Axis.X)):
-                        print(self.LEDcolors[x][y][z].name())
-
-
+                        print(self.getColorLED_HEX(x,y,z))
@@ -1,3 +1,4 @@
+import numpy as np
 from PyQt5 import QtWidgets as Qtw
 from PyQt5 import QtCore
 from PyQt5.QtGui import QColor, QFont, QVector3D, QPixmap, QIcon
@@ -8,6 +9,8 @@ from PyQt5.QtDataVisualization import (Q3DCamera, Q3DTheme, Q3DScatter,
 from .CTypes import CubeSize, Axis
 
 class ScatterDataModifierInteract(QtCore.QObject):
+    ERASED_KEY = 1 << 24 # Key of the erased LEDs, not a color: an LED painted white is opaque
+
     def __init__(self, interactive, cubeSize : CubeSize, newColor_signal:QtCore.pyqtSignal, eraseColor_signal:QtCore.pyqtSignal, scatter, parent):
         super(ScatterDataModifierInteract, self).__init__()
 
@@ -23,6 +26,7 @@ class ScatterDataModifierInteract(QtCore.QObject):
 
         self.nullColor = QColor(255,255,255)
         self.nullColor.setAlpha(100)
+        self.nullRGB = np.array(self.nullColor.getRgb()[:3], dtype=np.uint8)
 
         ## Graphics
         self.m_graph = scatter
@@ -61,38 +65,94 @@ class ScatterDataModifierInteract(QtCore.QObject):
 
         ## Instantiate LED representation
         self.m_graph.selectedSeriesChanged.connect(self.ledClicked)
-        self.matrixLEDserie = []
+        self.colorSeries = {}
+        self.seriesPool = [] # Series emptied and hidden, reused for the next colors displayed
         self.instantiateLED()
     
+    @staticmethod
+    def colorKey(rgb) -> int:
+        r, g, b = [int(c) for c in rgb]
+        return (r << 16) | (g << 8) | b
+    
+    def seriesKey(self, serie : QScatter3DSeries) -> int:
+        return self.ERASED_KEY if serie.name() == 'erased' else int(serie.name()[1:], 16)
+    
+    def getSeries(self, key : int) -> QScatter3DSeries:
+        """ Return the series drawing the LEDs of a color, take it from the pool or create it if needed."""
+        if key not in self.colorSeries:
+            if len(self.seriesPool) > 0:
+                serie = self.seriesPool.pop()
+            else:
+                serie = QScatter3DSeries(QScatterDataProxy())
+                serie.setMeshSmooth(True)
+                self.m_graph.addSeries(serie)
+            serie.setName('erased' if key == self.ERASED_KEY else '#{:06x}'.format(key))
+            serie.setItemSize(1.2/self.cubeSize.max())
+            serie.setBaseColor(self.nullColor if key == self.ERASED_KEY else QColor(key >> 16, (key >> 8) & 0xFF, key & 0xFF))
+            serie.setVisible(True)
+            self.colorSeries[key] = serie
+            self.seriesLEDs[key] = []
+        return self.colorSeries[key]
+    
+    def removeSeries(self, key : int):
+        """ Empty the series of a color no longer displayed and keep it in the pool."""
+        serie = self.colorSeries.pop(key)
+        del self.seriesLEDs[key]
+        serie.dataProxy().resetArray([])
+        serie.setVisible(False)
+        self.seriesPool.append(serie)
+    
     def instantiateLED(self):
-        self.matrixLEDserie.clear()
-        count = 0
-        for i in range(self.cubeSize.getSize(Axis.X)):
-            self.matrixLEDserie.append([])
-            for j in range(self.cubeSize.getSize(Axis.Y)):
-                self.matrixLEDserie[i].append([])
-                for k in range(self.cubeSize.getSize(Axis.Z)):
-                    
-                    item = QScatterDataItem(QVector3D(i+1,k+1,j+1)) # z-axis and y-axis reversed to match representations, purely graphic
-
-                    self.matrixLEDserie[i][j].append(QScatter3DSeries(QScatterDataProxy()))
-
-                    #self.matrixLEDserie[i][j][k].setItemLabelFormat("@xTitle: @xLabel @yTitle: @yLabel @zTitle: @zLabel")
-                    self.matrixLEDserie[i][j][k].setMeshSmooth(True)
-                    self.matrixLEDserie[i][j][k].setName(str(i) + " " + str(j) + " " + str(k))
-                    
-                    self.m_graph.addSeries(self.matrixLEDserie[i][j][k])
-                    
-                    self.m_graph.seriesList()[count].dataProxy().addItem(item)
-                    self.m_graph.seriesList()[count].setBaseColor(self.nullColor)
-                    self.m_graph.seriesList()[count].setItemSize(1.2/self.cubeSize.max())
-                    
-                    count = count+1
+        """ Draw all the LEDs erased. LEDs are grouped in one series per displayed color."""
+        for key in list(self.colorSeries.keys()):
+            self.removeSeries(key)
+        self.seriesLEDs = {}
+        shape = self.cubeSize.getShape()
+        self.ledItems = [QScatterDataItem(QVector3D(x+1,z+1,y+1)) # z-axis and y-axis reversed to match representations, purely graphic
+                         for x, y, z in zip(*[axis.tolist() for axis in np.unravel_index(np.arange(self.cubeSize.getTotalNode()), shape)])]
+        self.displayedColors = np.empty(shape + (3,), dtype=np.uint8)
+        self.displayedColors[:] = self.nullRGB
+        self.ledKeys = np.full(self.cubeSize.getTotalNode(), self.ERASED_KEY, dtype=np.int64) # Color key of each LED
+        self.ledSlots = np.arange(self.cubeSize.getTotalNode()) # Position of each LED in the proxy of its series
+        self.resetSeries(self.ERASED_KEY, self.ledSlots.copy())
+    
+    def resetSeries(self, key : int, indices : np.ndarray):
+        """ Replace all the items of a color series by the given flat LED indices, unless they are the same."""
+        serie = self.getSeries(key)
+        leds = indices.tolist()
+        if leds == self.seriesLEDs[key] and serie.dataProxy().itemCount() == len(leds):
+            return
+        self.seriesLEDs[key] = leds
+        self.ledKeys[indices] = key
+        self.ledSlots[indices] = np.arange(indices.size)
+        serie.dataProxy().resetArray([self.ledItems[index] for index in leds])
+    
+    def moveLED(self, index : int, key : int):
+        """ Move a LED from the series of its current color to the series of the given color."""
+        oldKey = int(self.ledKeys[index])
+        if oldKey == key:
+            return
+        ## Remove from the old series by swapping with its last item
+        oldLEDs = self.seriesLEDs[oldKey]
+        slot = int(self.ledSlots[index])
+        lastIndex = oldLEDs.pop()
+        oldProxy = self.colorSeries[oldKey].dataProxy()
+        if lastIndex != index:
+            oldLEDs[slot] = lastIndex
+            self.ledSlots[lastIndex] = slot
+            oldProxy.setItem(slot, self.ledItems[lastIndex])
+        oldProxy.removeItems(len(oldLEDs), 1)
+        if len(oldLEDs) == 0:
+            self.removeSeries(oldKey)
+        ## Append to the new series
+        serie = self.getSeries(key)
+        self.seriesLEDs[key].append(index)
+        self.ledSlots[index] = len(self.seriesLEDs[key]) - 1
+        self.ledKeys[index] = key
+        serie.dataProxy().addItem(self.ledItems[index])
     
     def changeCubeSize(self, cubeSize : CubeSize):
         self.cubeSize = cubeSize
-        for dataSeries in self.m_graph.seriesList():
-            self.m_graph.removeSeries(dataSeries)
         self.m_graph.axisX().setSegmentCount(self.cubeSize.getSize(Axis.X)-1)
         self.m_graph.axisY().setSegmentCount(self.cubeSize.getSize(Axis.Y)-1)
         self.m_graph.axisZ().setSegmentCount(self.cubeSize.getSize(Axis.Z)-1)
@@ -100,23 +160,57 @@ class ScatterDataModifierInteract(QtCore.QObject):
 
     def ledClicked(self, serie : QAbstract3DSeries): #Colored the led if not already set to the given color, erase it otherwise
         if self.interactive :
-            self.m_graph.clearSelection() #Avoid selected item color shifting
             if serie is not None:
-                xStr,yStr,zStr = serie.name().split()
-                x = int(xStr)
-                y = int(yStr)
-                z = int(zStr)
+                itemIndex = serie.selectedItem()
+                key = self.seriesKey(serie)
+                self.m_graph.clearSelection() #Avoid selected item color shifting
+                if key not in self.seriesLEDs or not 0 <= itemIndex < len(self.seriesLEDs[key]):
+                    return
+                x, y, z = [int(c) for c in np.unravel_index(self.seriesLEDs[key][itemIndex], self.cubeSize.getShape())]
                 currentColor = self.getCurrentColor()
-                if self.matrixLEDserie[x][y][z].baseColor() == currentColor:
-                    self.eraseColor_signal.emit(int(xStr), int(yStr), int(zStr))
+                if key == self.colorKey(currentColor.getRgb()[:3]):
+                    self.eraseColor_signal.emit(x, y, z)
                 else:
-                    self.newColor_signal.emit(int(xStr), int(yStr), int(zStr), currentColor)
+                    self.newColor_signal.emit(x, y, z, currentColor)
         
     def changeColor(self, posX :int, posY :int, posZ :int, color : QColor):
-        self.matrixLEDserie[posX][posY][posZ].setBaseColor(color)
+        rgb = color.getRgb()[:3]
+        self.moveLED(np.ravel_multi_index((posX, posY, posZ), self.cubeSize.getShape()), self.colorKey(rgb))
+        self.displayedColors[posX,posY,posZ] = rgb
     
     def eraseColor(self, posX :int, posY :int, posZ :int):
-        self.matrixLEDserie[posX][posY][posZ].setBaseColor(self.nullColor)
+        self.moveLED(np.ravel_multi_index((posX, posY, posZ), self.cubeSize.getShape()), self.ERASED_KEY)
+        self.displayedColors[posX,posY,posZ] = self.nullRGB
+    
+    def applyFrame(self, colors : np.ndarray, mask : np.ndarray = None):
+        """ Display a whole frame at once.
+
+        Small changes move the LEDs concerned between color series, larger ones reset the proxies of the series
+        in place. The LEDs updated show their color, white LEDs included: only eraseColor shows an LED erased.
+
+        Parameters:
+            colors (np.ndarray): uint8 array of shape (X, Y, Z, 3).
+            mask (np.ndarray): Boolean array of shape (X, Y, Z), only the LEDs set are updated. Defaults to the LEDs whose color differs.
+        """
+        if mask is None:
+            mask = np.any(self.displayedColors != colors, axis=-1)
+        self.displayedColors[mask] = colors[mask]
+        changed = np.flatnonzero(mask.reshape(-1))
+        packed = colors.reshape(-1,3)[changed].astype(np.int64)
+        keys = self.ledKeys.copy() # Erased LEDs left out of the mask stay erased
+        keys[changed] = (packed[:,0] << 16) | (packed[:,1] << 8) | packed[:,2]
+
+        if changed.size * 16 < keys.size:
+            for index, key in zip(changed.tolist(), keys[changed].tolist()):
+                self.moveLED(index, key)
+        else:
+            uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+            order = np.argsort(inverse, kind='stable')
+            groups = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+            for key in [key for key in self.colorSeries.keys() if key not in uniqueKeys]:
+                self.removeSeries(key)
+            for key, indices in zip(uniqueKeys.tolist(), groups):
+                self.resetSeries(key, indices)
 
     def getCurrentColor(self) -> QColor :
         return self.parent.getCurrentColor()
@@ -176,7 +270,15 @@ class CubeViewer3DInteract(Qtw.QWidget):
         self.modifier.changeCubeSize(cubeSize)
     
     def getDisplayedColor(self, x:int, y:int, z:int) -> QColor:
-        return self.modifier.matrixLEDserie[x][y][z].baseColor()
+        return QColor(*self.modifier.displayedColors[x,y,z].tolist())
+    
+    def getDisplayedArray(self) -> np.ndarray:
+        """ Return the (X, Y, Z, 3) uint8 array of the displayed colors."""
+        return self.modifier.displayedColors
+    
+    def applyFrame(self, colors : np.ndarray, mask : np.ndarray = None):
+        """ Display a whole (X, Y, Z, 3) uint8 frame, see ScatterDataModifierInteract.applyFrame."""
+        self.modifier.applyFrame(colors, mask)
     
     def setBackgroundColor(self, color:QColor):
         self.graph.activeTheme().setWindowColor(color)
@@ -0,0 +1,106 @@
+""" Conversion of equations z = f(x, y, t) into LED animations.
+
+The surface described by the equation is sampled at the LED positions of the cube,
+the LEDs whose height lies within half a step of the surface are lit. All the frames
+are computed at once from a single evaluation of the compiled expression.
+"""
+
+import numpy as np
+
+from .EquationInterpreter import Expression
+from .EquationInterpreter.core import CompiledExpression
+from .EquationInterpreter.util import addFn
+from ..common.CTypes import CubeSize
+
+## Add functions/constants/operators to the list of those that can be displayed using the Equation module ##
+'''Already implemented functions : floor, ceil, round, sin, cos, tan, im, re, sqrt
+   Already implemented constants : pi, e, Inf, NaN
+   Already implemented operators : +, -, *, /, ^, **, &, |, </>, &|, |&, ==, =, ~, !~, <>, ><, <=, >=, <~, >~, ~<, ~>, !'''
+
+addFn('exp',"exp({0:s})","\\exp\\left({0:s}\\right)",1,np.exp)
+addFn('ln',"ln({0:s})","\\ln\\left({0:s}\\right)",1,np.log)
+addFn('log',"log({0:s})","\\log\\left({0:s}\\right)",1,np.log10)
+addFn('arccos',"arccos({0:s})","\\arccos\\left({0:s}\\right)",1,np.arccos)
+addFn('arcsin',"arcsin({0:s})","\\arcsin\\left({0:s}\\right)",1,np.arcsin)
+
+EQUATION_VARIABLES = ["x","y","t"]
+LIT_COLOR = (255, 0, 0)
+OFF_COLOR = (255, 255, 255) # Erased LED color of the editors
+
+
+def compileEquation(equation) -> CompiledExpression:
+    """ Return the array function of an equation of (x, y, t).
+
+    Parameters:
+        equation (str, Expression or CompiledExpression): Height of the surface.
+    """
+    if isinstance(equation, CompiledExpression):
+        return equation
+    if not isinstance(equation, Expression):
+        equation = Expression(equation, EQUATION_VARIABLES)
+    return equation.compile()
+
+def frameTimes(fps : int, duration : float) -> np.ndarray:
+    """ Return the time (s) of each frame of an animation."""
+    return np.arange(int(round(fps * duration))) / fps
+
+def bakeEquationFrames(equation, cubeSize : CubeSize, times : np.ndarray,
+                       litColor : tuple = LIT_COLOR, offColor : tuple = OFF_COLOR) -> np.ndarray:
+    """ Rasterize the surface z = f(x, y, t) at the given times.
+
+    Parameters:
+        equation (str, Expression or CompiledExpression): Height of the surface, x, y and z are LED indices and t is in seconds.
+        cubeSize (CubeSize): Number of LEDs along each axis.
+        times (np.ndarray): Time of each frame (s).
+        litColor, offColor (tuple): RGB colors of the LEDs on and off the surface.
+    Returns:
+        uint8 array of shape (frames, X, Y, Z, 3).
+    """
+    function = compileEquation(equation)
+    sizeX, sizeY, sizeZ = cubeSize.getShape()
+    times = np.asarray(times, dtype=float)
+    x = np.arange(sizeX, dtype=float).reshape(1, -1, 1)
+    y = np.arange(sizeY, dtype=float).reshape(1, 1, -1)
+    t = times.reshape(-1, 1, 1)
+
+    with np.errstate(all='ignore'): # Undefined points (NaN, Inf) are simply not lit
+        heights = np.real(function(x, y, t)).astype(float) # (frames, X, Y)
+        lit = np.abs(np.arange(sizeZ) - heights[..., np.newaxis]) < 0.5 # (frames, X, Y, Z)
+
+    frames = np.empty(lit.shape + (3,), dtype=np.uint8)
+    frames[:] = offColor
+    frames[lit] = litColor
+    return frames
+
+def bakeEquation(equation, cubeSize : CubeSize, fps : int, duration : float,
+                 litColor : tuple = LIT_COLOR, offColor : tuple = OFF_COLOR) -> np.ndarray:
+    """ Rasterize the surface z = f(x, y, t) over a whole animation.
+
+    Returns:
+        uint8 array of shape (fps * duration, X, Y, Z, 3), ready for AnimationFileWriter.writeFrames().
+    """
+    return bakeEquationFrames(equation, cubeSize, frameTimes(fps, duration), litColor, offColor)
+
+
+class EquationFrameGenerator:
+    """ Picklable frame generator of an equation, for the process pool of CFrameRenderer.
+
+    Only the equation string is sent to the workers, it is compiled once per chunk of frames.
+    """
+
+    def __init__(self, equation : str, cubeSize : CubeSize, litColor : tuple = LIT_COLOR, offColor : tuple = OFF_COLOR):
+        self.equation = equation
+        self.cubeSize = cubeSize
+        self.litColor = litColor
+        self.offColor = offColor
+        self.function = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['function'] = None
+        return state
+
+    def __call__(self, times : np.ndarray) -> np.ndarray:
+        if self.function is None:
+            self.function = compileEquation(self.equation)
+        return bakeEquationFrames(self.function, self.cubeSize, times, self.litColor, self.offColor)
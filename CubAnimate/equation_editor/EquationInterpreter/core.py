@@ -15,6 +15,13 @@ import math
 
 import sys
 import re
+import operator
+
+try:
+    import numpy as np
+    has_numpy = True
+except ImportError:
+    has_numpy = False
 
 if sys.version_info >= (3,):
     xrange = range
@@ -33,6 +40,9 @@ class ExpressionObject (object):
     def __call__(self,args,expression):
         pass
 
+    def toClosure(self,args,expression):
+        return None
+
 class ExpressionValue( ExpressionObject ):
     def __init__(self,value,*args,**kwargs):
         super(ExpressionValue,self).__init__(*args,**kwargs)
@@ -105,6 +115,10 @@ class ExpressionValue( ExpressionObject ):
     def __call__(self,args,expression):
         return self.value
 
+    def toClosure(self,args,expression):
+        value = self.value
+        return lambda variables: value
+
     def __repr__(self):
             return "<{0:s}.{1:s}({2:s}) object at {3:0=#10x}>".format(type(self).__module__,type(self).__name__,str(self.value),id(self))
 
@@ -142,6 +156,21 @@ class ExpressionFunction( ExpressionObject ):
             params.append(args.pop())
         return self.function(*params[::-1])
 
+    def toClosure(self,args,expression):
+        params = []
+        for i in xrange(self.nargs):
+            params.append(args.pop())
+        params = params[::-1]
+        function = ArrayFunction(self.function)
+        if self.nargs == 1:
+            a, = params
+            return lambda variables: function(a(variables))
+        elif self.nargs == 2:
+            a, b = params
+            return lambda variables: function(a(variables),b(variables))
+        else:
+            return lambda variables: function(*[p(variables) for p in params])
+
     def __repr__(self):
         return "<{0:s}.{1:s}({2:s},{3:d}) object at {4:0=#10x}>".format(type(self).__module__,type(self).__name__,str(self.id),self.nargs,id(self))
 
@@ -162,9 +191,91 @@ class ExpressionVariable( ExpressionObject ):
         else:
             return 0 # Default variables to return 0
 
+    def toClosure(self,args,expression):
+        name = self.name
+        return lambda variables: variables.get(name,0)
+
     def __repr__(self):
         return "<{0:s}.{1:s}({2:s}) object at {3:0=#10x}>".format(type(self).__module__,type(self).__name__,str(self.name),id(self))
 
+class ArrayFunction( object ):
+    """Element-wise wrapper of a registered function or operator
+
+    Functions registered with `util.addFn`/`addOp` are called once with whole
+    arrays, those which only accept scalars (raising TypeError or ValueError,
+    e.g. the similarity operators) are then evaluated through numpy.vectorize.
+    """
+    substitutes = {} # function -> numpy equivalent, filled once numpy is available
+
+    def __init__(self,function):
+        self.function = self.substitutes.get(function,function)
+        self.vectorized = None
+
+    def __call__(self,*params):
+        if self.vectorized is None:
+            try:
+                return self.function(*params)
+            except (TypeError,ValueError):
+                if all(np.ndim(p) == 0 for p in params):
+                    raise
+                self.vectorized = np.vectorize(self.function)
+        return self.vectorized(*params)
+
+if has_numpy:
+    ArrayFunction.substitutes[operator.not_] = np.logical_not
+
+class CompiledExpression( object ):
+    """Expression evaluated on whole arrays
+
+    Built by `Expression.compile`, the token list is turned once into nested
+    closures, calling the object then evaluates every point of the given
+    arrays in a single pass.
+
+        >>> fn = Expression("sin(x) * y",["x","y"]).compile()
+        >>> fn(numpy.linspace(0,1,5),2)
+        array([0.        , 0.49480792, 0.95885108, 1.36327752, 1.68294197])
+
+    Parameters
+    ----------
+    closure: callable
+        Root of the closure tree, takes the dict of variables
+    argorder: list of str
+        Variable names matching the positional arguments
+    argsused: set of str
+        Variables that must be defined to evaluate the expression
+    presets: dict
+        Preset variables of the Expression
+    """
+    def __init__(self,closure,argorder,argsused,presets):
+        self.closure = closure
+        self.argorder = list(argorder)
+        self.argsused = set(argsused)
+        self.presets = dict(presets)
+
+    def __call__(self,*args,**kwargs):
+        """fn(\*args,\*\*kwargs)
+
+        Returns
+        -------
+        numpy.ndarray
+            Result broadcast to the common shape of the arguments
+        """
+        if len(args) > len(self.argorder):
+            raise TypeError("Compiled expression takes at most {0:d} arguments ({1:d} given)".format(len(self.argorder),len(args)))
+        variables = dict(constants)
+        variables.update(self.presets)
+        for name, value in zip(self.argorder,args):
+            if name in kwargs:
+                raise TypeError("Compiled expression got multiple values for argument '{0:s}'".format(name))
+            variables[name] = np.asarray(value)
+        for name, value in kwargs.items():
+            variables[name] = np.asarray(value)
+        missing = self.argsused - set(variables.keys())
+        if missing:
+            raise TypeError("Compiled expression argument '{0:s}' not defined".format(sorted(missing)[0]))
+        shape = np.broadcast(*[np.empty(np.shape(v)) for v in list(args) + list(kwargs.values())] or [np.empty(())]).shape
+        return np.broadcast_to(self.closure(variables),shape)
+
 class Expression( object ):
     """Expression or Equation Object
 
@@ -303,6 +414,30 @@ class Expression( object ):
         else:
             return args[0]
 
+    def compile(self):
+        """Compile to an array function
+
+        Builds the closures of the token list once, the returned object then
+        evaluates numpy arrays of variables at once instead of one point per call.
+
+        Returns
+        -------
+        CompiledExpression
+            Callable with the same arguments as the Expression, returning an array
+        """
+        if not has_numpy:
+            raise RuntimeError("Compiling an Expression requires numpy")
+        if len(self.__expr) == 0:
+            raise ValueError("Can't compile an empty Expression")
+        expr = self.__expr[::-1]
+        args = []
+        while len(expr) > 0:
+            t = expr.pop()
+            args.append(t.toClosure(args,self))
+        if len(args) > 1:
+            raise ValueError("Can't compile an Expression with {0:d} results".format(len(args)))
+        return CompiledExpression(args[0],self.__args,self.__argsused - set(constants.keys()),self.__vars)
+
     def __next(self,__expect_op):
         if __expect_op:
             m = gematch.match(self.__expression)
@@ -20,21 +20,12 @@ from .EquationInterpreter import *
 
 
 # Imports homemade modules #
+from ..__init__ import CUBE_SIZE
 from ..common.CTypes import Axis, CubeSize
-
-
-## Add functions/constants/operators to the list of those that can be displayed using the Equation module ##
-'''Already implemented functions : floor, ceil, round, sin, cos, tan, im, re, sqrt
-   Already implemented constants : pi, e, Inf, NaN
-   Already implemented operators : +, -, *, /, ^, **, &, |, </>, &|, |&, ==, =, ~, !~, <>, ><, <=, >=, <~, >~, ~<, ~>, !'''
-
-from .EquationInterpreter.util import addFn
-
-addFn('exp',"exp({0:s})","\\exp\\left({0:s}\\right)",1,exp)
-addFn('ln',"ln({0:s})","\\ln\\left({0:s}\\right)",1,log)
-addFn('log',"log({0:s})","\\log\\left({0:s}\\right)",1,log10)
-addFn('arccos',"arccos({0:s})","\\arccos\\left({0:s}\\right)",1,arccos)
-addFn('arcsin',"arcsin({0:s})","\\arcsin\\left({0:s}\\right)",1,arcsin)
+from ..common.CAnimationFile import ANIM_EXTENSION, createAnimationWriter
+from ..common.CAnimationBinary import BINARY_EXTENSION, COMPRESSION_NONE, COMPRESSION_DELTA_RLE
+from ..common.CFrameRenderer import FrameRenderJob, FrameRenderThread
+from .CEquationBaker import EQUATION_VARIABLES, EquationFrameGenerator, frameTimes # Also registers the additional functions (exp, ln, log, ...)
 
 
 ## Useful functions ##
@@ -75,8 +66,10 @@ def mathTex_to_QPixmap(mathTex, fs):
 ## Useful classes ## 
 
 class EIWindow(Qtw.QWidget):
-    def __init__(self,parent=None):
+    def __init__(self,parent=None,waitingCursor_signal:QtCore.pyqtSignal=None):
         super(Qtw.QWidget, self).__init__(parent)
+        self.waitingCursor_signal = waitingCursor_signal
+        self.renderThread = None
 
         self.setWindowTitle("Equation interpreter")
 
@@ -84,7 +77,7 @@ class EIWindow(Qtw.QWidget):
         self.setLayout(self.mainLayout)
 
         # Create label #
-        self.mainlabel = Qtw.QLabel("Type your equation here, must be a function of (x,y):")
+        self.mainlabel = Qtw.QLabel("Type your equation here, must be a function of (x,y,t):")
         self.mainLayout.addWidget(self.mainlabel,0,0)
 
         # Create textbox #
@@ -124,13 +117,31 @@ class EIWindow(Qtw.QWidget):
         self.buttonShortcut = QShortcut(QKeySequence(QtCore.Qt.Key_Return), self.button)
         self.buttonShortcut.activated.connect(self.on_click)
 
+        # Create export settings #
+        self.exportCubeSize = CubeSize(**CUBE_SIZE)
+        self.exportLayout = QHBoxLayout()
+        self.fpsSpinBox = Qtw.QSpinBox(self, minimum=1, maximum=120, value=24, suffix=' fps')
+        self.durationSpinBox = Qtw.QDoubleSpinBox(self, minimum=0.1, maximum=600, value=10, singleStep=0.5, suffix=' s')
+        self.exportButton = QPushButton('Export animation', self)
+        self.exportButton.clicked.connect(self.exportAnimation)
+        self.exportLayout.addWidget(Qtw.QLabel('Frame rate:'))
+        self.exportLayout.addWidget(self.fpsSpinBox)
+        self.exportLayout.addWidget(Qtw.QLabel('Duration:'))
+        self.exportLayout.addWidget(self.durationSpinBox)
+        self.exportLayout.addWidget(self.exportButton)
+        self.exportProgress = Qtw.QProgressBar(self, visible=False)
+        self.exportLayout.addWidget(self.exportProgress)
+        self.cancelExportButton = QPushButton('Cancel', self, visible=False)
+        self.cancelExportButton.clicked.connect(self.cancelExport)
+        self.exportLayout.addWidget(self.cancelExportButton)
+        self.mainLayout.addLayout(self.exportLayout,4,0)
+
     
     @pyqtSlot()
     def on_click(self):
-        f = Expression(self.textbox.text(),["x","y","t"])
         try: 
         # Displays the function as LaTeX  #
-            f = Expression(self.textbox.text(),["x","y","t"])
+            f = Expression(self.textbox.text(),EQUATION_VARIABLES)
             self.viewer.setPixmap(mathTex_to_QPixmap('$' + str(f) + '$',15))
         # Displays the graph #
             self.plot3D(f,self.cubesize)
@@ -145,18 +156,59 @@ class EIWindow(Qtw.QWidget):
             E/ csize: list containing 3 integers (sizeX,sizeY,sizeZ) to know the boundaries 
             E/ nbsamples (OPTIONAL) : list containing 2 integers (sampleX,sampleZ) to define the resolution of the graph
             S/ No output, sets the right data in the functionProxy to display the graph '''
-        valuesArray = []
         stepX=csize.getSize(Axis.X)/(nbsamples[0]-2)
         stepZ=csize.getSize(Axis.Z)/(nbsamples[1]-2)
-        for i in range(nbsamples[1]):
-            currentRow=[]
-            z=min(csize.getSize(Axis.Z)-1,i*stepZ)
-            for j in range(nbsamples[0]):
-                x=min(csize.getSize(Axis.X)-1,j*stepX)
-                y=func(x,z)
-                currentRow.append(QSurfaceDataItem(QVector3D(x,y,z)))
-            valuesArray.append(currentRow)
+        xs=minimum(csize.getSize(Axis.X)-1,arange(nbsamples[0])*stepX)
+        zs=minimum(csize.getSize(Axis.Z)-1,arange(nbsamples[1])*stepZ)
+        gridX,gridZ=meshgrid(xs,zs) # One row per z sample
+        gridY=real(func.compile()(gridX,gridZ,0)).astype(float) # All the samples in a single evaluation, at t=0
+        valuesArray = [[QSurfaceDataItem(QVector3D(x,y,z)) for x,y,z in zip(rowX,rowY,rowZ)]
+                       for rowX,rowY,rowZ in zip(gridX.tolist(),gridY.tolist(),gridZ.tolist())]
         self.functionProxy.resetArray(valuesArray)      
+
+    def exportAnimation(self):
+        ''' Bake the equation over the cube in a pool of processes and save the frames as an animation file loadable by the animator '''
+        if self.renderThread is not None and self.renderThread.isRunning():
+            return
+        try:
+            Expression(self.textbox.text(),EQUATION_VARIABLES).compile() # Check the equation before starting the workers
+        except:
+            self.viewer.setPixmap(mathTex_to_QPixmap('Invalid function',10))
+            return
+        fileLocation, fileExtension = Qtw.QFileDialog.getSaveFileName(self, 'Export animation', './equation', "Animation Files (*.anim);;Binary Animation Files (*.canim);;Compressed Binary Animation Files (*.canim)")
+        if len(fileLocation) == 0:
+            return
+        if not fileLocation.lower().endswith((ANIM_EXTENSION, BINARY_EXTENSION)):
+            fileLocation += BINARY_EXTENSION if BINARY_EXTENSION in fileExtension else ANIM_EXTENSION
+        compression = COMPRESSION_DELTA_RLE if fileExtension.startswith('Compressed') else COMPRESSION_NONE
+
+        fps = self.fpsSpinBox.value()
+        generator = EquationFrameGenerator(self.textbox.text(), self.exportCubeSize)
+        job = FrameRenderJob(generator, fps, len(frameTimes(fps, self.durationSpinBox.value())), chunkSize=fps)
+        writer = createAnimationWriter(fileLocation, self.textbox.text(), self.exportCubeSize, fps, compression)
+
+        self.renderThread = FrameRenderThread(job, writer, self.waitingCursor_signal, parent=self)
+        self.renderThread.progress.connect(self.exportProgress.setValue)
+        self.renderThread.failed.connect(lambda message: QMessageBox.warning(self, 'Export animation', 'The animation could not be exported:\n{}'.format(message)))
+        self.renderThread.finished.connect(lambda: self.exportButton.setEnabled(True))
+        self.renderThread.finished.connect(lambda: self.exportProgress.setVisible(False))
+        self.renderThread.finished.connect(lambda: self.cancelExportButton.setVisible(False))
+        self.exportProgress.setRange(0, job.frameCount)
+        self.exportProgress.setValue(0)
+        self.exportProgress.setVisible(True)
+        self.cancelExportButton.setVisible(True)
+        self.exportButton.setEnabled(False)
+        self.renderThread.start()
+
+    def cancelExport(self):
+        ''' Stop the export in progress, the file is not written '''
+        if self.renderThread is not None:
+            self.renderThread.cancel()
+
+    def stopExport(self):
+        ''' Cancel the export in progress and wait for its thread, called before the editor is destroyed '''
+        if self.renderThread is not None:
+            self.renderThread.stop()
            
 
 
@@ -169,9 +221,8 @@ if __name__ == '__main__':
     sys.exit(app.exec_())
 
 ## TO-DO list ##
-# Allow functions of time : display a graph evolving in time
+# Allow functions of time : display a graph evolving in time (exported animations already use t)
 # Add a "toolbox" that allows to increase graph resolution / adapt function to cube / input the cube size manually (??s)
-# Export function to discrete LED configuration
 # Enable color settings (choose a palette)
 # Layout coherent with the rest of the app
 
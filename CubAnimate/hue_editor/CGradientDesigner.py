@@ -1,3 +1,4 @@
+import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import Qt, pyqtSignal
 from ..common.CToolBox.CColorPicker import CColorPicker
@@ -12,6 +13,24 @@ QtWidgets {
 }
 """
 
+LUT_SIZE = 256
+
+def gradientLUT(gradient, size:int = LUT_SIZE) -> np.ndarray:
+    """ Sample a gradient at regularly spaced positions.
+
+    Parameters:
+        gradient (list): Stops as (position from 0.0 to 1.0, color) tuples, in any order.
+        size (int): Number of entries of the table.
+    Returns:
+        uint8 array of shape (size, 3), entry i is the color at position i/(size-1).
+    """
+    stops = sorted(((stop, QtGui.QColor(color)) for stop, color in gradient), key=lambda g:g[0])
+    positions = [stop for stop, _ in stops]
+    colors = np.array([color.getRgb()[:3] for _, color in stops], dtype=float)
+    samples = np.linspace(0.0, 1.0, size)
+    lut = np.stack([np.interp(samples, positions, colors[:,channel]) for channel in range(3)], axis=-1)
+    return np.rint(lut).astype(np.uint8)
+
 class GradientDesigner(QtWidgets.QWidget):
 
     gradientChanged = pyqtSignal()
@@ -36,6 +55,10 @@ class GradientDesigner(QtWidgets.QWidget):
         # Stop point handle sizes.
         self._handleRadius = 50
 
+        # Color lookup table, rebuilt on first use after any stop change.
+        self._lut = None
+        self._lutColors = None
+
         self._drag_position = None
 
         self.setAttribute(QtCore.Qt.WA_TranslucentBackground, True)
@@ -48,26 +71,43 @@ class GradientDesigner(QtWidgets.QWidget):
         self.setGraphicsEffect(effect)
     
     
+    def _invalidateLUT(self):
+        self._lut = None
+        self._lutColors = None
+
+    def getLUT(self) -> np.ndarray:
+        """ Return the (LUT_SIZE, 3) uint8 lookup table of the current gradient."""
+        if self._lut is None:
+            self._lut = gradientLUT(self._gradient)
+            self._lutColors = [QtGui.QColor(*rgb) for rgb in self._lut.tolist()]
+        return self._lut
+
+    def lutIndices(self, positions) -> np.ndarray:
+        """ Return the lookup table entries of positions, positions out of ]0.0, 1.0[ map to the first stop."""
+        positions = np.asarray(positions, dtype=float)
+        indices = np.rint(positions * (LUT_SIZE - 1)).astype(np.intp)
+        return np.where((positions > 0.0) & (positions < 1.0), indices, 0)
+
+    def colorsAt(self, positions) -> np.ndarray:
+        """ Return the colors at the given positions of the current gradient.
+
+        Parameters:
+            positions (np.ndarray): Positions in percent (from 0.0 to 1.0), any shape.
+        Returns:
+            uint8 array of shape positions.shape + (3,).
+        """
+        return self.getLUT()[self.lutIndices(positions)]
+
     def getColorAt(self, pos:float) -> QtGui.QColor :
         """ Return color at position pos in the current gradient.
 
+        The color is shared with the lookup table and must not be modified.
+
         Parameters:
             pos (float): Position in percent (from 0.0 to 1.0)
         """
-
-        if pos > 0.0 and pos < 1.0:
-            indexSup = 0
-            while pos > self._gradient[indexSup][0]:
-                indexSup += 1
-            posSup, colorSup = self._gradient[indexSup]
-            posInf, colorInf = self._gradient[indexSup-1]
-            ratio = (pos - posInf) / (posSup - posInf)
-            r = int(colorInf.red() * (1.0 - ratio) + colorSup.red() * ratio)
-            g = int(colorInf.green() * (1.0 - ratio) + colorSup.green() * ratio)
-            b = int(colorInf.blue() * (1.0 - ratio) + colorSup.blue() * ratio)
-            return QtGui.QColor(r,g,b)
-        else:
-            return self._gradient[0][1]
+        self.getLUT()
+        return self._lutColors[int(self.lutIndices(pos))]
     
 
     def paintEvent(self, e):
@@ -107,6 +147,7 @@ class GradientDesigner(QtWidgets.QWidget):
 
     def _sort_gradient(self):
         self._gradient = sorted(self._gradient, key=lambda g:g[0])
+        self._invalidateLUT()
 
     def _constrain_gradient(self):
         self._gradient = [
@@ -114,6 +155,7 @@ class GradientDesigner(QtWidgets.QWidget):
             (max(0.0, min(1.0, stop)), color)
             for stop, color in self._gradient
         ]
+        self._invalidateLUT()
 
     def setGradient(self, gradient):
         assert all([0.0 <= stop <= 1.0 for stop, _ in gradient])
@@ -146,6 +188,7 @@ class GradientDesigner(QtWidgets.QWidget):
     def removeStopAtPosition(self, n):
         if n not in self._end_stops:
             del self._gradient[n]
+            self._invalidateLUT()
             self.gradientChanged.emit()
             self.update()
 
@@ -153,6 +196,7 @@ class GradientDesigner(QtWidgets.QWidget):
         if n < len(self._gradient):
             stop, _ = self._gradient[n]
             self._gradient[n] = stop, color
+            self._invalidateLUT()
             self.gradientChanged.emit()
             self.update()
 
@@ -219,6 +263,8 @@ class GradientDesigner(QtWidgets.QWidget):
 
 
     def mouseReleaseEvent(self, e):
+        if self._drag_position:
+            self.gradientChanged.emit()
         self._drag_position = None
         self._sort_gradient()
 
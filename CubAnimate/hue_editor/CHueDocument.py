@@ -0,0 +1,97 @@
+""" Parametric HUE animations (.hue).
+
+A .hue file is a small JSON document holding the gradient, the pattern and the loop duration of the
+HUE editor. Frames are only computed when the document is baked into an animation file.
+"""
+
+import json
+import os
+
+from PyQt5.QtGui import QColor
+
+from ..common.CTypes import CubeSize
+from ..common.CAnimationBinary import COMPRESSION_NONE
+from ..common.CAnimationFile import createAnimationWriter
+from ..common.CFrameRenderer import FrameRenderJob
+from .CGradientDesigner import gradientLUT
+from .CHuePattern import HuePattern, HuePatternRenderer
+
+HUE_EXTENSION = '.hue'
+HUE_FORMAT_VERSION = 1
+
+
+class HueDocument:
+    """ Parameters of a HUE animation.
+
+    Attributes:
+        name (str): Name of the animation.
+        gradient (list): Stops as (position from 0.0 to 1.0, '#rrggbb') tuples.
+        pattern (str): One of HuePattern.ALL.
+        loopDuration (int): Time (ms) for the colors to cycle once through the gradient.
+        fps (int): Frame rate used when baking.
+    """
+
+    def __init__(self, name : str, gradient : list, pattern : str = HuePattern.UNIFORM, loopDuration : int = 1000, fps : int = 24):
+        self.name = name
+        self.gradient = [(float(stop), QColor(color).name()) for stop, color in gradient]
+        self.pattern = pattern
+        self.loopDuration = loopDuration
+        self.fps = fps
+
+    def toDict(self) -> dict:
+        return {'version': HUE_FORMAT_VERSION,
+                'name': self.name,
+                'gradient': [[stop, color] for stop, color in self.gradient],
+                'pattern': self.pattern,
+                'loopDuration': self.loopDuration,
+                'fps': self.fps}
+
+    @classmethod
+    def fromDict(cls, data : dict):
+        if data.get('version', HUE_FORMAT_VERSION) > HUE_FORMAT_VERSION:
+            raise ValueError("Unsupported HUE document version {}".format(data['version']))
+        if data['pattern'] not in HuePattern.ALL:
+            raise ValueError("Unknown HUE pattern {}".format(data['pattern']))
+        return cls(data['name'], [tuple(stop) for stop in data['gradient']], data['pattern'], int(data['loopDuration']), int(data['fps']))
+
+    def save(self, fileLocation : str):
+        with open(fileLocation, 'w') as file:
+            json.dump(self.toDict(), file, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, fileLocation : str):
+        with open(fileLocation, 'r') as file:
+            return cls.fromDict(json.load(file))
+
+    def getGradientQColors(self) -> list:
+        """ Return the gradient as expected by GradientDesigner.setGradient."""
+        return [(stop, QColor(color)) for stop, color in self.gradient]
+
+    def getRenderer(self, cubeSize : CubeSize) -> HuePatternRenderer:
+        return HuePatternRenderer(self.pattern, cubeSize, self.loopDuration / 1000, gradientLUT(self.gradient))
+
+    def getFrameCount(self, duration : float = None) -> int:
+        """ Return the number of frames of the given duration (s), a single loop by default."""
+        if duration is None:
+            duration = self.loopDuration / 1000
+        return max(1, int(round(duration * self.fps)))
+
+    def getRenderJob(self, cubeSize : CubeSize, duration : float = None) -> FrameRenderJob:
+        """ Return the job rendering the document with a CFrameRenderer."""
+        return FrameRenderJob(self.getRenderer(cubeSize), self.fps, self.getFrameCount(duration), chunkSize=self.fps)
+
+    def bake(self, fileLocation : str, cubeSize : CubeSize, duration : float = None, compression : int = COMPRESSION_NONE):
+        """ Write the frames of the document in a .anim or .canim file, one chunk of frames at a time.
+
+        Parameters:
+            duration (float): Length (s) of the animation, a single loop by default.
+            compression (int): Frame encoding of .canim files, see CAnimationBinary.
+        """
+        job = self.getRenderJob(cubeSize, duration)
+        with createAnimationWriter(fileLocation, self.name, cubeSize, self.fps, compression) as writer:
+            for times in job.chunks():
+                writer.writeFrames(job.generator(times))
+
+
+def isHueFile(fileLocation : str) -> bool:
+    return os.path.splitext(fileLocation)[1].lower() == HUE_EXTENSION
@@ -0,0 +1,103 @@
+""" Spatial patterns of the HUE editor.
+
+A pattern maps each LED of the cube to a position in the gradient (from 0.0 to 1.0). Adding a phase
+shifts all the positions along the gradient, a phase growing with time thus makes the colors flow
+through the cube. Frames are computed for the whole cube at once.
+"""
+
+import numpy as np
+
+from ..common.CTypes import CubeSize
+
+
+class HuePattern():
+    UNIFORM = 'Uniform'
+    LINEAR_X = 'Linear X'
+    LINEAR_Y = 'Linear Y'
+    LINEAR_Z = 'Linear Z'
+    RADIAL = 'Radial'
+    SPHERICAL = 'Spherical'
+    HELICAL = 'Helical'
+    ALL = [UNIFORM, LINEAR_X, LINEAR_Y, LINEAR_Z, RADIAL, SPHERICAL, HELICAL]
+
+
+def patternField(pattern : str, cubeSize : CubeSize) -> np.ndarray:
+    """ Return the gradient position of each LED for a null phase.
+
+    Parameters:
+        pattern (str): One of HuePattern.ALL.
+        cubeSize (CubeSize): Number of LEDs along each axis.
+    Returns:
+        float array of shape (X, Y, Z), values from 0.0 to 1.0.
+    """
+    shape = cubeSize.getShape()
+    x, y, z = np.meshgrid(*[np.arange(size, dtype=float) for size in shape], indexing='ij')
+    center = [(size - 1) / 2 for size in shape]
+    dx, dy, dz = x - center[0], y - center[1], z - center[2]
+
+    if pattern == HuePattern.UNIFORM:
+        field = np.zeros(shape)
+    elif pattern in (HuePattern.LINEAR_X, HuePattern.LINEAR_Y, HuePattern.LINEAR_Z):
+        axis = [HuePattern.LINEAR_X, HuePattern.LINEAR_Y, HuePattern.LINEAR_Z].index(pattern)
+        field = (x, y, z)[axis] / shape[axis]
+    elif pattern == HuePattern.RADIAL: # Distance to the vertical axis of the cube
+        radius = np.hypot(dx, dy)
+        field = radius / max(radius.max(), 1.0)
+    elif pattern == HuePattern.SPHERICAL: # Distance to the center of the cube
+        radius = np.sqrt(dx**2 + dy**2 + dz**2)
+        field = radius / max(radius.max(), 1.0)
+    elif pattern == HuePattern.HELICAL: # Angle around the vertical axis, one turn along the height
+        field = np.arctan2(dy, dx) / (2 * np.pi) + z / shape[2]
+    else:
+        raise ValueError("Unknown HUE pattern {}".format(pattern))
+    return np.mod(field, 1.0)
+
+
+class HuePatternRenderer:
+    """ Compute the frames of a HUE pattern.
+
+    The spatial field is cached, a frame thus costs one addition and one gradient lookup.
+    The renderer is picklable and can be used as a CFrameRenderer frame generator.
+
+    Attributes:
+        pattern (str): One of HuePattern.ALL.
+        cubeSize (CubeSize): Number of LEDs along each axis.
+        loopDuration (float): Time (s) for the colors to cycle once through the gradient.
+        lut (np.ndarray): (N, 3) uint8 gradient lookup table, see CGradientDesigner.gradientLUT.
+    """
+
+    def __init__(self, pattern : str, cubeSize : CubeSize, loopDuration : float, lut : np.ndarray):
+        self.pattern = pattern
+        self.cubeSize = cubeSize
+        self.loopDuration = loopDuration
+        self.lut = lut
+        self.field = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['field'] = None
+        return state
+
+    def getField(self) -> np.ndarray:
+        if self.field is None:
+            self.field = patternField(self.pattern, self.cubeSize)
+        return self.field
+
+    def phaseAt(self, time : float) -> float:
+        return (time / self.loopDuration) % 1.0 if self.loopDuration > 0 else 0.0
+
+    def positions(self, phase : float) -> np.ndarray:
+        """ Return the gradient position of each LED, shape (X, Y, Z)."""
+        return np.mod(self.getField() + phase, 1.0)
+
+    def frameAt(self, time : float) -> np.ndarray:
+        """ Return the (X, Y, Z, 3) uint8 frame at the given time (s)."""
+        indices = np.rint(self.positions(self.phaseAt(time)) * (len(self.lut) - 1)).astype(np.intp)
+        return self.lut[indices]
+
+    def __call__(self, times : np.ndarray) -> np.ndarray:
+        """ Return the (frames, X, Y, Z, 3) uint8 frames at the given times (s)."""
+        times = np.asarray(times, dtype=float)
+        phases = np.mod(times / self.loopDuration, 1.0) if self.loopDuration > 0 else np.zeros_like(times)
+        positions = np.mod(self.getField()[np.newaxis] + phases.reshape(-1, 1, 1, 1), 1.0)
+        return self.lut[np.rint(positions * (len(self.lut) - 1)).astype(np.intp)]
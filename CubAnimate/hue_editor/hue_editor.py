@@ -1,3 +1,4 @@
+import numpy as np
 from PyQt5 import QtWidgets as Qtw
 from PyQt5 import QtCore
 from PyQt5.QtGui import QColor
@@ -6,26 +7,14 @@ from ..common.CTypes import Axis, CubeSize
 from ..common.CubeViewer3D import CubeViewer3DInteract
 from ..common.CToolBox.CToolBox import CToolBox_HUE
 from .CGradientDesigner import GradientDesigner
-
-class TimerThread(QtCore.QThread):
-    ''' Begin with start(), end with terminate() '''
-    def __init__(self, signal:QtCore.pyqtSignal, timeout:int, *args, **kwargs):
-        QtCore.QThread.__init__(self, *args, **kwargs)
-        self.timeout = timeout
-        self.signal = signal
-        self.dataCollectionTimer = QtCore.QTimer()
-        self.dataCollectionTimer.moveToThread(self)
-        self.dataCollectionTimer.timeout.connect(lambda: self.signal.emit())
-
-    def run(self):
-        self.dataCollectionTimer.start(self.timeout)
-        loop = QtCore.QEventLoop()
-        loop.exec_()
-    
+from .CHuePattern import HuePattern, HuePatternRenderer
+from .CHueDocument import HUE_EXTENSION, HueDocument, isHueFile
+from ..common.CAnimationFile import ANIM_EXTENSION, createAnimationWriter
+from ..common.CAnimationBinary import BINARY_EXTENSION, COMPRESSION_NONE, COMPRESSION_DELTA_RLE
+from ..common.CFrameRenderer import FrameRenderThread
+from ..common.CPlaybackClock import PlaybackClock
 
 class HueEditor(Qtw.QWidget):
-    
-    anim_signal = QtCore.pyqtSignal()
 
     stylesheet = """
     #HUE_Editor_Window {
@@ -40,26 +29,34 @@ class HueEditor(Qtw.QWidget):
     }
     """
 
-    def __init__(self, cubeSizeInit:CubeSize, parent):
+    def __init__(self, cubeSizeInit:CubeSize, parent, waitingCursor_signal:QtCore.pyqtSignal = None):
         super(Qtw.QWidget, self).__init__(parent)
         self.parent = parent
         self.cubeSize = cubeSizeInit
+        self.waitingCursor_signal = waitingCursor_signal
+        self.animationName = "HUE"
+        self.animationSaved = True
+        self.renderThread = None
         self.mainLayout=Qtw.QHBoxLayout(self)
         self.setLayout(self.mainLayout)
         self.setObjectName('HUE_Editor_Window')
         self.setStyleSheet(self.stylesheet % {'bgColor': QColor(255,255,255).name()})
         self.animationOn = False
 
-        ## Update test
-        self.anim_signal.connect(self.cubeViewerUpdate)
-        self.timer = TimerThread(self.anim_signal, int(1000/24))
-        self.timer.start()
-        self.i=0
+        ## Preview clock, only runs while the editor is shown with its animation active
+        self.clock = PlaybackClock(int(1000/24), self)
+        self.clock.tick.connect(self.cubeViewerUpdate)
 
         ## Widget instantiation
         self.toolBox = CToolBox_HUE(False, False, self)
         self.cubeViewer = CubeViewer3DInteract(False, self.cubeSize, None, None, self)
         self.gradientViewer = GradientDesigner()
+        self.toolBox.setPatterns(HuePattern.ALL)
+        self.patternRenderer = HuePatternRenderer(HuePattern.UNIFORM, self.cubeSize, self.toolBox.getLoopDuration()/1000, self.gradientViewer.getLUT())
+
+        self.gradientViewer.gradientChanged.connect(self.notSaved)
+        self.toolBox.patternBox.currentTextChanged.connect(self.notSaved)
+        self.toolBox.sliderFPS.valueChanged.connect(self.notSaved)
 
         ## Window layout
         self.horizontlSpliter = Qtw.QSplitter(QtCore.Qt.Horizontal)
@@ -83,29 +80,104 @@ class HueEditor(Qtw.QWidget):
         self.setStyleSheet(self.stylesheet % {'bgColor': color.name()})
         self.cubeViewer.setBackgroundColor(color)
     
-    def cubeViewerUpdate(self):
+    def getPatternRenderer(self) -> HuePatternRenderer:
+        """ Return the renderer of the pattern, gradient and loop duration currently set."""
+        if self.patternRenderer.pattern != self.toolBox.getPattern() or self.patternRenderer.cubeSize is not self.cubeSize:
+            self.patternRenderer = HuePatternRenderer(self.toolBox.getPattern(), self.cubeSize, self.patternRenderer.loopDuration, self.patternRenderer.lut)
+        self.patternRenderer.loopDuration = self.toolBox.getLoopDuration()/1000
+        self.patternRenderer.lut = self.gradientViewer.getLUT()
+        return self.patternRenderer
+
+    def cubeViewerUpdate(self, time:float):
         if self.animationOn :
-            self.i += 1
-            if self.i > 100:
-                self.i = 0
-            for x in range(self.cubeSize.getSize(Axis.X)):
-                for y in range(self.cubeSize.getSize(Axis.Y)):
-                    for z in range(self.cubeSize.getSize(Axis.Z)):
-                        self.cubeViewer.modifier.changeColor(x,y,z, self.gradientViewer.getColorAt(self.i/100))
+            self.cubeViewer.applyFrame(self.getPatternRenderer().frameAt(time))
     
     def getCurrentColor(self):
         return QColor(250,250,250)
     
     def activeAnimation(self, active:bool):
         self.animationOn = active
+        self.updateClock()
+
+    def updateClock(self):
+        self.clock.setRunning(self.animationOn and self.isVisible())
+
+    def showEvent(self, event):
+        super(HueEditor, self).showEvent(event)
+        self.updateClock()
+
+    def hideEvent(self, event):
+        super(HueEditor, self).hideEvent(event)
+        self.updateClock()
+
+    def notSaved(self):
+        self.animationSaved = False
+
+    def getDocument(self) -> HueDocument:
+        """ Return the parameters currently edited."""
+        return HueDocument(self.animationName, self.gradientViewer.gradient(), self.toolBox.getPattern(), self.toolBox.getLoopDuration())
+
+    def setDocument(self, document : HueDocument):
+        self.animationName = document.name
+        self.gradientViewer.setGradient(document.getGradientQColors())
+        self.gradientViewer.update()
+        self.toolBox.changePattern(document.pattern)
+        self.toolBox.changeLoopDuration(document.loopDuration)
+        self.clock.reset()
 
     def saveAnimation(self):
-        print('Save HUE')
-        return True
+        """ Save the parameters as a .hue document, or bake a single loop as a .anim/.canim animation."""
+        fileLocation, fileExtension = Qtw.QFileDialog.getSaveFileName(self, 'Save File',"./{}".format(self.animationName.replace(' ','_')),"HUE Files (*.hue);;Animation Files (*.anim);;Binary Animation Files (*.canim);;Compressed Binary Animation Files (*.canim)")
+
+        if len(fileLocation) == 0:
+            print('Saving canceled')
+            return self.animationSaved
+
+        if not fileLocation.lower().endswith((HUE_EXTENSION, ANIM_EXTENSION, BINARY_EXTENSION)):
+            fileLocation += HUE_EXTENSION if HUE_EXTENSION in fileExtension else BINARY_EXTENSION if BINARY_EXTENSION in fileExtension else ANIM_EXTENSION
+        document = self.getDocument()
+
+        if isHueFile(fileLocation):
+            document.save(fileLocation)
+            self.animationSaved = True
+        else:
+            return self.bakeAnimation(document, fileLocation, COMPRESSION_DELTA_RLE if fileExtension.startswith('Compressed') else COMPRESSION_NONE)
+        return self.animationSaved
+
+    def bakeAnimation(self, document : HueDocument, fileLocation : str, compression : int):
+        """ Render a loop of the document in the background and stream it to an animation file.
+
+        Returns:
+            False, the file is not written yet: the editor is only marked as saved once the rendering succeeds.
+        """
+        if self.renderThread is not None and self.renderThread.isRunning():
+            return False
+        job = document.getRenderJob(self.cubeSize)
+        writer = createAnimationWriter(fileLocation, document.name, self.cubeSize, document.fps, compression)
+        self.renderThread = FrameRenderThread(job, writer, self.waitingCursor_signal, parent=self)
+        self.renderThread.failed.connect(lambda message: Qtw.QMessageBox.warning(self, 'Export animation', 'The animation could not be exported:\n{}'.format(message)))
+        self.renderThread.succeeded.connect(self.bakingSucceeded)
+        self.renderThread.start()
+        return False
+
+    def bakingSucceeded(self):
+        self.animationSaved = True
+
+    def stopBaking(self):
+        """ Cancel the rendering in progress and wait for its thread, called before the editor is destroyed."""
+        if self.renderThread is not None:
+            self.renderThread.stop()
     
     def isSaved(self):
-        print('File is saved')
-        return True
+        return self.animationSaved
     
     def openAnimation(self):
-        print("Open HUE")
\ No newline at end of file
+        fileLocation, _ = Qtw.QFileDialog.getOpenFileName(self, 'Open File', './', "HUE Files (*.hue)")
+        if len(fileLocation) > 0:
+            try:
+                document = HueDocument.load(fileLocation)
+            except (OSError, ValueError, KeyError) as error:
+                Qtw.QMessageBox.warning(self, 'Open File', 'The file could not be opened:\n{}'.format(error))
+                return
+            self.setDocument(document)
+            self.animationSaved = True
\ No newline at end of file
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from CubAnimate.common.CTypes import CubeSize
+from CubAnimate.common.CAnimationBinary import COMPRESSION_NONE, COMPRESSION_DELTA_RLE, COMPRESSION_PALETTE8
+from CubAnimate.common.CPalette import buildPalette
+from CubAnimate.common.CAnimationFile import createAnimationWriter, openAnimationFile, convertAnimationFile
+
+
+def randomFrames(count, shape, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (count,) + shape + (3,), dtype=np.uint8)
+
+
+class BinaryAnimationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, fileName):
+        return os.path.join(self.directory.name, fileName)
+
+    def writeAnimation(self, fileName, frames, compression=COMPRESSION_NONE, palette=None):
+        fileLocation = self.path(fileName)
+        with createAnimationWriter(fileLocation, 'test', CubeSize(*frames.shape[1:4]), 30, compression, palette) as writer:
+            for colors in frames:
+                writer.writeFrame(colors)
+        return fileLocation
+
+    def assertFrames(self, reader, frames):
+        self.assertEqual(reader.getFrameCount(), len(frames))
+        self.assertTrue(np.array_equal(np.stack(list(reader)), frames))
+        for index in (len(frames) - 1, 0, len(frames) // 2):
+            self.assertTrue(np.array_equal(reader.readFrame(index), frames[index]))
+
+    def test_raw_round_trip(self):
+        frames = randomFrames(5, (3, 4, 5))
+        reader = openAnimationFile(self.writeAnimation('raw.canim', frames))
+        self.assertEqual(reader.getName(), 'test')
+        self.assertEqual(reader.getCubeSize().getShape(), (3, 4, 5))
+        self.assertEqual(reader.getFPS(), 30)
+        self.assertFrames(reader, frames)
+        self.assertTrue(np.array_equal(reader.mapFrames(), frames))
+
+    def test_convert_round_trip(self):
+        frames = randomFrames(4, (2, 3, 4))
+        source = self.writeAnimation('source.anim', frames)
+        convertAnimationFile(source, self.path('converted.canim'))
+        convertAnimationFile(self.path('converted.canim'), self.path('back.anim'))
+        self.assertFrames(openAnimationFile(self.path('back.anim')), frames)
+
+    def test_delta_round_trip(self):
+        frames = np.zeros((70, 4, 4, 4, 3), dtype=np.uint8)
+        for index, colors in enumerate(frames):
+            colors[index % 4, :, index % 3] = (index, 255 - index, 7)
+        frames[35] = randomFrames(1, (4, 4, 4))[0] # Raw record in the middle of deltas
+        reader = openAnimationFile(self.writeAnimation('delta.canim', frames, COMPRESSION_DELTA_RLE))
+        self.assertTrue(reader.isCompressed())
+        self.assertFrames(reader, frames)
+        self.assertLess(os.path.getsize(reader.fileLocation), frames.nbytes)
+
+    def test_delta_large_cube(self):
+        frames = randomFrames(3, (41, 41, 41)) // 128 * 255 # Over 65536 LEDs, only full records
+        reader = openAnimationFile(self.writeAnimation('large.canim', frames, COMPRESSION_DELTA_RLE))
+        self.assertFrames(reader, frames)
+
+    def test_palette_round_trip(self):
+        frames = randomFrames(6, (3, 3, 3)) // 64 * 64
+        palette = buildPalette(frames)
+        reader = openAnimationFile(self.writeAnimation('palette.canim', frames, COMPRESSION_PALETTE8, palette))
+        self.assertTrue(np.array_equal(reader.getPalette().colors, palette.colors))
+        self.assertFrames(reader, frames)
+
+    def test_palette_needed(self):
+        with self.assertRaises(ValueError):
+            createAnimationWriter(self.path('palette.canim'), 'test', CubeSize(2, 2, 2), 30, COMPRESSION_PALETTE8)
+
+    def test_wrong_frame_shape(self):
+        with createAnimationWriter(self.path('shape.canim'), 'test', CubeSize(2, 2, 2), 30) as writer:
+            with self.assertRaises(ValueError):
+                writer.writeFrame(np.zeros((2, 2, 3, 3), dtype=np.uint8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+
+from CubAnimate.common.CFrameCodec import encodeFrameLine, decodeFrameLine, toLineOrder, fromLineOrder
+
+
+class FrameCodecTest(unittest.TestCase):
+
+    def test_line_order(self):
+        colors = np.zeros((2, 3, 4, 3), dtype=np.uint8)
+        colors[1, 0, 0] = (1, 2, 3)
+        colors[0, 1, 0] = (4, 5, 6)
+        colors[0, 0, 1] = (7, 8, 9)
+        packed = toLineOrder(colors)
+        self.assertEqual(packed[1].tolist(), [1, 2, 3]) # x varies first
+        self.assertEqual(packed[2].tolist(), [4, 5, 6])
+        self.assertEqual(packed[6].tolist(), [7, 8, 9])
+        self.assertTrue(np.array_equal(fromLineOrder(packed, colors.shape[:3]), colors))
+
+    def test_round_trip(self):
+        colors = np.random.default_rng(2).integers(0, 256, (3, 4, 5, 3), dtype=np.uint8)
+        line = encodeFrameLine(colors)
+        self.assertEqual(len(line), 3 * 4 * 5 * 7)
+        self.assertTrue(np.array_equal(decodeFrameLine(line, colors.shape[:3]), colors))
+        self.assertTrue(np.array_equal(decodeFrameLine(line.upper().encode('ascii') + b'\n', colors.shape[:3]), colors))
+
+    def test_first_led(self):
+        colors = np.zeros((2, 2, 2, 3), dtype=np.uint8)
+        colors[0, 0, 0] = (0x12, 0xab, 0xff)
+        self.assertTrue(encodeFrameLine(colors).startswith('#12abff#000000'))
+
+    def test_invalid_lines(self):
+        with self.assertRaises(ValueError):
+            decodeFrameLine('#000000', (2, 1, 1))
+        with self.assertRaises(ValueError):
+            decodeFrameLine('#00000g#000000', (2, 1, 1))
+        with self.assertRaises(ValueError):
+            decodeFrameLine('000000##000000', (2, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
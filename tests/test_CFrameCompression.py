@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from CubAnimate.common.CFrameCompression import (RECORD_KEYFRAME, RECORD_DELTA, RECORD_RAW, MAX_LED_NUMBER, MAX_RUN_LENGTH,
+                                                 encodeKeyframe, encodeRaw, encodeDelta, recordType, decodeRecord, DeltaFrameEncoder)
+
+
+class FrameCompressionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(5)
+
+    def test_keyframe_round_trip(self):
+        packed = np.zeros((MAX_RUN_LENGTH * 2 + 10, 3), dtype=np.uint8) # Runs longer than a u16
+        packed[100:200] = (255, 0, 0)
+        record = encodeKeyframe(packed)
+        self.assertEqual(recordType(record), RECORD_KEYFRAME)
+        self.assertTrue(np.array_equal(decodeRecord(record), packed))
+
+    def test_raw_round_trip(self):
+        packed = self.rng.integers(0, 256, (64, 3), dtype=np.uint8)
+        record = encodeRaw(packed)
+        self.assertEqual(recordType(record), RECORD_RAW)
+        self.assertTrue(np.array_equal(decodeRecord(record), packed))
+
+    def test_delta_round_trip(self):
+        previous = self.rng.integers(0, 4, (500, 3), dtype=np.uint8)
+        packed = previous.copy()
+        packed[10:20] = (9, 9, 9)
+        packed[self.rng.integers(0, 500, 30)] = (1, 2, 3)
+        record = encodeDelta(previous, packed)
+        self.assertEqual(recordType(record), RECORD_DELTA)
+        self.assertTrue(np.array_equal(decodeRecord(record, previous), packed))
+        with self.assertRaises(ValueError):
+            decodeRecord(record)
+
+    def test_noise_falls_back_to_raw(self):
+        encoder = DeltaFrameEncoder()
+        for _ in range(5):
+            packed = self.rng.integers(0, 256, (512, 3), dtype=np.uint8)
+            record = encoder.encode(packed)
+            self.assertEqual(recordType(record), RECORD_RAW)
+            self.assertLessEqual(len(record), packed.nbytes + 5)
+
+    def test_encoder_sequence(self):
+        frames = self.rng.integers(0, 2, (40, 300, 3), dtype=np.uint8) * 255
+        frames[:, 150:] = 0
+        encoder = DeltaFrameEncoder(keyframeInterval=10)
+        records = [encoder.encode(packed) for packed in frames]
+        self.assertTrue(all(recordType(records[index]) != RECORD_DELTA for index in range(0, 40, 10)))
+        packed = None
+        for record, expected in zip(records, frames):
+            packed = decodeRecord(record, packed)
+            self.assertTrue(np.array_equal(packed, expected))
+
+    def test_large_cube_has_no_delta(self):
+        packed = np.zeros((MAX_LED_NUMBER + 1, 3), dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            encodeDelta(packed, packed)
+        encoder = DeltaFrameEncoder()
+        encoder.encode(packed)
+        packed[-1] = (1, 1, 1)
+        record = encoder.encode(packed)
+        self.assertNotEqual(recordType(record), RECORD_DELTA)
+        self.assertTrue(np.array_equal(decodeRecord(record), packed))
+
+
+if __name__ == '__main__':
+    unittest.main()
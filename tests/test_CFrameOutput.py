@@ -0,0 +1,106 @@
+import unittest
+import zlib
+
+import numpy as np
+
+from CubAnimate.common.CFrameOutput import (FORMAT_RGB888, FORMAT_PALETTE8, PACKET_HEADER, PACKET_CRC, PALETTE_COUNT,
+                                            buildPacket, parsePacket, splitPacket, PacketAssembler, LoopbackTransport, FrameOutputThread)
+
+
+class PacketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.colors = np.random.default_rng(21).integers(0, 256, (4, 3, 2, 3), dtype=np.uint8)
+
+    def test_round_trip(self):
+        packet = buildPacket(self.colors, 0x1_0000_0005)
+        sequence, format, colors = parsePacket(packet)
+        self.assertEqual((sequence, format), (5, FORMAT_RGB888))
+        self.assertTrue(np.array_equal(colors, self.colors))
+
+    def test_corruption_is_detected(self):
+        packet = buildPacket(self.colors, 1)
+        for position in (PACKET_HEADER.size - 1, PACKET_HEADER.size + 10, len(packet) - 1):
+            corrupted = bytearray(packet)
+            corrupted[position] ^= 0x01
+            with self.assertRaises(ValueError):
+                parsePacket(bytes(corrupted))
+
+    def test_truncated_packets(self):
+        packet = buildPacket(self.colors, 1)
+        for length in (0, PACKET_HEADER.size, len(packet) - 1):
+            with self.assertRaises(ValueError):
+                parsePacket(packet[:length])
+        with self.assertRaises(ValueError):
+            parsePacket(b'XX' + packet[2:])
+
+    def test_palette_round_trip(self):
+        colors = self.colors // 128 * 255
+        sequence, format, decoded = parsePacket(buildPacket(colors, 2, FORMAT_PALETTE8))
+        self.assertEqual(format, FORMAT_PALETTE8)
+        self.assertTrue(np.array_equal(decoded, colors))
+
+    def test_palette_quantized(self):
+        packet = buildPacket(self.colors, 2, FORMAT_PALETTE8, paletteSize=4)
+        count, = PALETTE_COUNT.unpack_from(packet, PACKET_HEADER.size)
+        self.assertEqual(count, 4)
+        self.assertEqual(parsePacket(packet)[2].shape, self.colors.shape)
+
+    def test_palette_index_out_of_range(self):
+        packet = buildPacket(self.colors // 128 * 255, 2, FORMAT_PALETTE8)
+        data = bytearray(packet[:-PACKET_CRC.size])
+        data[-1] = 255 # Index of the last LED, the palette holds at most 8 colors
+        with self.assertRaises(ValueError):
+            parsePacket(bytes(data) + PACKET_CRC.pack(zlib.crc32(data)))
+
+
+class FragmentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.packet = buildPacket(np.random.default_rng(21).integers(0, 256, (32, 32, 32, 3), dtype=np.uint8), 0)
+
+    def test_round_trip(self):
+        datagrams = splitPacket(self.packet, 7)
+        self.assertGreater(len(datagrams), 1)
+        self.assertTrue(all(len(datagram) <= 1500 for datagram in datagrams))
+        assembler = PacketAssembler()
+        results = [assembler.push(datagram) for datagram in reversed(datagrams)]
+        self.assertTrue(all(result is None for result in results[:-1]))
+        self.assertEqual(results[-1], self.packet)
+        self.assertIsNone(assembler.push(datagrams[0])) # Duplicate of a complete packet
+
+    def test_incomplete_packet_is_dropped(self):
+        assembler = PacketAssembler()
+        older = splitPacket(self.packet, 0xFFFFFFFF)
+        newer = splitPacket(self.packet, 0) # Packet numbers wrap around
+        assembler.push(older[0])
+        results = [assembler.push(datagram) for datagram in newer]
+        self.assertEqual(results[-1], self.packet)
+        self.assertIsNone(assembler.push(older[1])) # Late fragment of the dropped packet
+
+    def test_invalid_fragments(self):
+        assembler = PacketAssembler()
+        with self.assertRaises(ValueError):
+            assembler.push(b'CU')
+        with self.assertRaises(ValueError):
+            assembler.push(b'XX' + splitPacket(self.packet, 0)[0][2:])
+
+
+class FrameOutputThreadTest(unittest.TestCase):
+
+    def test_frames_are_sent(self):
+        transport = LoopbackTransport()
+        thread = FrameOutputThread(transport)
+        thread.start()
+        colors = np.full((2, 2, 2, 3), 9, dtype=np.uint8)
+        thread.pushFrame(colors)
+        for _ in range(100):
+            if thread.sentPackets > 0:
+                break
+            thread.wait(10)
+        self.assertTrue(thread.stop())
+        self.assertTrue(np.array_equal(parsePacket(transport.packets[0])[2], colors))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from CubAnimate.common.CFrameCodec import toLineOrder
+from CubAnimate.common.CFramePacking import (PACK_RGB888, PACK_RGB565, PACK_PALETTE8, PACK_BCM, PACKED_HEADER, PACKED_MAGIC,
+                                             packAnimation)
+
+
+class FramePackingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = np.random.default_rng(22).integers(0, 256, (3, 2, 3, 4, 3), dtype=np.uint8)
+
+    def test_rgb888(self):
+        packed = packAnimation('test', self.frames, 30, PACK_RGB888)
+        self.assertEqual(packed.frames.shape, (3, 2 * 3 * 4 * 3))
+        for frame, colors in zip(packed.frames, self.frames):
+            self.assertTrue(np.array_equal(frame.reshape(-1, 3), toLineOrder(colors)))
+
+    def test_rgb565(self):
+        packed = packAnimation('test', self.frames, 30, PACK_RGB565)
+        words = packed.frames.view('<u2').reshape(3, -1)
+        colors = np.stack([toLineOrder(colors) for colors in self.frames]).astype(np.uint16)
+        self.assertTrue(np.array_equal(words >> 11, colors[..., 0] >> 3))
+        self.assertTrue(np.array_equal((words >> 5) & 0x3F, colors[..., 1] >> 2))
+        self.assertTrue(np.array_equal(words & 0x1F, colors[..., 2] >> 3))
+
+    def test_palette_round_trip(self):
+        frames = self.frames // 64 * 64 # At most 64 colors, the palette is exact
+        packed = packAnimation('test', frames, 30, PACK_PALETTE8)
+        for frame, colors in zip(packed.frames, frames):
+            self.assertTrue(np.array_equal(packed.palette[frame], toLineOrder(colors)))
+
+    def test_bit_planes(self):
+        for bitDepth in (8, 4, 1):
+            packed = packAnimation('test', self.frames, 30, PACK_BCM, bitDepth)
+            x, y, z = self.frames.shape[1:4]
+            bits = np.unpackbits(packed.frames.reshape(3, z, bitDepth, -1), axis=-1)[..., :x * y * 3]
+            weights = (1 << np.arange(bitDepth - 1, -1, -1))[:, np.newaxis] # Most significant plane first
+            values = (bits * weights).sum(axis=2) # (frames, Z, layer channels)
+            expected = self.frames.transpose(0,3,2,1,4).reshape(3, z, -1) >> (8 - bitDepth)
+            self.assertTrue(np.array_equal(values, expected))
+        with self.assertRaises(ValueError):
+            packAnimation('test', self.frames, 30, PACK_BCM, 9)
+
+    def test_blob(self):
+        packed = packAnimation('test', self.frames // 64 * 64, 24, PACK_PALETTE8)
+        with tempfile.TemporaryDirectory() as directory:
+            fileLocation = os.path.join(directory, 'test.cpk')
+            packed.writeBlob(fileLocation)
+            with open(fileLocation, 'rb') as file:
+                data = file.read()
+        magic, version, layout, bitDepth, _, x, y, z, fps, count, frameSize, paletteSize = PACKED_HEADER.unpack_from(data)
+        self.assertEqual((magic, layout, (x, y, z), fps, count), (PACKED_MAGIC, PACK_PALETTE8, (2, 3, 4), 24, 3))
+        paletteEnd = PACKED_HEADER.size + 3 * paletteSize
+        self.assertEqual(data[PACKED_HEADER.size:paletteEnd], packed.palette.tobytes())
+        self.assertEqual(data[paletteEnd:], packed.frames.tobytes())
+        self.assertEqual(len(data) - paletteEnd, count * frameSize)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from CubAnimate.common.COutputStage import ColorCorrection, OutputPipeline, PowerLimiter
+
+
+class PowerLimiterTest(unittest.TestCase):
+
+    def test_empty_animation(self):
+        limiter = PowerLimiter(budget=100.0, idleCurrent=1.0, enabled=True)
+        frames = np.zeros((0, 4, 8, 8, 3), dtype=np.uint8)
+        self.assertEqual(limiter.estimateCurrents(frames).shape, (0,))
+        processed = limiter.processFrames(frames)
+        self.assertEqual(processed.shape, frames.shape)
+        self.assertEqual(limiter.report.getPeakPower(), 0.0)
+        self.assertEqual(limiter.report.getLimitedFrameCount(), 0)
+
+    def test_frames_over_budget_are_dimmed(self):
+        limiter = PowerLimiter(budget=100.0, enabled=True)
+        frames = np.full((3, 2, 2, 2, 3), 255, dtype=np.uint8)
+        processed = limiter.processFrames(frames)
+        self.assertTrue(np.all(limiter.estimateCurrents(processed) <= limiter.budget))
+        self.assertEqual(limiter.report.getLimitedFrameCount(), 3)
+
+
+class OutputPipelineTest(unittest.TestCase):
+
+    def test_copy_is_independent(self):
+        correction = ColorCorrection((1.0, 1.0, 1.0))
+        limiter = PowerLimiter(budget=100.0, enabled=True)
+        pipeline = OutputPipeline([correction, limiter])
+        limiter.processFrame(np.full((2, 2, 2, 3), 255, dtype=np.uint8))
+        stream = pipeline.copy()
+        self.assertEqual(stream.getStage(PowerLimiter).streamScale, 1.0)
+        correction.setParameters((1.0, 1.0, 1.0), (1.0, 1.0, 1.0), 0.5)
+        limiter.budget = 0.0
+        colors = np.full((2, 2, 2, 3), 10, dtype=np.uint8)
+        self.assertTrue(np.array_equal(stream.processFrame(colors), colors))
+        self.assertIsNot(stream.getStage(ColorCorrection), correction)
+
+
+if __name__ == '__main__':
+    unittest.main()
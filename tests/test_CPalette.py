@@ -0,0 +1,29 @@
+import unittest
+
+import numpy as np
+
+from CubAnimate.common.CPalette import buildPalette
+
+
+class PaletteTest(unittest.TestCase):
+
+    def test_exact_palette(self):
+        colors = np.random.default_rng(23).integers(0, 4, (5, 4, 4, 4, 3), dtype=np.uint8) * 85 # 64 colors
+        palette = buildPalette(colors)
+        self.assertTrue(palette.exact)
+        self.assertEqual(len(palette), len(np.unique(colors.reshape(-1, 3), axis=0)))
+        indices = palette.indicesOf(colors)
+        self.assertEqual(indices.dtype, np.uint8)
+        self.assertTrue(np.array_equal(palette.colorsOf(indices), colors))
+
+    def test_quantized_palette(self):
+        colors = np.random.default_rng(23).integers(0, 256, (4096, 3), dtype=np.uint8)
+        palette = buildPalette(colors, 16)
+        self.assertFalse(palette.exact)
+        self.assertEqual(len(palette), 16)
+        error = np.abs(palette.colorsOf(palette.indicesOf(colors)).astype(int) - colors).max()
+        self.assertLess(error, 128)
+
+
+if __name__ == '__main__':
+    unittest.main()